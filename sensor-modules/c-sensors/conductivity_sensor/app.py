@@ -4,8 +4,10 @@
 from __future__ import annotations
 
 import csv
+import json
 import sys
 import time
+import uuid
 from collections import deque
 from datetime import datetime
 from typing import Optional
@@ -379,12 +381,18 @@ class MainWindow(QtWidgets.QMainWindow):
     def trigger_bubblecam(self) -> None:
         """Publish a message instructing the BubbleCam to write images."""
         try:
-            self.zmq_socket.send_string("trigger")
-            self.console_append("Sent BubbleCam trigger.")
+            # The cameras pick their frames by this timestamp, so transit and
+            # polling delays do not shift the event
+            event_time = time.time()
+            event_id = uuid.uuid4().hex
+            payload = json.dumps({"time": event_time, "event_id": event_id})
+            self.zmq_socket.send_string(f"trigger {payload}")
+            self.console_append(f"Sent BubbleCam trigger {event_id}.")
             if self.notes_file:
-                ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                ts = datetime.fromtimestamp(event_time).strftime("%Y-%m-%d %H:%M:%S")
                 self.notes_file.write(
-                    f"{ts} | {self.base_filename}.csv | BubbleCam triggered\n"
+                    f"{ts} | {self.base_filename}.csv | BubbleCam triggered"
+                    f" | {event_id}\n"
                 )
                 self.console_append("[NOTE] BubbleCam triggered")
         except Exception as exc:
@@ -1,7 +1,4 @@
-from collections import deque
 import threading
-import time
-import zmq
 import sys
 from pathlib import Path
 
@@ -11,49 +8,43 @@ sys.path.append(str(CURRENT_DIR))
 sys.path.append(str(COMMON_DIR))
 
 from bubblecam import BubbleCam
-from state import State
+from event_scheduler import EventScheduler
+from state import StateMonitor
+from trigger import TriggerSubscriber
 import config
 
 if __name__ == "__main__":
-    prev_state = State.QUIESCENT
-    curr_state = State.STORM
-
-    queue = deque()
+    monitor = StateMonitor()
     lock = threading.Lock()
 
     bubblecam = BubbleCam()
+    buffer = bubblecam.create_buffer()
+
+    # Trigger events from the conductivity UI and the wavebreak detector wake
+    # the loop as they arrive
+    subscriber = TriggerSubscriber(
+        [f"tcp://{config.SERVER_IP}:{config.SERVER_PORT}", *config.TRIGGER_ENDPOINTS]
+    )
 
-    # ZMQ subscriber listens for trigger events from the conductivity UI
-    context = zmq.Context()
-    socket = context.socket(zmq.SUB)
-    socket.connect(f"tcp://{config.SERVER_IP}:{config.SERVER_PORT}")
-    socket.setsockopt(zmq.SUBSCRIBE, b"trigger")
+    scheduler = EventScheduler(bubblecam, buffer, lock)
 
-    capture_thread = threading.Thread(target=bubblecam.capture_loop, args=(queue, lock))
-    capture_started = False
+    # The capture thread idles the camera whenever the glider state does not
+    # call for capture, so it runs from the start
+    bubblecam.set_state(monitor.get_state())
+    capture_thread = threading.Thread(target=bubblecam.capture_loop, args=(buffer, lock))
+    capture_thread.start()
 
     while True:
-        if capture_started and not capture_thread.is_alive():
+        if not capture_thread.is_alive():
             bubblecam.cam.reset()
-            capture_thread = threading.Thread(target=bubblecam.capture_loop, args=(queue, lock))
+            capture_thread = threading.Thread(target=bubblecam.capture_loop, args=(buffer, lock))
             capture_thread.start()
 
-        # non-blocking check for trigger messages
-        try:
-            msg = socket.recv_string(flags=zmq.NOBLOCK)
-            if msg.startswith("trigger"):
-                curr_state = State.WAVEBREAK
-        except zmq.Again:
-            pass
-
-        if curr_state == State.STORM and prev_state == State.QUIESCENT:
-            if not capture_started:
-                capture_thread.start()
-                capture_started = True
-            prev_state = State.STORM
-        elif curr_state == State.WAVEBREAK:
-            write_thread = threading.Thread(target=bubblecam.write_images, args=(queue, lock))
-            write_thread.start()
-            write_thread.join()
-            curr_state = State.STORM
-        time.sleep(0.5)
+        bubblecam.set_state(monitor.get_state())
+
+        # The timeout bounds how long a dead capture thread or a state change
+        # goes unnoticed
+        trigger = subscriber.wait(timeout=1.0)
+        if trigger is not None and trigger.message.startswith("trigger"):
+            # Written in the background, so the next trigger is never blocked
+            scheduler.submit(trigger)
@@ -1,9 +1,12 @@
 import argparse
-from time import sleep
+import threading
+from time import monotonic, sleep
 import sys
 
 from ..bubblecam import BubbleCam
+from ...common.event_scheduler import EventScheduler
 from ...common.state import State
+from ...common.trigger import Trigger
 
 def parse_args():
     parser = argparse.ArgumentParser()
@@ -46,7 +49,9 @@ if __name__ == '__main__':
     cam.set_state(State.STORM)
     # sleep for time it takes to fill up buffer and then a little bit more
     sleep(args['roll_buf_size'] / args['fps'] + 5)
-    cam.detect_event()
+    scheduler = EventScheduler(cam, cam.create_buffer(), threading.Lock())
+    scheduler.submit(Trigger("trigger", monotonic()))
+    scheduler.stop()
     cam.power_off()
 
      
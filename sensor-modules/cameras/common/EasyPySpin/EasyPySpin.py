@@ -1,6 +1,67 @@
 import cv2
+import numpy as np
 import PySpin
+import re
 import threading
+import time
+
+try:
+    from .record import FrameRecord
+except ImportError:  # executed as a script
+    from record import FrameRecord
+
+# Values accepted for StreamBufferHandlingMode
+STREAM_BUFFER_MODES = (
+    "OldestFirst",
+    "OldestFirstOverwrite",
+    "NewestFirst",
+    "NewestOnly",
+)
+
+# Transport layer stream counters reported by get_stream_statistics()
+STREAM_STATISTICS = (
+    "StreamDroppedFrameCount",
+    "StreamLostFrameCount",
+    "StreamIncompleteFrameCount",
+    "StreamBufferUnderrunCount",
+)
+
+# Roles accepted by set_sync_role()
+SYNC_ROLES = (None, "master", "slave")
+
+# QuickSpin nodes resolved once when the camera is opened
+CACHED_NODES = (
+    "ExposureAuto",
+    "ExposureTime",
+    "GainAuto",
+    "Gain",
+    "AutoExposureEVCompensation",
+    "Gamma",
+    "AcquisitionFrameRateEnable",
+    "AcquisitionFrameRate",
+    "DeviceIndicatorMode",
+    "Width",
+    "Height",
+    "OffsetX",
+    "OffsetY",
+    "BinningHorizontal",
+    "BinningVertical",
+    "DecimationHorizontal",
+    "DecimationVertical",
+    "DeviceTemperature",
+)
+
+# Pixel formats with bit-packed samples, e.g. BayerRG12p, delivered as rows of
+# raw bytes rather than one array element per pixel
+PACKED_PIXEL_FORMAT = re.compile(r"\D+(10|12)(p|Packed)")
+
+# The image size and offsets are bounded by the binning and decimation and by
+# each other, and a smaller image raises the maximum frame rate
+REGION_NODES = ("Width", "Height", "OffsetX", "OffsetY", "AcquisitionFrameRate")
+
+# The exposure time is bounded by the frame period and vice versa, so their
+# limits are read again whenever either one is written
+COUPLED_NODES = ("ExposureTime", "AcquisitionFrameRate")
 
 
 class VideoCapture:
@@ -13,11 +74,17 @@ class VideoCapture:
         camera
     nodemap : PySpin.INodeMap
         nodemap represents the elements of a camera description file.
+    frames_dropped : int
+        number of frames missing from the frame ID sequence since open.
+    pixel_format : str
+        current pixel format, e.g. "BayerRG8".
 
     Methods
     -------
     read()
         returns the next frame.
+    read_into(out)
+        copies the next frame into a preallocated array.
     release()
         Closes capturing device.
     isOpened()
@@ -26,24 +93,52 @@ class VideoCapture:
         Sets a property.
     get(propId)
         Gets a property.
+    apply_settings(settings)
+        Sets several properties at once, skipping unchanged values.
+    set_stream_buffer_handling(mode, count)
+        Sets how the host side stream buffers are used.
+    get_stream_statistics()
+        Returns the transport layer stream counters.
+    set_sync_role(role, line)
+        Configures hardware triggering between cameras.
+    set_pixel_format(pixel_format)
+        Selects the pixel format, e.g. raw Bayer.
+    set_binning(binning, decimation)
+        Combines or skips sensor pixels to shrink every frame.
+    set_roi(roi)
+        Reads out only a region of the sensor.
+    dropped_frames()
+        Returns the number of frames dropped since open.
+    start_stream()
+        Begins acquisition.
+    stop_stream()
+        Ends acquisition, leaving the camera initialized.
+    restart_stream()
+        Ends and begins acquisition again without reinitializing.
+    reinitialize()
+        Deinitializes and initializes the camera again.
+    retain_system()
+        Keeps the shared Spinnaker system alive.
+    release_system()
+        Drops a reference taken by retain_system().
     """
 
     _system = None
     _system_refcount = 0
     _lock = threading.Lock()
 
-    def __init__(self, index):
+    def __init__(self, index, buffer_handling_mode="NewestOnly", buffer_count=None):
         """
         Parameters
         ----------
         index : int
             id of the video capturing device to open.
+        buffer_handling_mode : str
+            StreamBufferHandlingMode, one of STREAM_BUFFER_MODES.
+        buffer_count : int
+            number of stream buffers, or None to keep the SDK default.
         """
-        with VideoCapture._lock:
-            if VideoCapture._system is None:
-                VideoCapture._system = PySpin.System.GetInstance()
-            VideoCapture._system_refcount += 1
-        self._system = VideoCapture._system
+        self._system = VideoCapture.retain_system()
 
         cam_list = self._system.GetCameras()
         try:
@@ -61,27 +156,47 @@ class VideoCapture:
 
         self.cam.Init()
         self.nodemap = self.cam.GetNodeMap()
+        self._cache_nodes()
+        self._set_pixel_format_state(self._get_enum("PixelFormat"))
+
+        self.frames_dropped = 0
+        self._last_frame_id = None
+        self.sync_role = None
+        self._buffer_handling_mode = buffer_handling_mode
+        self._buffer_count = buffer_count
+        self.set_stream_buffer_handling(buffer_handling_mode, buffer_count)
+
+    @classmethod
+    def retain_system(cls):
+        """
+        Returns the shared Spinnaker system, creating it if needed.
 
-        s_node_map = self.cam.GetTLStreamNodeMap()
-        handling_mode = PySpin.CEnumerationPtr(
-            s_node_map.GetNode("StreamBufferHandlingMode")
-        )
-        handling_mode_entry = handling_mode.GetEntryByName("NewestOnly")
-        handling_mode.SetIntValue(handling_mode_entry.GetValue())
+        Every call must be matched by release_system(). Holding a reference
+        while a camera is closed and reopened keeps the system, and the
+        enumerated interfaces, warm in between.
+        """
+        with cls._lock:
+            if cls._system is None:
+                cls._system = PySpin.System.GetInstance()
+            cls._system_refcount += 1
+            return cls._system
+
+    @classmethod
+    def release_system(cls):
+        """
+        Drops a reference to the shared Spinnaker system.
 
-    def _decrement_system(self):
-        with VideoCapture._lock:
+        The system is released together with the last reference.
+        """
+        with cls._lock:
             # Prevent the reference counter from dropping below zero in case
             # ``release`` is called multiple times on the same instance.
-            if VideoCapture._system_refcount > 0:
-                VideoCapture._system_refcount -= 1
+            if cls._system_refcount > 0:
+                cls._system_refcount -= 1
 
-            if (
-                VideoCapture._system_refcount == 0
-                and VideoCapture._system is not None
-            ):
+            if cls._system_refcount == 0 and cls._system is not None:
                 try:
-                    VideoCapture._system.ReleaseInstance()
+                    cls._system.ReleaseInstance()
                 except Exception as exc:
                     # When multiple cameras are in use the underlying Spinnaker
                     # system can refuse to shut down if another process still
@@ -90,7 +205,383 @@ class VideoCapture:
                     # application.
                     print(f"Warning: failed to release Spinnaker system: {exc}")
                 finally:
-                    VideoCapture._system = None
+                    cls._system = None
+
+    def start_stream(self):
+        """
+        Begins acquisition if the camera is not streaming.
+
+        read() does this on demand; calling it up front takes the start-up
+        cost out of the first read.
+        """
+        if not self.cam.IsStreaming():
+            self.cam.BeginAcquisition()
+            # Frame IDs restart with every acquisition
+            self._last_frame_id = None
+
+    def stop_stream(self):
+        """
+        Ends acquisition, leaving the camera initialized and configured.
+
+        The camera stops sending frames over the bus until the next
+        start_stream() or read().
+        """
+        if self.cam.IsStreaming():
+            self.cam.EndAcquisition()
+
+    def restart_stream(self):
+        """
+        Ends and begins acquisition again.
+
+        This recovers from most stream errors in a few milliseconds without
+        touching the camera's settings.
+        """
+        self.stop_stream()
+        self.start_stream()
+
+    def reinitialize(self):
+        """
+        Deinitializes and initializes the camera again.
+
+        Node handles are resolved again and the stream buffer handling is
+        restored, but property values are not reapplied.
+        """
+        if self.cam.IsStreaming():
+            self.cam.EndAcquisition()
+        self.cam.DeInit()
+        self.cam.Init()
+        self.nodemap = self.cam.GetNodeMap()
+        self._cache_nodes()
+        self._last_frame_id = None
+        self.set_stream_buffer_handling(self._buffer_handling_mode, self._buffer_count)
+
+    def _cache_nodes(self):
+        """
+        Resolves the CACHED_NODES handles and their limits.
+
+        Looking up a QuickSpin node and its limits goes through GenICam on
+        every access, so set() and get() only use the handles cached here.
+        Nodes the camera does not implement are left out.
+        """
+        self._nodes = {}
+        for name in CACHED_NODES:
+            try:
+                node = getattr(self.cam, name)
+            except AttributeError:
+                continue
+            if PySpin.IsAvailable(node):
+                self._nodes[name] = node
+        self._limits = {}
+        self._refresh_limits(self._nodes)
+        # Values last written through set() or apply_settings(), by propId
+        self._applied = {}
+
+    def _refresh_limits(self, names):
+        for name in names:
+            node = self._nodes.get(name)
+            if node is None or not hasattr(node, "GetMin"):
+                continue
+            if PySpin.IsReadable(node):
+                self._limits[name] = (node.GetMin(), node.GetMax())
+
+    def set_stream_buffer_handling(self, mode, count=None):
+        """
+        Sets how the host side stream buffers are used.
+
+        Must be called while the camera is not streaming.
+
+        Parameters
+        ----------
+        mode : str
+            StreamBufferHandlingMode, one of STREAM_BUFFER_MODES. NewestOnly
+            silently drops frames the application does not read in time,
+            OldestFirst keeps them queued as long as buffers are free.
+        count : int
+            number of stream buffers, or None to keep the current count.
+
+        Returns
+        -------
+        retval : bool
+           True if the setting succeeded.
+        """
+        if mode not in STREAM_BUFFER_MODES:
+            return False
+        s_node_map = self.cam.GetTLStreamNodeMap()
+        handling_mode = PySpin.CEnumerationPtr(
+            s_node_map.GetNode("StreamBufferHandlingMode")
+        )
+        handling_mode_entry = handling_mode.GetEntryByName(mode)
+        if not PySpin.IsAvailable(handling_mode_entry) or not PySpin.IsReadable(
+            handling_mode_entry
+        ):
+            return False
+        handling_mode.SetIntValue(handling_mode_entry.GetValue())
+
+        if count is not None:
+            count_mode = PySpin.CEnumerationPtr(
+                s_node_map.GetNode("StreamBufferCountMode")
+            )
+            count_mode.SetIntValue(count_mode.GetEntryByName("Manual").GetValue())
+            buffer_count = PySpin.CIntegerPtr(
+                s_node_map.GetNode("StreamBufferCountManual")
+            )
+            buffer_count.SetValue(
+                int(self.__clip(count, buffer_count.GetMin(), buffer_count.GetMax()))
+            )
+        return True
+
+    def _set_enum(self, name, entry):
+        node = PySpin.CEnumerationPtr(self.nodemap.GetNode(name))
+        if not PySpin.IsAvailable(node) or not PySpin.IsWritable(node):
+            return False
+        entry_node = node.GetEntryByName(entry)
+        if not PySpin.IsAvailable(entry_node) or not PySpin.IsReadable(entry_node):
+            return False
+        node.SetIntValue(entry_node.GetValue())
+        return True
+
+    def _get_enum(self, name):
+        node = PySpin.CEnumerationPtr(self.nodemap.GetNode(name))
+        if not PySpin.IsAvailable(node) or not PySpin.IsReadable(node):
+            return None
+        return node.GetCurrentEntry().GetSymbolic()
+
+    def set_pixel_format(self, pixel_format):
+        """
+        Selects the pixel format of the frames.
+
+        Raw Bayer formats such as "BayerRG8" deliver the sensor mosaic, a
+        third of the bytes of "BGR8", for debayering later. Bit-packed formats
+        such as "BayerRG12p" are returned by read() as uint8 rows of the raw
+        bytes, two 12-bit pixels in three bytes. Must be called while the
+        camera is not streaming, before set_binning() and set_roi() as it
+        changes their increments.
+
+        Parameters
+        ----------
+        pixel_format : str
+            a PixelFormat entry supported by the camera.
+
+        Returns
+        -------
+        retval : bool
+           True if the setting succeeded.
+        """
+        if not self._set_enum("PixelFormat", pixel_format):
+            return False
+        self._set_pixel_format_state(pixel_format)
+        self._refresh_limits(REGION_NODES)
+        return True
+
+    def _set_pixel_format_state(self, pixel_format):
+        self.pixel_format = pixel_format
+        # GetNDArray() cannot represent packed samples
+        self._packed = bool(
+            pixel_format and PACKED_PIXEL_FORMAT.fullmatch(pixel_format)
+        )
+
+    def set_sync_role(self, role, line="Line2"):
+        """
+        Configures hardware triggering between cameras.
+
+        The master free-runs at its frame rate and drives ``line`` while it
+        exposes. Slaves expose once per rising edge on their ``line``, so
+        wiring the master's output to every slave's input gives time-aligned
+        frames. Start the slaves' acquisition before the master's so that no
+        trigger is missed. Must be called while the camera is not streaming.
+
+        Parameters
+        ----------
+        role : str or None
+            one of SYNC_ROLES; None free-runs without any trigger.
+        line : str
+            output line of the master or input line of a slave, e.g. "Line2".
+            Some lines need to be powered separately (see V3_3Enable).
+
+        Returns
+        -------
+        retval : bool
+           True if the setting succeeded.
+        """
+        if role not in SYNC_ROLES:
+            return False
+        # The trigger source can only be changed with triggering off
+        if not self._set_enum("TriggerMode", "Off"):
+            return role is None
+        success = True
+        if role == "master":
+            success = (
+                self._set_enum("LineSelector", line)
+                and self._set_enum("LineMode", "Output")
+                and self._set_enum("LineSource", "ExposureActive")
+            )
+        elif role == "slave":
+            # The frame rate limit would drop triggers arriving early
+            self._set_node("AcquisitionFrameRateEnable", False)
+            success = (
+                self._set_enum("TriggerSelector", "FrameStart")
+                and self._set_enum("TriggerSource", line)
+                and self._set_enum("TriggerActivation", "RisingEdge")
+                and self._set_enum("TriggerMode", "On")
+            )
+            # Accept the next trigger while the previous frame is read out
+            self._set_enum("TriggerOverlap", "ReadOut")
+        if success:
+            self.sync_role = role
+        return success
+
+    def set_binning(self, binning=1, decimation=1):
+        """
+        Combines or skips sensor pixels in both directions.
+
+        Binning merges ``binning`` x ``binning`` pixels into one, decimation
+        keeps every ``decimation``-th pixel; both shrink the frames sent over
+        the bus. The region of interest is taken from the resulting image,
+        so call this before set_roi(). Must be called while the camera is
+        not streaming.
+
+        Parameters
+        ----------
+        binning : int
+            pixels merged in each direction, 1 for none.
+        decimation : int
+            pixels skipped in each direction, 1 for none.
+
+        Returns
+        -------
+        retval : bool
+           True if the setting succeeded. Factors other than 1 fail on
+           cameras without the corresponding nodes.
+        """
+        success = True
+        for name, value in (
+            ("BinningHorizontal", binning),
+            ("BinningVertical", binning),
+            ("DecimationHorizontal", decimation),
+            ("DecimationVertical", decimation),
+        ):
+            node = self._nodes.get(name)
+            if node is None:
+                success = success and value == 1
+                continue
+            # Some cameras link the vertical factor to the horizontal one
+            if PySpin.IsReadable(node) and node.GetValue() == value:
+                continue
+            if not PySpin.IsWritable(node) or not (
+                node.GetMin() <= value <= node.GetMax()
+            ):
+                success = False
+                continue
+            node.SetValue(int(value))
+        self._refresh_limits(REGION_NODES)
+        return success
+
+    def _rounded(self, name, value):
+        # Width, height and offsets only take multiples of their increment
+        node = self._nodes[name]
+        minimum = node.GetMin()
+        return int(minimum + (value - minimum) // node.GetInc() * node.GetInc())
+
+    def set_roi(self, roi=None):
+        """
+        Reads out only a region of the sensor.
+
+        Must be called while the camera is not streaming, after
+        set_binning(). The new frame size is reported by
+        get(cv2.CAP_PROP_FRAME_WIDTH) and get(cv2.CAP_PROP_FRAME_HEIGHT).
+
+        Parameters
+        ----------
+        roi : tuple or None
+            (offset_x, offset_y, width, height) in pixels of the binned and
+            decimated image, or None for the whole image. Values are rounded
+            down to the increments the camera supports.
+
+        Returns
+        -------
+        retval : bool
+           True if the setting succeeded. False, with the region left at the
+           top left corner, if it does not fit the image.
+        """
+        if "Width" not in self._nodes or "Height" not in self._nodes:
+            return roi is None
+        has_offsets = "OffsetX" in self._nodes and "OffsetY" in self._nodes
+        # Zero offsets first, so that the full width and height are allowed
+        if has_offsets:
+            self._set_node("OffsetX", 0)
+            self._set_node("OffsetY", 0)
+        self._refresh_limits(REGION_NODES)
+
+        width_node, height_node = self._nodes["Width"], self._nodes["Height"]
+        if roi is None:
+            offset_x, offset_y = 0, 0
+            width, height = width_node.GetMax(), height_node.GetMax()
+        else:
+            offset_x, offset_y, width, height = roi
+        if (offset_x or offset_y) and not has_offsets:
+            return False
+        width, height = self._rounded("Width", width), self._rounded("Height", height)
+        if not (
+            width_node.GetMin() <= width <= width_node.GetMax()
+            and height_node.GetMin() <= height <= height_node.GetMax()
+        ):
+            return False
+        width_node.SetValue(width)
+        height_node.SetValue(height)
+
+        if has_offsets:
+            self._refresh_limits(REGION_NODES)
+            offset_x = self._rounded("OffsetX", offset_x)
+            offset_y = self._rounded("OffsetY", offset_y)
+            if (
+                offset_x > self._limits["OffsetX"][1]
+                or offset_y > self._limits["OffsetY"][1]
+            ):
+                return False
+            self._set_node("OffsetX", offset_x)
+            self._set_node("OffsetY", offset_y)
+        self._refresh_limits(REGION_NODES)
+        return True
+
+    def get_stream_statistics(self):
+        """
+        Returns the transport layer stream counters.
+
+        Returns
+        -------
+        statistics : dict
+            readable STREAM_STATISTICS counters by node name, plus
+            ``FrameIDGaps`` with the frames missing from the frame ID sequence.
+        """
+        statistics = {}
+        s_node_map = self.cam.GetTLStreamNodeMap()
+        for name in STREAM_STATISTICS:
+            node = PySpin.CIntegerPtr(s_node_map.GetNode(name))
+            if PySpin.IsAvailable(node) and PySpin.IsReadable(node):
+                statistics[name] = node.GetValue()
+        statistics["FrameIDGaps"] = self.frames_dropped
+        return statistics
+
+    def dropped_frames(self):
+        """
+        Returns the number of frames dropped since the camera was opened.
+
+        This is the larger of the frame ID gaps seen by read() and the
+        dropped plus lost frames counted by the transport layer.
+        """
+        statistics = self.get_stream_statistics()
+        stream = statistics.get("StreamDroppedFrameCount", 0) + statistics.get(
+            "StreamLostFrameCount", 0
+        )
+        return max(self.frames_dropped, stream)
+
+    def _decrement_system(self):
+        # release() runs __del__ once more when the instance is collected,
+        # so only drop this instance's reference once.
+        if getattr(self, "_system", None) is None:
+            return
+        self._system = None
+        VideoCapture.release_system()
 
     def __del__(self):
         try:
@@ -124,27 +615,90 @@ class VideoCapture:
         except:
             return False
 
-    def read(self):
+    def read(self, with_record=False):
         """
         returns the next frame.
 
+        The image is copied out of the Spinnaker buffer, which is released
+        before returning. Use read_into() to avoid allocating a new array for
+        every frame.
+
+        Parameters
+        ----------
+        with_record : bool
+            return a FrameRecord carrying the frame ID, the device timestamp
+            and the host receive time instead of the bare image.
+
         Returns
         -------
         retval : bool
             false if no frames has been grabbed.
-        image : array_like 
+        image : array_like or FrameRecord
             grabbed image is returned here. If no image has been grabbed the image will be None.
         """
-        if not self.cam.IsStreaming():
-            self.cam.BeginAcquisition()
+        return self._read(None, with_record)
+
+    def read_into(self, out, with_record=False):
+        """
+        copies the next frame into a preallocated array.
+
+        The image payload is copied exactly once, into ``out``, and the
+        Spinnaker buffer is released right away. If the image does not match
+        the shape and dtype of ``out`` (for example after the pixel format was
+        changed) a newly allocated copy is returned instead.
+
+        Parameters
+        ----------
+        out : numpy.ndarray
+            destination array for the image.
+        with_record : bool
+            return a FrameRecord instead of the bare image.
+
+        Returns
+        -------
+        retval : bool
+            false if no frames has been grabbed.
+        image : array_like or FrameRecord
+            ``out`` (or the fallback copy) holding the grabbed image. None if
+            no image has been grabbed.
+        """
+        return self._read(out, with_record)
+
+    def _read(self, out, with_record):
+        self.start_stream()
 
         image = self.cam.GetNextImage()
-        if image.IsIncomplete():
-            return False, None
+        host_time = time.monotonic()
+        try:
+            if image.IsIncomplete():
+                return False, None
+
+            if self._packed:
+                img_NDArray = image.GetData().reshape(image.GetHeight(), -1)
+            else:
+                img_NDArray = image.GetNDArray()
+            if (
+                out is not None
+                and out.shape == img_NDArray.shape
+                and out.dtype == img_NDArray.dtype
+            ):
+                np.copyto(out, img_NDArray)
+                frame = out
+            else:
+                frame = img_NDArray.copy()
+            frame_id = image.GetFrameID()
+            timestamp = image.GetTimeStamp()
+        finally:
+            image.Release()
+
+        # Incomplete images never update the last ID, so they count as gaps
+        if self._last_frame_id is not None and frame_id > self._last_frame_id + 1:
+            self.frames_dropped += frame_id - self._last_frame_id - 1
+        self._last_frame_id = frame_id
 
-        img_NDArray = image.GetNDArray()
-        image.Release()
-        return True, img_NDArray
+        if with_record:
+            return True, FrameRecord(frame, frame_id, timestamp, host_time)
+        return True, frame
 
     def set(self, propId, value):
         """
@@ -162,47 +716,54 @@ class VideoCapture:
         retval : bool
            True if property setting success.
         """
-        # Exposure setting
-        if propId == cv2.CAP_PROP_EXPOSURE:
-            # Auto
-            if value < 0:
-                return self._set_ExposureAuto(PySpin.ExposureAuto_Continuous)
-
-            # Manual
-            ret = self._set_ExposureAuto(PySpin.ExposureAuto_Off)
-            if ret == False:
-                return False
-            return self._set_ExposureTime(value)
-
-        # Gain setting
-        if propId == cv2.CAP_PROP_GAIN:
-            # Auto
-            if value < 0:
-                return self._set_GainAuto(PySpin.GainAuto_Continuous)
+        setter = self._SETTERS.get(propId)
+        if setter is None or not self._valid_setting(propId, value):
+            return False
+        if not setter(self, value):
+            return False
+        self._applied[propId] = value
+        return True
 
-            # Manual
-            ret = self._set_GainAuto(PySpin.GainAuto_Off)
-            if ret == False:
-                return False
-            return self._set_Gain(value)
+    def apply_settings(self, settings):
+        """
+        Sets several properties at once.
 
-        # Brightness(EV) setting
-        if propId == cv2.CAP_PROP_BRIGHTNESS:
-            return self._set_Brightness(value)
+        Every value is validated before anything is written to the camera,
+        and properties whose node already reads the requested value are
+        skipped. The nodes are read rather than trusting the values written
+        last, which a power cycle or another application may have changed.
+        The frame rate is written first, as it bounds the exposure time.
 
-        # Gamma setting
-        if propId == cv2.CAP_PROP_GAMMA:
-            return self._set_Gamma(value)
+        Parameters
+        ----------
+        settings : dict
+            Values by cv2.VideoCaptureProperties identifier, as for set().
 
-        # FrameRate setting
-        if propId == cv2.CAP_PROP_FPS:
-            return self._set_FrameRate(value)
+        Returns
+        -------
+        retval : bool
+           True if every property was set. False, with nothing written, if
+           any property is unsupported or any value is invalid.
+        """
+        for propId, value in settings.items():
+            if propId not in self._SETTERS or not self._valid_setting(propId, value):
+                return False
 
-        # BackLigth setting
+        ordered = sorted(settings, key=lambda propId: propId != cv2.CAP_PROP_FPS)
+        success = True
+        for propId in ordered:
+            value = settings[propId]
+            getter = self._GETTERS.get(propId)
+            if getter is not None and getter(self) == value:
+                self._applied[propId] = value
+                continue
+            success = self.set(propId, value) and success
+        return success
+
+    def _valid_setting(self, propId, value):
         if propId == cv2.CAP_PROP_BACKLIGHT:
-            return self._set_BackLight(value)
-
-        return False
+            return value in (True, False)
+        return type(value) in (int, float)
 
     def get(self, propId):
         """
@@ -218,93 +779,90 @@ class VideoCapture:
         value : int or float or bool
            Value for the specified property. Value Flase is returned when querying a property that is not supported.
         """
-        if propId == cv2.CAP_PROP_EXPOSURE:
-            return self._get_ExposureTime()
-
-        if propId == cv2.CAP_PROP_GAIN:
-            return self._get_Gain()
+        getter = self._GETTERS.get(propId)
+        if getter is None:
+            return False
+        return getter(self)
 
-        if propId == cv2.CAP_PROP_BRIGHTNESS:
-            return self._get_Brightness()
+    def __clip(self, a, a_min, a_max):
+        return min(max(a, a_min), a_max)
 
-        if propId == cv2.CAP_PROP_GAMMA:
-            return self._get_Gamma()
+    def _set_clipped(self, name, value):
+        if not type(value) in (int, float):
+            return False
+        node = self._nodes.get(name)
+        if node is None:
+            return False
+        if name in self._limits:
+            value = self.__clip(value, *self._limits[name])
+        node.SetValue(value)
+        return True
 
-        if propId == cv2.CAP_PROP_FRAME_WIDTH:
-            return self._get_Width()
+    def _set_node(self, name, value):
+        node = self._nodes.get(name)
+        if node is None:
+            return False
+        node.SetValue(value)
+        return True
 
-        if propId == cv2.CAP_PROP_FRAME_HEIGHT:
-            return self._get_Height()
+    def _get_node(self, name):
+        node = self._nodes.get(name)
+        if node is None:
+            return False
+        return node.GetValue()
 
-        if propId == cv2.CAP_PROP_FPS:
-            return self._get_FrameRate()
+    def _set_Exposure(self, value):
+        # Auto
+        if value < 0:
+            return self._set_ExposureAuto(PySpin.ExposureAuto_Continuous)
 
-        if propId == cv2.CAP_PROP_TEMPERATURE:
-            return self._get_Temperature()
+        # Manual
+        ret = self._set_ExposureAuto(PySpin.ExposureAuto_Off)
+        if ret == False:
+            return False
+        return self._set_ExposureTime(value)
 
-        if propId == cv2.CAP_PROP_BACKLIGHT:
-            return self._get_BackLight()
+    def _set_ExposureTime(self, value):
+        ret = self._set_clipped("ExposureTime", value)
+        self._refresh_limits(COUPLED_NODES)
+        return ret
 
-        return False
+    def _set_ExposureAuto(self, value):
+        return self._set_node("ExposureAuto", value)
 
-    def __clip(self, a, a_min, a_max):
-        return min(max(a, a_min), a_max)
+    def _set_GainValue(self, value):
+        # Auto
+        if value < 0:
+            return self._set_GainAuto(PySpin.GainAuto_Continuous)
 
-    def _set_ExposureTime(self, value):
-        if not type(value) in (int, float):
+        # Manual
+        ret = self._set_GainAuto(PySpin.GainAuto_Off)
+        if ret == False:
             return False
-        exposureTime_to_set = self.__clip(
-            value, self.cam.ExposureTime.GetMin(), self.cam.ExposureTime.GetMax()
-        )
-        self.cam.ExposureTime.SetValue(exposureTime_to_set)
-        return True
-
-    def _set_ExposureAuto(self, value):
-        self.cam.ExposureAuto.SetValue(value)
-        return True
+        return self._set_Gain(value)
 
     def _set_Gain(self, value):
-        if not type(value) in (int, float):
-            return False
-        gain_to_set = self.__clip(value, self.cam.Gain.GetMin(), self.cam.Gain.GetMax())
-        self.cam.Gain.SetValue(gain_to_set)
-        return True
+        return self._set_clipped("Gain", value)
 
     def _set_GainAuto(self, value):
-        self.cam.GainAuto.SetValue(value)
-        return True
+        return self._set_node("GainAuto", value)
 
     def _set_Brightness(self, value):
-        if not type(value) in (int, float):
-            return False
-        brightness_to_set = self.__clip(
-            value,
-            self.cam.AutoExposureEVCompensation.GetMin(),
-            self.cam.AutoExposureEVCompensation.GetMax(),
-        )
-        self.cam.AutoExposureEVCompensation.SetValue(brightness_to_set)
-        return True
+        return self._set_clipped("AutoExposureEVCompensation", value)
 
     def _set_Gamma(self, value):
-        if not type(value) in (int, float):
-            return False
-        gamma_to_set = self.__clip(
-            value, self.cam.Gamma.GetMin(), self.cam.Gamma.GetMax()
-        )
-        self.cam.Gamma.SetValue(gamma_to_set)
-        return True
+        return self._set_clipped("Gamma", value)
 
     def _set_FrameRate(self, value):
         if not type(value) in (int, float):
             return False
-        self.cam.AcquisitionFrameRateEnable.SetValue(True)
-        fps_to_set = self.__clip(
-            value,
-            self.cam.AcquisitionFrameRate.GetMin(),
-            self.cam.AcquisitionFrameRate.GetMax(),
-        )
-        self.cam.AcquisitionFrameRate.SetValue(fps_to_set)
-        return True
+        if not self._set_node("AcquisitionFrameRateEnable", True):
+            return False
+        # Enabling the frame rate control changes its limits
+        self._refresh_limits(COUPLED_NODES)
+        ret = self._set_clipped("AcquisitionFrameRate", value)
+        self._refresh_limits(COUPLED_NODES)
+        return ret
 
     def _set_BackLight(self, value):
         if value == True:
@@ -313,35 +871,34 @@ class VideoCapture:
             backlight_to_set = PySpin.DeviceIndicatorMode_Inactive
         else:
             return False
-        self.cam.DeviceIndicatorMode.SetValue(backlight_to_set)
-        return True
+        return self._set_node("DeviceIndicatorMode", backlight_to_set)
 
     def _get_ExposureTime(self):
-        return self.cam.ExposureTime.GetValue()
+        return self._get_node("ExposureTime")
 
     def _get_Gain(self):
-        return self.cam.Gain.GetValue()
+        return self._get_node("Gain")
 
     def _get_Brightness(self):
-        return self.cam.AutoExposureEVCompensation.GetValue()
+        return self._get_node("AutoExposureEVCompensation")
 
     def _get_Gamma(self):
-        return self.cam.Gamma.GetValue()
+        return self._get_node("Gamma")
 
     def _get_Width(self):
-        return self.cam.Width.GetValue()
+        return self._get_node("Width")
 
     def _get_Height(self):
-        return self.cam.Height.GetValue()
+        return self._get_node("Height")
 
     def _get_FrameRate(self):
-        return self.cam.AcquisitionFrameRate.GetValue()
+        return self._get_node("AcquisitionFrameRate")
 
     def _get_Temperature(self):
-        return self.cam.DeviceTemperature.GetValue()
+        return self._get_node("DeviceTemperature")
 
     def _get_BackLight(self):
-        status = self.cam.DeviceIndicatorMode.GetValue()
+        status = self._get_node("DeviceIndicatorMode")
         return (
             True
             if status == PySpin.DeviceIndicatorMode_Active
@@ -350,6 +907,27 @@ class VideoCapture:
             else status
         )
 
+    _SETTERS = {
+        cv2.CAP_PROP_EXPOSURE: _set_Exposure,
+        cv2.CAP_PROP_GAIN: _set_GainValue,
+        cv2.CAP_PROP_BRIGHTNESS: _set_Brightness,
+        cv2.CAP_PROP_GAMMA: _set_Gamma,
+        cv2.CAP_PROP_FPS: _set_FrameRate,
+        cv2.CAP_PROP_BACKLIGHT: _set_BackLight,
+    }
+
+    _GETTERS = {
+        cv2.CAP_PROP_EXPOSURE: _get_ExposureTime,
+        cv2.CAP_PROP_GAIN: _get_Gain,
+        cv2.CAP_PROP_BRIGHTNESS: _get_Brightness,
+        cv2.CAP_PROP_GAMMA: _get_Gamma,
+        cv2.CAP_PROP_FRAME_WIDTH: _get_Width,
+        cv2.CAP_PROP_FRAME_HEIGHT: _get_Height,
+        cv2.CAP_PROP_FPS: _get_FrameRate,
+        cv2.CAP_PROP_TEMPERATURE: _get_Temperature,
+        cv2.CAP_PROP_BACKLIGHT: _get_BackLight,
+    }
+
 
 def main():
     import argparse
@@ -371,6 +949,19 @@ def main():
     parser.add_argument("-G", "--gamma", type=float, help="Gamma value")
     parser.add_argument("-b", "--brightness", type=float, help="Brightness [EV]")
     parser.add_argument("-f", "--fps", type=float, help="FrameRate [fps]")
+    parser.add_argument(
+        "--binning", type=int, default=1, help="Binning factor (Default: 1)"
+    )
+    parser.add_argument(
+        "--decimation", type=int, default=1, help="Decimation factor (Default: 1)"
+    )
+    parser.add_argument(
+        "--roi",
+        type=int,
+        nargs=4,
+        metavar=("X", "Y", "WIDTH", "HEIGHT"),
+        help="Region of interest (Default: whole image)",
+    )
     parser.add_argument(
         "-s",
         "--scale",
@@ -386,6 +977,17 @@ def main():
         print("Camera can't open\nexit")
         return -1
 
+    if not cap.set_binning(args.binning, args.decimation):
+        print("Binning or decimation not supported")
+    if not cap.set_roi(args.roi):
+        print("Region of interest does not fit the image")
+    print(
+        "image size  :",
+        cap.get(cv2.CAP_PROP_FRAME_WIDTH),
+        "x",
+        cap.get(cv2.CAP_PROP_FRAME_HEIGHT),
+    )
+
     cap.set(cv2.CAP_PROP_EXPOSURE, args.exposure)  # -1 sets exposure_time to auto
     cap.set(cv2.CAP_PROP_GAIN, args.gain)  # -1 sets gain to auto
     if args.gamma is not None:
@@ -4,9 +4,12 @@ The real implementation requires the proprietary ``PySpin`` package which is
 not available in all environments.  Importing this package directly would raise
 ``ModuleNotFoundError`` during test collection.  To keep imports from this
 module working we attempt to pull in the real implementation but fall back to a
-stub that simply raises ``ImportError`` when used.
+stub that simply raises ``ImportError`` when used.  ``FrameRecord`` does not
+depend on PySpin and is always available.
 """
 
+from .record import FrameRecord
+
 try:  # pragma: no cover - exercised implicitly during import
     from .EasyPySpin import VideoCapture  # type: ignore
 except Exception:  # pragma: no cover - PySpin not installed
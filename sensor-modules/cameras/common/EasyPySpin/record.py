@@ -0,0 +1,30 @@
+"""Frame record returned by ``VideoCapture.read(with_record=True)``.
+
+Kept free of the ``PySpin`` import so that other capture backends can build
+the same records when the Spinnaker SDK is not installed.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+
+class FrameRecord(NamedTuple):
+    """A grabbed image together with its timing information.
+
+    Attributes
+    ----------
+    image : array_like
+        grabbed image.
+    frame_id : int
+        frame ID reported by the camera, or -1 if unknown.
+    timestamp : int
+        device timestamp of the image in nanoseconds, or -1 if unknown.
+    host_time : float
+        host ``time.monotonic()`` at which the image was received.
+    """
+
+    image: np.ndarray
+    frame_id: int
+    timestamp: int
+    host_time: float
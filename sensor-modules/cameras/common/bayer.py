@@ -0,0 +1,202 @@
+"""Raw Bayer frames and their deferred debayering.
+
+Colour cameras set to a Bayer ``PIXEL_FORMAT`` deliver the sensor mosaic,
+one sample per pixel, instead of interpolated colour: a third of the bytes of
+``BGR8``, so the rolling buffer holds three times as many frames and events
+write three times as fast.  12-bit formats are kept bit-packed as delivered,
+two pixels in three bytes, in frames of ``width * 3 // 2`` bytes per row.
+
+Events store the mosaic unchanged, with the pixel format in their metadata
+(``frames.csv`` or the archive index), and are converted to colour on demand
+with :func:`debayer`, or in batch by running this module::
+
+    python common/bayer.py /data/2024-01-01-00-00-00.frames --output colour/
+"""
+
+import csv
+import os
+import re
+from typing import Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from event_archive import ARCHIVE_TYPE, EventArchiveReader
+from event_writer import METADATA_FILE
+
+# OpenCV conversions by the colours of the top left 2x2 block of the sensor
+BAYER_CODES = {
+    "RG": cv2.COLOR_BayerRGGB2BGR,
+    "GR": cv2.COLOR_BayerGRBG2BGR,
+    "GB": cv2.COLOR_BayerGBRG2BGR,
+    "BG": cv2.COLOR_BayerBGGR2BGR,
+}
+
+_BAYER_FORMAT = re.compile(r"Bayer(RG|GR|GB|BG)(8|10|12|16)(p|Packed)?")
+
+
+def parse_bayer(pixel_format: Optional[str]) -> Optional[Tuple[str, int, str]]:
+    """Return ``(pattern, bits, packing)`` of a Bayer format, else ``None``.
+
+    ``packing`` is ``"p"`` for the LSB first packing of current cameras,
+    ``"Packed"`` for the older MSB first one and ``""`` for byte aligned
+    samples.
+    """
+    match = _BAYER_FORMAT.fullmatch(pixel_format or "")
+    if match is None:
+        return None
+    pattern, bits, packing = match.groups()
+    return pattern, int(bits), packing or ""
+
+
+def is_packed(pixel_format: Optional[str]) -> bool:
+    """Whether frames of ``pixel_format`` are bit-packed 12-bit samples."""
+    parsed = parse_bayer(pixel_format)
+    return parsed is not None and parsed[1] == 12 and bool(parsed[2])
+
+
+def unpack12(packed: np.ndarray, lsb_first: bool = True) -> np.ndarray:
+    """Unpack rows of 12-bit samples, two per three bytes, to ``uint16``.
+
+    ``lsb_first`` selects the ``p`` layout (the first byte holds the low
+    bits of the first sample), otherwise the legacy ``Packed`` layout.
+    """
+    height = packed.shape[0]
+    triplets = packed.reshape(height, -1, 3).astype(np.uint16)
+    b0, b1, b2 = triplets[..., 0], triplets[..., 1], triplets[..., 2]
+    out = np.empty((height, triplets.shape[1] * 2), dtype=np.uint16)
+    if lsb_first:
+        out[:, 0::2] = b0 | (b1 & 0x0F) << 8
+        out[:, 1::2] = b1 >> 4 | b2 << 4
+    else:
+        out[:, 0::2] = b0 << 4 | b1 & 0x0F
+        out[:, 1::2] = b2 << 4 | b1 >> 4
+    return out
+
+
+def pack12(samples: np.ndarray, lsb_first: bool = True) -> np.ndarray:
+    """Pack 12-bit ``samples`` of even width, the inverse of :func:`unpack12`."""
+    samples = samples.astype(np.uint16)
+    first, second = samples[:, 0::2], samples[:, 1::2]
+    packed = np.empty((samples.shape[0], first.shape[1], 3), dtype=np.uint8)
+    if lsb_first:
+        packed[..., 0] = first & 0xFF
+        packed[..., 1] = (first >> 8 & 0x0F) | (second & 0x0F) << 4
+        packed[..., 2] = second >> 4
+    else:
+        packed[..., 0] = first >> 4
+        packed[..., 1] = (first & 0x0F) | (second & 0x0F) << 4
+        packed[..., 2] = second >> 4
+    return packed.reshape(samples.shape[0], -1)
+
+
+def debayer(frame: np.ndarray, pixel_format: str) -> np.ndarray:
+    """Interpolate a raw ``pixel_format`` mosaic to a BGR image.
+
+    8-bit formats give ``uint8`` images; deeper ones give ``uint16`` images
+    scaled to the full 16-bit range.
+    """
+    parsed = parse_bayer(pixel_format)
+    if parsed is None:
+        raise ValueError(f"not a Bayer pixel format: {pixel_format}")
+    pattern, bits, packing = parsed
+    if is_packed(pixel_format):
+        frame = unpack12(frame, lsb_first=packing == "p")
+    elif packing:
+        raise ValueError(f"unsupported packed pixel format: {pixel_format}")
+    if frame.dtype == np.uint16 and bits < 16:
+        frame = frame << (16 - bits)
+    return cv2.cvtColor(np.ascontiguousarray(frame), BAYER_CODES[pattern])
+
+
+def event_frames(
+    path: str, pixel_format: Optional[str] = None
+) -> Iterator[Tuple[str, np.ndarray, Optional[str]]]:
+    """Yield ``(name, frame, pixel_format)`` for every frame of an event.
+
+    The pixel format recorded with the event is used unless ``pixel_format``
+    is given, for events written before it was recorded.
+    """
+    if path.endswith(ARCHIVE_TYPE):
+        with EventArchiveReader(path) as reader:
+            for index in range(len(reader)):
+                entry = reader.metadata(index)
+                yield (
+                    entry.get("name", f"img_{index}"),
+                    reader.frame(index),
+                    pixel_format or entry.get("pixel_format"),
+                )
+        return
+
+    formats = {}
+    metadata = os.path.join(path, METADATA_FILE)
+    if os.path.exists(metadata):
+        with open(metadata, newline="") as f:
+            for row in csv.DictReader(f):
+                formats[row["name"]] = row.get("pixel_format") or None
+    for entry in sorted(os.listdir(path)):
+        name, ext = os.path.splitext(entry)
+        if not re.fullmatch(r"img_\d+", name):
+            continue
+        frame = cv2.imread(os.path.join(path, entry), cv2.IMREAD_UNCHANGED)
+        yield name, frame, pixel_format or formats.get(name)
+
+
+def debayer_event(
+    path: str,
+    output: str,
+    img_type: str = ".png",
+    pixel_format: Optional[str] = None,
+) -> int:
+    """Write every frame of the event at ``path`` to ``output`` in colour.
+
+    Frames that are not raw Bayer are written unchanged.  Returns the
+    number of frames written.
+    """
+    os.makedirs(output, exist_ok=True)
+    written = 0
+    for name, frame, frame_format in event_frames(path, pixel_format):
+        if frame is None:
+            continue
+        if parse_bayer(frame_format) is not None:
+            frame = debayer(frame, frame_format)
+        if cv2.imwrite(os.path.join(output, name + img_type), frame):
+            written += 1
+    return written
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Debayer the raw frames of recorded events"
+    )
+    parser.add_argument(
+        "events", nargs="+", help="Event directories or .frames archives"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=".",
+        help="Directory to write one sub-directory per event to (Default: .)",
+    )
+    parser.add_argument(
+        "-t", "--type", default=".png", help="Output image type (Default: .png)"
+    )
+    parser.add_argument(
+        "--pixel-format",
+        help="Pixel format of events that do not record one, e.g. BayerRG8",
+    )
+    args = parser.parse_args()
+
+    for path in args.events:
+        name = os.path.basename(os.path.normpath(path))
+        if name.endswith(ARCHIVE_TYPE):
+            name = name[: -len(ARCHIVE_TYPE)]
+        output = os.path.join(args.output, name)
+        count = debayer_event(path, output, args.type, args.pixel_format)
+        print(f"{path}: {count} frames -> {output}")
+
+
+if __name__ == "__main__":
+    main()
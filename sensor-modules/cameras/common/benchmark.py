@@ -0,0 +1,356 @@
+"""Benchmark capture-to-disk throughput and event latency without a camera.
+
+Every scenario runs the shared :class:`Camera` with a camera's own
+``config.py`` on the :mod:`camera_backends` synthetic backend, overriding
+the image type, rolling buffer size, resolution and frame rate, and
+measures:
+
+* ``capture_fps``: frames buffered per second by the capture loop;
+* ``flush_s_per_frame`` and ``flush_s_per_mb``: time to write a full buffer
+  as one event, per frame and per MB of raw frames;
+* ``first_file_latency_s``: time from the trigger to the first file of the
+  event appearing on disk;
+* ``peak_rss_mb`` and ``writer_peak_rss_mb``: peak resident memory of the
+  capture process and of its writer process.
+
+Each scenario runs in a fresh process so that peak memory is its own.
+Results are written as JSON, and ``--baseline`` compares them with an
+earlier run and exits non-zero on regressions::
+
+    python common/benchmark.py bubblecam --img-types .png .frames \\
+        --buffer-sizes 40 150 --output results.json --baseline previous.json
+"""
+
+import datetime
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from types import SimpleNamespace
+from typing import Dict, List, Sequence, Tuple
+
+from camera import Camera
+from orchestrator import load_config
+from state import State
+
+# Metrics compared against a baseline and whether higher values are better
+METRICS = {
+    "capture_fps": True,
+    "flush_s_per_frame": False,
+    "flush_s_per_mb": False,
+    "first_file_latency_s": False,
+    "peak_rss_mb": False,
+    "writer_peak_rss_mb": False,
+}
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """One combination of the benchmarked settings."""
+
+    img_type: str
+    buffer_size: int
+    resolution: Tuple[int, int]
+    fps: float
+    writer_process: bool
+
+    def key(self) -> str:
+        width, height = self.resolution
+        writer = "process" if self.writer_process else "inline"
+        return (
+            f"{self.img_type}/{self.buffer_size}/{width}x{height}"
+            f"/{self.fps:g}fps/{writer}"
+        )
+
+
+def scenario_config(scenario: Scenario, camera: str, img_dir: str) -> SimpleNamespace:
+    """``camera``'s configuration with the settings of ``scenario``."""
+    module = load_config(camera)
+    config = SimpleNamespace(
+        **{name: value for name, value in vars(module).items() if name.isupper()}
+    )
+    config.IMG_DIR = img_dir
+    config.IMG_TYPE = scenario.img_type
+    config.ROLL_BUF_SIZE = scenario.buffer_size
+    config.FPS = scenario.fps
+    config.WRITER_PROCESS = scenario.writer_process
+    # A whole buffer is flushed as one event, without waiting on new frames
+    config.PRE_TRIGGER_FRAMES = scenario.buffer_size
+    config.POST_TRIGGER_FRAMES = 0
+    config.SYNC_ROLE = None
+    config.CAMERA_BACKEND = "synthetic"
+    config.CAMERA_BACKEND_OPTIONS = {"resolution": scenario.resolution}
+    config.STORAGE_QUOTA = None
+    config.STORAGE_MIN_FREE = 0
+    # Measured on its own by ``python common/wavebreak.py``
+    config.WAVEBREAK_DETECTION = False
+    return config
+
+
+def _wait_for_seq(buffer, seq: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while buffer.seq < seq:
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+def _first_file(dtime_path: str, img_type: str) -> bool:
+    if os.path.exists(dtime_path + img_type):
+        return True
+    try:
+        with os.scandir(dtime_path) as entries:
+            return any(entry.name.endswith(img_type) for entry in entries)
+    except FileNotFoundError:
+        return False
+
+
+def _timed_event(camera: Camera, buffer, lock, name: str) -> Tuple[float, float]:
+    """Write one event; return the first-file latency and the flush time."""
+    dtime_path = os.path.join(camera.config.IMG_DIR, name)
+    start = time.monotonic()
+    thread = threading.Thread(
+        target=camera.write_images, args=(buffer, lock, name), daemon=True
+    )
+    thread.start()
+    latency = None
+    while latency is None and thread.is_alive():
+        if _first_file(dtime_path, camera.config.IMG_TYPE):
+            latency = time.monotonic() - start
+        else:
+            time.sleep(0.0005)
+    thread.join()
+    flush = time.monotonic() - start
+    return (flush if latency is None else latency), flush
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def run_scenario(
+    scenario: Scenario, camera: str, duration: float = 5.0, events: int = 3
+) -> Dict[str, object]:
+    """Run ``scenario`` in this process and return its measurements."""
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as img_dir:
+        config = scenario_config(scenario, camera, img_dir)
+        cam = Camera(camera, config)
+        buffer = cam.create_buffer()
+        lock = threading.Lock()
+        threading.Thread(
+            target=cam.capture_loop, args=(buffer, lock), daemon=True
+        ).start()
+        try:
+            # Fill the buffer first so every event is a full one
+            fill_timeout = 2 * scenario.buffer_size / scenario.fps + 5
+            if not _wait_for_seq(buffer, scenario.buffer_size, fill_timeout):
+                raise RuntimeError("capture did not fill the buffer")
+            seq, start = buffer.seq, time.monotonic()
+            time.sleep(duration)
+            capture_fps = (buffer.seq - seq) / (time.monotonic() - start)
+
+            latencies, flushes = [], []
+            for index in range(events):
+                cam.lockout_until = 0.0
+                latency, flush = _timed_event(cam, buffer, lock, f"event-{index}")
+                latencies.append(latency)
+                flushes.append(flush)
+                _wait_for_seq(buffer, buffer.seq + scenario.buffer_size, fill_timeout)
+            frame_mb = buffer.frame_nbytes / 1e6
+        finally:
+            cam.set_state(State.QUIESCENT)
+            cam.power_off()
+            if hasattr(buffer, "close"):
+                # Unlinks the shared memory of the writer process buffer
+                buffer.close()
+
+    flush = statistics.median(flushes)
+    return dict(
+        scenario=asdict(scenario),
+        key=scenario.key(),
+        capture_fps=capture_fps,
+        flush_s=flush,
+        flush_s_per_frame=flush / scenario.buffer_size,
+        flush_s_per_mb=flush / (scenario.buffer_size * frame_mb),
+        first_file_latency_s=statistics.median(latencies),
+        first_file_latency_max_s=max(latencies),
+        peak_rss_mb=_peak_rss_mb(resource.RUSAGE_SELF),
+        writer_peak_rss_mb=(
+            _peak_rss_mb(resource.RUSAGE_CHILDREN) if scenario.writer_process else None
+        ),
+    )
+
+
+def _scenario_main(results, *args) -> None:
+    try:
+        results.put(run_scenario(*args))
+    except Exception as exc:
+        results.put(dict(error=repr(exc)))
+
+
+def run_isolated(
+    scenario: Scenario, camera: str, duration: float, events: int
+) -> Dict[str, object]:
+    """Run ``scenario`` in a fresh process, so peak memory is its own."""
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    # Not a pool: the scenario may start a writer process of its own
+    process = ctx.Process(
+        target=_scenario_main, args=(results, scenario, camera, duration, events)
+    )
+    process.start()
+    result = results.get()
+    process.join()
+    if "error" in result:
+        raise RuntimeError(f"{scenario.key()}: {result['error']}")
+    return result
+
+
+def compare(
+    results: Sequence[dict], baseline: Sequence[dict], tolerance: float = 0.1
+) -> List[str]:
+    """Describe every metric more than ``tolerance`` worse than ``baseline``.
+
+    Scenarios are matched by key; those missing from either run are skipped.
+    """
+    previous = {result["key"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result["key"])
+        if before is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            if worse > tolerance:
+                regressions.append(
+                    f"{result['key']}: {metric} {old:.4g} -> {new:.4g} "
+                    f"({change:+.0%})"
+                )
+    return regressions
+
+
+def _environment() -> Dict[str, str]:
+    return dict(
+        time=datetime.datetime.now().isoformat(timespec="seconds"),
+        host=platform.node(),
+        platform=platform.platform(),
+        python=platform.python_version(),
+        cpus=str(os.cpu_count()),
+    )
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark capture and event writing on a synthetic camera"
+    )
+    parser.add_argument(
+        "camera", help="Camera directory to load config.py from, e.g. bubblecam"
+    )
+    parser.add_argument(
+        "--img-types",
+        nargs="+",
+        default=[".png", ".jpg", ".frames"],
+        help="Image types to write (Default: .png .jpg .frames)",
+    )
+    parser.add_argument(
+        "--buffer-sizes",
+        nargs="+",
+        type=int,
+        default=[40, 150],
+        help="Rolling buffer sizes in frames (Default: 40 150)",
+    )
+    parser.add_argument(
+        "--resolution",
+        nargs=2,
+        type=int,
+        default=[1440, 1080],
+        metavar=("WIDTH", "HEIGHT"),
+        help="Synthetic frame size (Default: 1440 1080)",
+    )
+    parser.add_argument(
+        "--fps",
+        type=float,
+        help="Synthetic frame rate (Default: the camera's FPS)",
+    )
+    parser.add_argument(
+        "--writer",
+        choices=("config", "process", "inline", "both"),
+        default="config",
+        help="Write events in the writer process, inline or both "
+        "(Default: as configured)",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=5.0,
+        help="Seconds of capture measured per scenario (Default: 5)",
+    )
+    parser.add_argument(
+        "--events", type=int, default=3, help="Events written per scenario (Default: 3)"
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Relative change reported as a regression (Default: 0.1)",
+    )
+    args = parser.parse_args()
+
+    config = load_config(args.camera)
+    fps = args.fps or config.FPS
+    writers = {
+        "config": [config.WRITER_PROCESS],
+        "process": [True],
+        "inline": [False],
+        "both": [True, False],
+    }[args.writer]
+
+    results = []
+    for img_type, buffer_size, writer_process in itertools.product(
+        args.img_types, args.buffer_sizes, writers
+    ):
+        scenario = Scenario(
+            img_type, buffer_size, tuple(args.resolution), fps, writer_process
+        )
+        result = run_isolated(scenario, args.camera, args.duration, args.events)
+        results.append(result)
+        print(
+            f"{scenario.key()}: {result['capture_fps']:.1f} fps, "
+            f"{result['flush_s_per_frame'] * 1000:.2f} ms/frame, "
+            f"{result['flush_s_per_mb'] * 1000:.2f} ms/MB, "
+            f"first file {result['first_file_latency_s'] * 1000:.1f} ms, "
+            f"{result['peak_rss_mb']:.0f} MB RSS"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(dict(environment=_environment(), results=results), f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,38 @@
-from typing import Callable, Deque, Union
+from typing import Callable, Deque, Optional, Tuple, Union
 
 import cv2
 import time
 
+from EasyPySpin import FrameRecord
+from camera_backends import CAMERA_BACKENDS, open_backend
+
 try:  # EasyPySpin depends on the proprietary PySpin bindings
     from EasyPySpin import VideoCapture as SpinVideoCapture
 except Exception:  # pragma: no cover - PySpin not installed
     SpinVideoCapture = None
 
 
+# Recovery steps taken by ``Cam.recover``, in order of escalation
+RETRY = "retry"
+RESTART_STREAM = "restart_stream"
+REINITIALIZE = "reinitialize"
+REOPEN = "reopen"
+RECOVERY_STEPS = (RETRY, RESTART_STREAM, REINITIALIZE, REOPEN)
+
+
 class Cam:
-    """Basic camera wrapper used by the BubbleCam workflow."""
+    """Basic camera wrapper used by the BubbleCam workflow.
+
+    ``backend`` is ``"spinnaker"`` for FLIR cameras, with a fallback to
+    :class:`cv2.VideoCapture`, or one of the :mod:`camera_backends` used
+    without hardware, opened with ``backend_options``.
+
+    ``binning`` and ``decimation`` shrink frames on the sensor and ``roi``
+    ``(offset_x, offset_y, width, height)`` crops the resulting image, so
+    fewer bytes per frame cross the bus and reach the buffer and the disk.
+    ``pixel_format`` selects for example raw Bayer frames (see :mod:`bayer`);
+    ``None`` keeps the camera's own format.
+    """
 
     def __init__(
         self,
@@ -23,10 +45,24 @@ class Cam:
         gamma: float,
         fps: int,
         backlight: int,
-        event_delay: int,
         image_type: str,
         buffer_size: int,
+        stream_buffer_mode: str = "NewestOnly",
+        stream_buffer_count: Optional[int] = None,
+        recovery_retries: int = 3,
+        recovery_backoff: float = 0.5,
+        recovery_backoff_max: float = 30.0,
+        sync_role: Optional[str] = None,
+        sync_line: str = "Line2",
+        backend: str = "spinnaker",
+        backend_options: Optional[dict] = None,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+        binning: int = 1,
+        decimation: int = 1,
+        pixel_format: Optional[str] = None,
     ) -> None:
+        if backend not in CAMERA_BACKENDS:
+            raise ValueError(f"unknown camera backend: {backend}")
         self.name = name
         self.capture_function = capture_function
         self.camera_id = camera_id
@@ -36,12 +72,38 @@ class Cam:
         self.gamma = gamma
         self.fps = fps
         self.backlight = backlight
-        self.event_delay = event_delay
         self.image_type = image_type
         self.buffer_size = buffer_size
+        self.stream_buffer_mode = stream_buffer_mode
+        self.stream_buffer_count = stream_buffer_count
+        self.recovery_retries = recovery_retries
+        self.recovery_backoff = recovery_backoff
+        self.recovery_backoff_max = recovery_backoff_max
+        self.sync_role = sync_role
+        self.sync_line = sync_line
+        self.backend = backend
+        self.backend_options = backend_options or {}
+        self.roi = None if roi is None else tuple(roi)
+        self.binning = binning
+        self.decimation = decimation
+        self.pixel_format = pixel_format
 
         self.camera = None
-        self._open_camera()
+        # Frames counted locally for cameras that do not report frame IDs
+        self._frame_count = 0
+        # Recovery state, see ``recover``
+        self._failures = 0
+        self._failed_since: Optional[float] = None
+        self._escalation = 0
+        self._reopens = 0
+        self._last_step: Optional[str] = None
+        # Reference to the shared Spinnaker system held until ``power_off``
+        self._system_retained = False
+        try:
+            self._open_camera()
+        except Exception:
+            self.power_off()
+            raise
 
     def start_workflow(self, buffer: Deque, lock) -> None:
         """Start capturing images using ``capture_function``."""
@@ -53,8 +115,72 @@ class Cam:
             return False, None
         return self.camera.read()
 
+    def capture_record(self, out=None):
+        """Capture a single frame as a :class:`FrameRecord`.
+
+        If ``out`` is given the frame is copied straight into it when its
+        shape and dtype match; otherwise ``record.image`` is a new array.
+        Spinnaker cameras report their own frame ID and timestamp.  Other
+        cameras get a locally counted frame ID and no device timestamp.
+        """
+        if self.camera is None or not self.camera.isOpened():
+            return False, None
+        if self._is_spinnaker():
+            if out is not None:
+                return self.camera.read_into(out, with_record=True)
+            return self.camera.read(with_record=True)
+
+        success, frame = self.camera.read(out)
+        host_time = time.monotonic()
+        if not success:
+            return False, None
+        self._frame_count += 1
+        return True, FrameRecord(frame, self._frame_count, -1, host_time)
+
+    def _is_spinnaker(self) -> bool:
+        return SpinVideoCapture is not None and isinstance(
+            self.camera, SpinVideoCapture
+        )
+
+    @property
+    def frames_dropped(self) -> int:
+        """Frames missing from the frame ID sequence since the camera opened."""
+        if self._is_spinnaker():
+            return self.camera.frames_dropped
+        return 0
+
+    def dropped_frames(self) -> int:
+        """Frames dropped since open, including transport layer statistics."""
+        if self._is_spinnaker():
+            return self.camera.dropped_frames()
+        return 0
+
+    def stream_statistics(self) -> dict:
+        """Transport layer stream counters, empty for non-Spinnaker cameras."""
+        if self._is_spinnaker():
+            return self.camera.get_stream_statistics()
+        return {}
+
+    def pause(self) -> None:
+        """Stop streaming frames, keeping the camera open and configured."""
+        if self._is_spinnaker():
+            self.camera.stop_stream()
+
+    def resume(self) -> None:
+        """Start streaming after :meth:`pause` or :meth:`power_off`."""
+        if self.camera is None:
+            self._open_camera()
+        if self._is_spinnaker():
+            self.camera.start_stream()
+
     def power_off(self) -> None:
-        """Release the camera handle."""
+        """Release the camera handle and the Spinnaker system."""
+        self._close_camera()
+        if self._system_retained:
+            self._system_retained = False
+            SpinVideoCapture.release_system()
+
+    def _close_camera(self) -> None:
         if self.camera is not None:
             try:
                 self.camera.release()
@@ -65,38 +191,215 @@ class Cam:
             finally:
                 self.camera = None
 
+    def settings(self) -> dict:
+        """Configured camera properties by ``cv2.CAP_PROP_*`` identifier."""
+        settings = {
+            cv2.CAP_PROP_EXPOSURE: self.exposure,
+            cv2.CAP_PROP_GAIN: self.gain,
+            cv2.CAP_PROP_BRIGHTNESS: self.brightness,
+            cv2.CAP_PROP_GAMMA: self.gamma,
+            cv2.CAP_PROP_FPS: self.fps,
+            cv2.CAP_PROP_BACKLIGHT: self.backlight,
+        }
+        if self.sync_role == "slave":
+            # Slaves run at the master's frame rate
+            del settings[cv2.CAP_PROP_FPS]
+        return settings
+
+    def _set_format(self, camera) -> bool:
+        """Apply the pixel format, binning, decimation and region of interest.
+
+        The pixel format goes first, as it sets the increments of the others.
+        """
+        if self.pixel_format is not None and not (
+            hasattr(camera, "set_pixel_format")
+            and camera.set_pixel_format(self.pixel_format)
+        ):
+            return False
+        if hasattr(camera, "set_roi"):
+            return camera.set_binning(self.binning, self.decimation) and (
+                camera.set_roi(self.roi)
+            )
+        # Other cameras can at most be asked for a smaller frame size
+        if self.binning != 1 or self.decimation != 1:
+            return False
+        if self.roi is None:
+            return True
+        offset_x, offset_y, width, height = self.roi
+        return (
+            offset_x == offset_y == 0
+            and bool(camera.set(cv2.CAP_PROP_FRAME_WIDTH, width))
+            and bool(camera.set(cv2.CAP_PROP_FRAME_HEIGHT, height))
+        )
+
+    def _configure(self, camera) -> None:
+        """Apply the format, settings and sync role to a Spinnaker camera.
+
+        Raises :class:`RuntimeError` naming the first one it refuses.
+        """
+        # Always set, as a previous run may have left a smaller image.  The
+        # frame size bounds the frame rate, so it goes first.
+        if not self._set_format(camera):
+            raise RuntimeError(
+                f"could not capture region {self.roi} in {self.pixel_format}"
+            )
+        # Validated up front and written in one pass
+        if not camera.apply_settings(self.settings()):
+            raise RuntimeError(f"could not apply camera settings {self.settings()}")
+        # Always set, as a previous run may have left a trigger on
+        if not camera.set_sync_role(self.sync_role, self.sync_line):
+            raise RuntimeError(f"could not configure {self.sync_role} sync")
+
     def _open_camera(self) -> None:
-        """(Re)initialize the camera with the configured parameters."""
+        """(Re)initialize the camera with the configured parameters.
+
+        A Spinnaker camera that refuses its configuration is released and
+        the error raised; only without PySpin or a Spinnaker camera at
+        ``camera_id`` is :class:`cv2.VideoCapture` used instead.
+        """
+        settings = self.settings()
+        if self.backend != "spinnaker":
+            camera = open_backend(self.backend, self.fps, self.backend_options)
+            if not self._set_format(camera):
+                camera.release()
+                raise ValueError(
+                    f"{self.backend} backend cannot capture region {self.roi} "
+                    f"with binning {self.binning}, decimation {self.decimation} "
+                    f"and pixel format {self.pixel_format}"
+                )
+            self.camera = camera
+            for prop, value in settings.items():
+                self.camera.set(prop, value)
+            return
         if SpinVideoCapture is not None:
+            camera = None
             try:
-                self.camera = SpinVideoCapture(self.camera_id)
-                self.camera.set(cv2.CAP_PROP_EXPOSURE, self.exposure)
-                self.camera.set(cv2.CAP_PROP_GAIN, self.gain)
-                self.camera.set(cv2.CAP_PROP_BRIGHTNESS, self.brightness)
-                self.camera.set(cv2.CAP_PROP_GAMMA, self.gamma)
-                self.camera.set(cv2.CAP_PROP_FPS, self.fps)
-                self.camera.set(cv2.CAP_PROP_BACKLIGHT, self.backlight)
-                return
+                if not self._system_retained:
+                    # Kept across reopens so that recovery reuses the system
+                    SpinVideoCapture.retain_system()
+                    self._system_retained = True
+                camera = SpinVideoCapture(
+                    self.camera_id, self.stream_buffer_mode, self.stream_buffer_count
+                )
             except Exception:
+                # No Spinnaker system or camera to open
                 pass
+            if camera is not None and camera.isOpened():
+                try:
+                    self._configure(camera)
+                except Exception:
+                    camera.release()
+                    raise
+                self.camera = camera
+                return
+            if camera is not None:
+                camera.release()
         self.camera = cv2.VideoCapture(self.camera_id)
-        self.camera.set(cv2.CAP_PROP_EXPOSURE, self.exposure)
-        self.camera.set(cv2.CAP_PROP_GAIN, self.gain)
-        self.camera.set(cv2.CAP_PROP_BRIGHTNESS, self.brightness)
-        self.camera.set(cv2.CAP_PROP_GAMMA, self.gamma)
-        self.camera.set(cv2.CAP_PROP_FPS, self.fps)
-        self.camera.set(cv2.CAP_PROP_BACKLIGHT, self.backlight)
+        # Best effort, like the other settings
+        self._set_format(self.camera)
+        for prop, value in settings.items():
+            self.camera.set(prop, value)
+
+    def reconfigure(self, **changes) -> bool:
+        """Change camera properties without reopening the camera.
+
+        Keyword arguments are attribute names such as ``exposure`` or
+        ``fps``.  Only properties whose value changed are written.
+        """
+        for name, value in changes.items():
+            if not hasattr(self, name):
+                raise AttributeError(f"unknown camera property: {name}")
+            setattr(self, name, value)
+        if self._is_spinnaker():
+            return self.camera.apply_settings(self.settings())
+        success = True
+        for prop, value in self.settings().items():
+            success = bool(self.camera.set(prop, value)) and success
+        return success
 
     def reset(self) -> None:
         """Reset the camera connection."""
-        # Safely power off the existing camera and attempt to reopen it.  Any
-        # exceptions during shutdown are swallowed so that the caller can
+        # Any exceptions during shutdown are swallowed so that the caller can
         # decide how to proceed if the camera is no longer available (for
         # example, it may have been unplugged).
-        self.power_off()
-        time.sleep(0.5)
         try:
-            self._open_camera()
+            self._reopen()
         except Exception:
             # Leave ``self.camera`` as ``None`` if reinitialisation fails.
             pass
+
+    def _reopen(self) -> None:
+        """Close and open the camera, keeping the Spinnaker system warm."""
+        self._close_camera()
+        self._open_camera()
+
+    def recover(self, transient: bool = True) -> str:
+        """Take the next recovery step after a failed capture.
+
+        Failed reads are retried ``recovery_retries`` times when
+        ``transient`` (for example an incomplete image), then the stream is
+        restarted, the camera reinitialized with its format, settings and
+        sync role applied again, and finally reopened, right away if that
+        configuration is refused.  Reopens repeat with an exponential backoff
+        of ``recovery_backoff`` seconds up to ``recovery_backoff_max`` so that
+        a missing camera does not flood the bus.  Returns the step taken, one of :data:`RECOVERY_STEPS`.
+        """
+        if self._failed_since is None:
+            self._failed_since = time.monotonic()
+        self._failures += 1
+
+        if self._escalation == 0:
+            if transient and self._failures <= self.recovery_retries:
+                self._last_step = RETRY
+                return RETRY
+            # The stream and the Spinnaker handle can only be reused for
+            # Spinnaker cameras
+            self._escalation = 1 if self._is_spinnaker() else 3
+
+        step = RECOVERY_STEPS[self._escalation]
+        self._escalation = min(self._escalation + 1, len(RECOVERY_STEPS) - 1)
+        if step == REINITIALIZE:
+            try:
+                self.camera.reinitialize()
+                # Reinitializing leaves the nodes at their power-on values
+                self._configure(self.camera)
+            except Exception:
+                # Capturing with the wrong format or sync role is worse than
+                # not capturing, so reopen right away
+                step = REOPEN
+        self._last_step = step
+        try:
+            if step == RESTART_STREAM:
+                self.camera.restart_stream()
+            elif step == REOPEN:
+                delay = min(
+                    self.recovery_backoff * 2**self._reopens, self.recovery_backoff_max
+                )
+                self._reopens += 1
+                time.sleep(delay)
+                self._reopen()
+        except Exception:
+            # The next failure escalates further
+            pass
+        return step
+
+    def recovered(self) -> Optional[Tuple[float, str, int]]:
+        """Mark a successful capture and end any recovery in progress.
+
+        Returns ``(seconds, step, failures)`` when a recovery just finished:
+        the time since the first failure, the last step taken and the number
+        of failed captures.  Returns ``None`` otherwise.
+        """
+        if self._failed_since is None:
+            return None
+        result = (
+            time.monotonic() - self._failed_since,
+            self._last_step,
+            self._failures,
+        )
+        self._failures = 0
+        self._failed_since = None
+        self._escalation = 0
+        self._reopens = 0
+        self._last_step = None
+        return result
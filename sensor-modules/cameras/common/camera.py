@@ -1,15 +1,33 @@
-from typing import Deque
+from collections import deque
+from concurrent.futures import Future
 import datetime
+import logging
 import os
 import time
 import threading
-import cv2
+from typing import Deque, Optional, Tuple
 
-from sys import getsizeof
+import numpy as np
 
+from bayer import parse_bayer
 from logger import Logger
-from cam import Cam
+from cam import RETRY, Cam
+from disk_io import sync_event
+from event_archive import ARCHIVE_TYPE
+from event_writer import EncoderPool, EventWriterProcess
+from frame_buffer import FrameRingBuffer, FrameSnapshot
+from shared_frame_buffer import SharedFrameRingBuffer
 from state import State
+from storage import COMPRESS, REFUSE, StorageManager
+from trigger import Trigger
+from wavebreak import WavebreakDetector, WavebreakPublisher
+
+# States in which frames are captured and buffered
+CAPTURE_STATES = (State.STORM, State.WAVEBREAK)
+# Seconds between reports of the wavebreak detector's per-frame cost
+DETECTOR_REPORT_INTERVAL = 60.0
+# Stream starts remembered in ``Camera.trigger_offsets``
+TRIGGER_OFFSETS_KEPT = 64
 
 
 class Camera:
@@ -19,11 +37,36 @@ class Camera:
     exposes the same attributes as the old ``bubblecam_config`` module.  This
     allows multiple cameras to share the same implementation while differing
     only in their configuration.
+
+    Cameras running in one process can share a ``writer`` process and an
+    ``encoder`` pool; shared ones are left running by :meth:`power_off`.
+    Without one, an encoder pool of the camera's own is only started once an
+    event is written in-process, which with a writer process only happens if
+    that exits.
     """
 
-    def __init__(self, name: str, config) -> None:
+    def __init__(
+        self,
+        name: str,
+        config,
+        writer: Optional[EventWriterProcess] = None,
+        encoder: Optional[EncoderPool] = None,
+    ) -> None:
         self.config = config
         self.logger = Logger(config, name).logger
+        # Start the writer before the camera is opened so the child process
+        # never sees any Spinnaker handles.
+        self._owns_writer = writer is None and config.WRITER_PROCESS
+        if self._owns_writer:
+            writer = EventWriterProcess(
+                config.ENCODER_WORKERS,
+                config.ARCHIVE_COMPRESSION,
+                config.WRITE_SYNC,
+                config.WRITE_DIRECT,
+            )
+        self.writer = writer if config.WRITER_PROCESS else None
+        self._owns_encoder = encoder is None
+        self._encoder = encoder
         self.cam = Cam(
             name,
             self.capture_loop,
@@ -34,73 +77,558 @@ class Camera:
             config.GAMMA,
             config.FPS,
             config.BACKLIGHT,
-            config.EVENT_DELAY,
             config.IMG_TYPE,
             config.ROLL_BUF_SIZE,
+            config.STREAM_BUFFER_MODE,
+            config.STREAM_BUFFER_COUNT,
+            config.RECOVERY_RETRIES,
+            config.RECOVERY_BACKOFF,
+            config.RECOVERY_BACKOFF_MAX,
+            config.SYNC_ROLE,
+            config.SYNC_LINE,
+            config.CAMERA_BACKEND,
+            config.CAMERA_BACKEND_OPTIONS,
+            config.ROI,
+            config.BINNING,
+            config.DECIMATION,
+            config.PIXEL_FORMAT,
         )
+        windows = (config.PRE_TRIGGER_FRAMES, config.POST_TRIGGER_FRAMES)
+        if max(windows) > config.ROLL_BUF_SIZE:
+            raise ValueError("trigger windows cannot exceed ROLL_BUF_SIZE")
         self.glider_state = State.STORM
+        self._state_changed = threading.Condition()
+        # When capture was last asked to resume, until its first frame
+        self._resume_requested: Optional[float] = None
+        self.resume_latency: Optional[float] = None
         self.lockout_until = 0.0
+        self.last_stop_seq: Optional[int] = None
+        # (first sequence number, offset) of every stream of a synchronized
+        # camera: its frames' trigger index is their frame ID plus the offset
+        self.trigger_offsets: Deque[Tuple[int, int]] = deque(
+            maxlen=TRIGGER_OFFSETS_KEPT
+        )
+        # (frame ID, offset, host time) of the last frame, and whether
+        # acquisition restarted since
+        self._last_trigger: Optional[Tuple[int, int, float]] = None
+        self._stream_restarted = True
+        self.storage = StorageManager(
+            config.IMG_DIR,
+            config.STORAGE_QUOTA,
+            config.STORAGE_MIN_FREE,
+            config.STORAGE_POLICY,
+            self.logger,
+        )
+        self.detector: Optional[WavebreakDetector] = None
+        self.publisher: Optional[WavebreakPublisher] = None
+        if config.WAVEBREAK_DETECTION:
+            self.detector = WavebreakDetector(
+                config.WAVEBREAK_METRIC,
+                config.WAVEBREAK_ON,
+                config.WAVEBREAK_OFF,
+                config.WAVEBREAK_FRAMES,
+                config.WAVEBREAK_DOWNSAMPLE,
+                config.WAVEBREAK_BRIGHTNESS,
+            )
+            self.publisher = WavebreakPublisher(f"tcp://*:{config.WAVEBREAK_PORT}")
+        self._detector_reported = time.monotonic()
+
+    def set_state(self, state: State) -> None:
+        """Switch the glider state, pausing or resuming capture as needed."""
+        with self._state_changed:
+            if state == self.glider_state:
+                return
+            if state in CAPTURE_STATES and self.glider_state not in CAPTURE_STATES:
+                self._resume_requested = time.monotonic()
+            self.glider_state = state
+            self._state_changed.notify_all()
+
+    def _wait_for_capture_state(self) -> None:
+        """Idle the camera until the glider state calls for capture.
+
+        In ``LOW_POWER`` the camera is released entirely; in any other idle
+        state acquisition is only stopped so that resuming is quick.
+        """
+        with self._state_changed:
+            state = self.glider_state
+        while state not in CAPTURE_STATES:
+            try:
+                if state == State.LOW_POWER:
+                    self.cam.power_off()
+                    self.logger.info("Camera released for %s", state.name)
+                else:
+                    self.cam.pause()
+                    self.logger.info("Acquisition paused for %s", state.name)
+            except Exception as exc:
+                self.logger.error("Failed to idle camera: %s", exc)
+            with self._state_changed:
+                self._state_changed.wait_for(lambda: self.glider_state != state)
+                state = self.glider_state
+        self._stream_restarted = True
+        try:
+            self.cam.resume()
+        except Exception as exc:
+            # The next capture fails and goes through recovery
+            self.logger.error("Failed to resume camera: %s", exc)
+
+    def create_buffer(self) -> FrameRingBuffer:
+        """Create the rolling buffer matching the configured writer."""
+        if self.writer is not None:
+            return SharedFrameRingBuffer(
+                self.config.ROLL_BUF_SIZE, self.config.ROLL_BUF_BANKS
+            )
+        return FrameRingBuffer(self.config.ROLL_BUF_SIZE, self.config.ROLL_BUF_BANKS)
 
-    def capture_loop(self, buffer: Deque, lock: threading.Lock) -> None:
-        """Continuously capture frames while in :class:`State.STORM`."""
+    def capture_loop(self, buffer: FrameRingBuffer, lock: threading.Lock) -> None:
+        """Continuously capture frames while in one of :data:`CAPTURE_STATES`.
+
+        Frames are copied by the camera straight into the next ring slot, so
+        ``lock`` is only held to reserve and publish that slot.  In any other
+        state acquisition is stopped until :meth:`set_state` resumes it.
+        """
         index = 1
+        last_dropped = 0
         while True:
+            if self.glider_state not in CAPTURE_STATES:
+                self._wait_for_capture_state()
+            with lock:
+                slot = buffer.reserve()
             try:
-                success, frame = self.cam.capture_image()
+                success, record = self.cam.capture_record(slot)
             except Exception as exc:
                 self.logger.error(
                     "Camera error while capturing frame %d: %s", index, exc
                 )
-                self.cam.reset()
-                time.sleep(1)
+                with lock:
+                    buffer.cancel()
+                step = self.cam.recover(transient=False)
+                self.logger.warning("Recovering camera: %s", step)
                 continue
 
-            if not success or frame is None:
-                self.logger.warning(
-                    "Failed to capture frame %d; resetting camera", index
-                )
-                self.cam.reset()
-                time.sleep(1)
+            if not success or record is None:
+                with lock:
+                    buffer.cancel()
+                step = self.cam.recover()
+                if step == RETRY:
+                    self.logger.debug("Failed to capture frame %d; retrying", index)
+                else:
+                    self.logger.warning(
+                        "Failed to capture frame %d; recovering camera: %s",
+                        index,
+                        step,
+                    )
                 continue
 
-            if self.glider_state != State.STORM:
-                continue
+            recovery = self.cam.recovered()
+            if recovery is not None:
+                seconds, step, failures = recovery
+                if step != RETRY:
+                    self._stream_restarted = True
+                self.logger.info(
+                    "Camera recovered in %.3f s after %d failed captures (%s)",
+                    seconds,
+                    failures,
+                    step,
+                )
 
             with lock:
-                if len(buffer) >= self.config.ROLL_BUF_SIZE:
-                    buffer.popleft()
-                buffer.append(frame)
+                if slot is not None and np.may_share_memory(record.image, slot):
+                    buffer.commit(
+                        frame_id=record.frame_id,
+                        device_timestamp=record.timestamp,
+                        host_time=record.host_time,
+                    )
+                else:
+                    # First frame, or the frame format changed
+                    buffer.cancel()
+                    buffer.append(
+                        record.image,
+                        frame_id=record.frame_id,
+                        device_timestamp=record.timestamp,
+                        host_time=record.host_time,
+                    )
+                seq = buffer.seq - 1
+            if self.config.SYNC_ROLE is not None:
+                self._track_trigger_index(seq, record.frame_id, record.host_time)
 
-            self.logger.info("Captured frame %d", index)
+            if self.detector is not None:
+                # The slot is only reused once the ring wraps, so the frame
+                # is read without the lock
+                self._detect(record.image, record.host_time)
+
+            dropped = self.cam.frames_dropped
+            if dropped > last_dropped:
+                self.logger.warning(
+                    "Camera dropped %d frame(s) before frame ID %d",
+                    dropped - last_dropped,
+                    record.frame_id,
+                )
+            # The counter restarts when the camera is reopened
+            last_dropped = dropped
+
+            if self._resume_requested is not None:
+                self.resume_latency = time.monotonic() - self._resume_requested
+                self._resume_requested = None
+                self.logger.info(
+                    "Capture resumed %.3f s after state change", self.resume_latency
+                )
+
+            self.logger.debug("Captured frame %d", index)
             index += 1
 
-    def write_images(self, buffer: Deque, lock: threading.Lock) -> None:
-        """Write buffered frames to disk."""
-        dtime_str = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+    def _track_trigger_index(self, seq: int, frame_id: int, host_time: float) -> None:
+        """Record the trigger index offset of a stream at its first frame.
+
+        Frame IDs count the triggers a camera received since its stream
+        started.  Slaves are armed before the master's first exposure, so
+        every camera's first stream starts at trigger 0.  A master restarting
+        its stream stops triggering meanwhile and carries on at the next
+        index, while a slave counts the triggers it missed from the time
+        since its last frame.
+        """
+        if frame_id < 0:
+            return
+        last = self._last_trigger
+        if last is not None and not self._stream_restarted and frame_id > last[0]:
+            self._last_trigger = (frame_id, last[1], host_time)
+            return
+
+        self._stream_restarted = False
+        if last is None:
+            index = 0
+        elif self.config.SYNC_ROLE == "master":
+            index = last[0] + last[1] + 1
+        else:
+            missed = round((host_time - last[2]) * self.config.FPS)
+            index = last[0] + last[1] + max(1, missed)
+        offset = index - frame_id
+        self.trigger_offsets.append((seq, offset))
+        self._last_trigger = (frame_id, offset, host_time)
+        self.logger.info(
+            "Stream started at frame ID %d, trigger index %d", frame_id, index
+        )
+
+    def _detect(self, image: np.ndarray, host_time: float) -> None:
+        """Run wavebreak detection on a frame and publish any onset."""
+        try:
+            onset = self.detector.update(image, host_time)
+        except Exception as exc:
+            self.logger.error("Wavebreak detection failed: %s", exc)
+            return
+        if onset is not None:
+            message = self.publisher.publish(onset)
+            self.logger.info(
+                "Wavebreak detected (%s %.3f): %s",
+                self.detector.metric,
+                self.detector.last_score,
+                message,
+            )
+
+        now = time.monotonic()
+        if now - self._detector_reported >= DETECTOR_REPORT_INTERVAL:
+            self._detector_reported = now
+            frames, mean, worst = self.detector.cost(reset=True)
+            budget = 1.0 / self.config.FPS
+            self.logger.log(
+                logging.WARNING if mean > budget else logging.INFO,
+                "Wavebreak detection took %.2f ms mean, %.2f ms max per frame "
+                "over %d frames (%.1f ms per frame at %g fps)",
+                mean * 1000,
+                worst * 1000,
+                frames,
+                budget * 1000,
+                self.config.FPS,
+            )
+
+    def write_images(
+        self,
+        buffer: FrameRingBuffer,
+        lock: threading.Lock,
+        dtime_str: Optional[str] = None,
+        trigger: Optional[Trigger] = None,
+        pre_frames: Optional[int] = None,
+        post_frames: Optional[int] = None,
+        start_seq: Optional[int] = None,
+    ) -> str:
+        """Write the frames around a trigger to disk and return the event path.
+
+        The ``PRE_TRIGGER_FRAMES`` frames before the trigger are frozen as
+        soon as this is called and flushed right away.  Capture carries on in
+        a fresh bank until the ``POST_TRIGGER_FRAMES`` frames from the
+        trigger on have arrived, which are then frozen in turn and written to
+        the same event.  They are frozen right away if a third bank is
+        free; with only two they wait for the first snapshot to be written,
+        and any overwritten meanwhile are counted in a warning.  ``lock`` is
+        only held for the bank swaps.
+
+        The trigger is "now" unless ``trigger`` carries the publisher's
+        timestamp, in which case the frames are picked by their own
+        timestamps so that transit and dispatch delays do not shift the
+        event.  A timestamp further from the trigger's receipt than the
+        buffer spans points to a skewed publisher clock, and the receipt is
+        used instead.  The event is named after the trigger time unless
+        ``dtime_str`` is given, so that cameras triggered together can share
+        a name.
+
+        ``pre_frames`` and ``post_frames`` override the configured windows,
+        and ``start_seq`` places the trigger at that frame instead, which
+        continues an event that ended just before it.  The sequence number
+        after the last frame of the event is left in :attr:`last_stop_seq`.
+
+        The event is skipped if :attr:`storage` refuses it, and written as
+        ``STORAGE_COMPRESSED_TYPE`` images if it asks for compression, unless
+        the frames are raw Bayer or written to an archive.
+        """
+        timestamp = trigger.timestamp if trigger is not None else None
+        if timestamp is not None:
+            received = time.time() - trigger.age()
+            skew = timestamp - received
+            if abs(skew) > self.config.ROLL_BUF_SIZE / self.config.FPS:
+                self.logger.warning(
+                    "Trigger time is %.3f s from its receipt; using the receipt",
+                    skew,
+                )
+                timestamp = received
+            else:
+                self.logger.debug("Trigger time is %.3f s from its receipt", skew)
+        if dtime_str is None:
+            event_time = (
+                datetime.datetime.now()
+                if timestamp is None
+                else datetime.datetime.fromtimestamp(timestamp)
+            )
+            dtime_str = event_time.strftime("%Y-%m-%d-%H-%M-%S")
         dtime_path = os.path.join(self.config.IMG_DIR, dtime_str)
-        os.makedirs(dtime_path, exist_ok=True)
-        time.sleep(self.config.EVENT_DELAY)
+        if pre_frames is None:
+            pre_frames = self.config.PRE_TRIGGER_FRAMES
+        if post_frames is None:
+            post_frames = self.config.POST_TRIGGER_FRAMES
+
+        img_type = self.config.IMG_TYPE
+        decision = self.storage.admit((pre_frames + post_frames) * buffer.frame_nbytes)
+        if decision == REFUSE:
+            self.logger.error("Not enough storage; skipping event %s", dtime_path)
+            return dtime_path
+        if decision == COMPRESS:
+            # Lossy images would destroy raw Bayer mosaics, and archives are
+            # only ever compressed losslessly, by ARCHIVE_COMPRESSION
+            if img_type == ARCHIVE_TYPE or parse_bayer(self.config.PIXEL_FORMAT):
+                self.logger.warning(
+                    "Storage low; writing %s uncompressed as %s frames cannot be "
+                    "compressed",
+                    dtime_path,
+                    self.config.PIXEL_FORMAT or img_type,
+                )
+            else:
+                img_type = self.config.STORAGE_COMPRESSED_TYPE
+                self.logger.warning(
+                    "Storage low; writing %s as %s", dtime_path, img_type
+                )
 
         with lock:
-            buffer_size = getsizeof(buffer)
-            for idx, img in enumerate(reversed(buffer)):
-                img_path = os.path.join(dtime_path, f"img_{idx}{self.config.IMG_TYPE}")
-                if isinstance(img, str):
-                    self.logger.warning("Invalid frame encountered at index %d; skipping save", idx)
-                    continue
-                cv2.imwrite(img_path, img)
-                buffer_size += getsizeof(img)
-            print("Total buffer size: ", buffer_size)
-            buffer.clear()
-
-        self.logger.debug("Wrote %d images to %s", idx + 1, dtime_path)
+            if start_seq is not None:
+                trigger_seq = start_seq
+            elif timestamp is not None:
+                trigger_seq = buffer.seq_at(timestamp)
+            else:
+                trigger_seq = buffer.seq
+            stop_seq = trigger_seq + post_frames
+            self.last_stop_seq = stop_seq
+            # Post-trigger frames of a delayed trigger may already be buffered
+            first_stop = min(buffer.seq, stop_seq)
+            first = buffer.snapshot(trigger_seq - pre_frames, first_stop)
+        if first is None:
+            self.logger.warning("No free buffer bank; skipping event write")
+            return dtime_path
+        if trigger is not None and trigger.event_id is not None:
+            self.logger.info("Writing event %s to %s", trigger.event_id, dtime_path)
+
+        # Name files relative to the last post-trigger frame
+        newest_seq = stop_seq - 1
+        written = 0
+        rest = None
+        # The event is synced once, after its last snapshot
+        single = first_stop >= stop_seq
+        try:
+            future = self._submit_snapshot(
+                buffer, first, dtime_path, newest_seq, img_type, single
+            )
+            if first_stop < stop_seq:
+                if not buffer.wait_for_seq(
+                    newest_seq,
+                    timeout=2 * (stop_seq - first_stop) / self.config.FPS + 1,
+                ):
+                    self.logger.warning("Timed out waiting for post-trigger frames")
+                # Freeze the post-trigger frames before capture wraps their
+                # bank, which a slow write of the first snapshot would allow
+                with lock:
+                    rest = buffer.snapshot(first_stop, stop_seq)
+            written = self._wait_written(
+                future, buffer, first, dtime_path, newest_seq, img_type, single
+            )
+        finally:
+            with lock:
+                buffer.release(first)
+
+        if first_stop < stop_seq and rest is None:
+            # Every other bank was held by the first snapshot
+            with lock:
+                rest = buffer.snapshot(first_stop, stop_seq)
+            if rest is None:
+                self.logger.warning("No free buffer bank for post-trigger frames")
+                if self.config.WRITE_SYNC:
+                    sync_event(
+                        dtime_path + ARCHIVE_TYPE
+                        if img_type == ARCHIVE_TYPE
+                        else dtime_path
+                    )
+        if rest is not None:
+            try:
+                future = self._submit_snapshot(
+                    buffer, rest, dtime_path, newest_seq, img_type
+                )
+                written += self._wait_written(
+                    future, buffer, rest, dtime_path, newest_seq, img_type
+                )
+            finally:
+                with lock:
+                    buffer.release(rest)
+
+        expected = stop_seq - max(trigger_seq - pre_frames, 0)
+        missing = expected - len(first) - (len(rest) if rest is not None else 0)
+        if missing > 0:
+            self.logger.warning(
+                "%d of %d frames of %s were no longer buffered",
+                missing,
+                expected,
+                dtime_path,
+            )
+
+        self._on_event_written(written, dtime_path)
+        self.storage.record(
+            dtime_path + ARCHIVE_TYPE if img_type == ARCHIVE_TYPE else dtime_path
+        )
+        status = self.storage.status()
+        self.logger.debug(
+            "Storage: %.1f MB used, %.2f MB/s, %.0f s left",
+            status.used / 1e6,
+            status.rate / 1e6,
+            status.seconds_left,
+        )
+        return dtime_path
+
+    def _submit_snapshot(
+        self,
+        buffer: FrameRingBuffer,
+        snapshot: FrameSnapshot,
+        dtime_path: str,
+        newest_seq: int,
+        img_type: str,
+        final: bool = True,
+    ) -> Future:
+        """Start encoding ``snapshot``, in the writer process if any.
+
+        ``final`` marks the last snapshot of the event, after which it is
+        synced.
+        """
+        if self.writer is not None:
+            return self.writer.submit(
+                snapshot,
+                dtime_path,
+                img_type,
+                newest_seq,
+                self.cam.pixel_format,
+                final,
+            )
+        # The snapshot's bank is held, so capture cannot touch it
+        frames = list(buffer.snapshot_frames(snapshot))
+        return self.encoder.submit(
+            snapshot,
+            frames,
+            dtime_path,
+            img_type,
+            newest_seq=newest_seq,
+            pixel_format=self.cam.pixel_format,
+            final=final,
+        )
+
+    def _wait_written(
+        self,
+        future: Future,
+        buffer: FrameRingBuffer,
+        snapshot: FrameSnapshot,
+        dtime_path: str,
+        newest_seq: int,
+        img_type: str,
+        final: bool = True,
+    ) -> int:
+        """Wait for ``future``, handling a failure of the writer process.
+
+        An event the writer failed on while it keeps running is logged and
+        counted as empty.  If the writer exited, the event is written
+        in-process instead, and the writer restarted if this camera owns it;
+        a shared one is left to its owner.
+        """
+        try:
+            return future.result()
+        except RuntimeError as exc:
+            if self.writer is None:
+                raise
+            if self.writer.is_alive():
+                self.logger.error("Event writer failed on %s: %s", dtime_path, exc)
+                return 0
+            if self._owns_writer:
+                self.logger.error("Event writer exited: %s; restarting it", exc)
+                self.writer.stop()
+                self.writer = EventWriterProcess(
+                    self.config.ENCODER_WORKERS,
+                    self.config.ARCHIVE_COMPRESSION,
+                    self.config.WRITE_SYNC,
+                    self.config.WRITE_DIRECT,
+                )
+            else:
+                self.logger.error("Shared event writer exited: %s", exc)
+            self.logger.warning("Writing %s in-process", dtime_path)
+            frames = list(buffer.snapshot_frames(snapshot))
+            return self.encoder.write(
+                snapshot,
+                frames,
+                dtime_path,
+                img_type,
+                newest_seq=newest_seq,
+                pixel_format=self.cam.pixel_format,
+                final=final,
+            )
+
+    def _on_event_written(self, count: int, path: str) -> None:
+        """Completion callback run once a whole event is on disk."""
+        self.logger.debug("Wrote %d images to %s", count, path)
         self.lockout_until = time.time() + self.config.LOCKOUT_DELAY
 
-    def detect_event(self, buffer: Deque[str], lock: threading.Lock) -> None:
-        """Trigger an event write if not currently locked out."""
-        if time.time() < self.lockout_until:
-            return
-        self.write_images(buffer, lock)
+    def dropped_frames(self) -> int:
+        """Frames the camera dropped since it was (re)opened."""
+        return self.cam.dropped_frames()
+
+    @property
+    def encoder(self) -> EncoderPool:
+        """The in-process encoder pool, started on first use if not shared."""
+        if self._encoder is None:
+            self._encoder = EncoderPool(
+                self.config.ENCODER_WORKERS,
+                self.config.ENCODER_POOL,
+                self.config.ARCHIVE_COMPRESSION,
+                self.config.WRITE_SYNC,
+                self.config.WRITE_DIRECT,
+            )
+        return self._encoder
 
     def power_off(self) -> None:
         self.cam.power_off()
+        if self.publisher is not None:
+            self.publisher.close()
+            self.publisher = None
+        if self.writer is not None and self._owns_writer:
+            self.writer.stop()
+        if self._owns_encoder and self._encoder is not None:
+            self._encoder.shutdown()
+            self._encoder = None
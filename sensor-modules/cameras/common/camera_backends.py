@@ -0,0 +1,300 @@
+"""Camera backends that need no camera, for development and load tests.
+
+Both backends behave like the subset of :class:`cv2.VideoCapture` that
+:class:`cam.Cam` uses for non-Spinnaker cameras, so the capture loop, the
+rolling buffer and the event writers run unchanged on any Linux machine.
+
+* :class:`SyntheticCapture` generates frames of a configurable resolution and
+  pixel format at ``fps``, with optional timing jitter.
+* :class:`ReplayCapture` plays back a recorded event, either an event
+  directory with its ``frames.csv`` or a ``.frames`` archive, at the recorded
+  pace scaled by ``speed``.
+
+A backend is selected with ``CAMERA_BACKEND`` and configured through
+``CAMERA_BACKEND_OPTIONS``, the keyword arguments of its class.
+"""
+
+import csv
+import os
+import random
+import re
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from bayer import is_packed, pack12
+from event_archive import ARCHIVE_TYPE, EventArchiveReader
+from event_writer import METADATA_FILE
+
+# Backends selectable through ``CAMERA_BACKEND``
+CAMERA_BACKENDS = ("spinnaker", "synthetic", "replay")
+
+# Array dtype and channels of each synthetic pixel format.  Packed formats
+# are generated as 16-bit samples and delivered as packed bytes.
+PIXEL_FORMATS = {
+    "Mono8": (np.uint8, 1),
+    "Mono16": (np.uint16, 1),
+    "BayerRG8": (np.uint8, 1),
+    "BayerRG12p": (np.uint16, 1),
+    "BGR8": (np.uint8, 3),
+}
+
+
+def _deliver(frame: np.ndarray, image: Optional[np.ndarray]) -> np.ndarray:
+    """Copy ``frame`` into ``image`` if it fits, else return a new copy."""
+    fits = image is not None and image.shape == frame.shape
+    if fits and image.dtype == frame.dtype:
+        np.copyto(image, frame)
+        return image
+    return frame.copy()
+
+
+class _PacedCapture:
+    """Frame pacing shared by the backends.
+
+    :meth:`_wait` blocks until the next frame is due, like a camera blocking
+    on its next exposure.  A reader that falls behind does not get a burst of
+    late frames; the schedule restarts from the current time instead.
+    """
+
+    def __init__(self, fps: float, jitter: float = 0.0) -> None:
+        self.fps = fps
+        self.jitter = jitter
+        self._next: Optional[float] = None
+        self._opened = True
+
+    def _wait(self, interval: float) -> None:
+        now = time.monotonic()
+        if self._next is None or now - self._next > interval:
+            self._next = now
+        if self.jitter:
+            due = self._next + random.gauss(0.0, self.jitter)
+        else:
+            due = self._next
+        if due > now:
+            time.sleep(due - now)
+        self._next += interval
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def release(self) -> None:
+        self._opened = False
+
+    def set(self, prop: int, value) -> bool:
+        if prop == cv2.CAP_PROP_FPS:
+            self.fps = float(value)
+        elif prop in (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT):
+            # See ``SyntheticCapture.set_roi``; recordings keep their size
+            return False
+        # Exposure, gain and the like have no effect on generated frames
+        return True
+
+
+class SyntheticCapture(_PacedCapture):
+    """Generate frames of ``resolution`` ``(width, height)`` at ``fps``.
+
+    ``pixel_format`` is one of :data:`PIXEL_FORMATS` and ``jitter`` the
+    standard deviation in seconds of each frame's arrival time.  Frames are
+    cycled from ``patterns`` precomputed gradients, so generating them costs
+    no more than the copy into the caller's buffer.
+
+    Like a Spinnaker camera, :meth:`set_binning` and :meth:`set_roi` shrink
+    the frames, with ``resolution`` taken as the sensor size.
+    """
+
+    def __init__(
+        self,
+        fps: float = 8,
+        resolution: Tuple[int, int] = (1440, 1080),
+        pixel_format: str = "Mono8",
+        jitter: float = 0.0,
+        patterns: int = 8,
+    ) -> None:
+        super().__init__(fps, jitter)
+        if pixel_format not in PIXEL_FORMATS:
+            raise ValueError(f"unknown pixel format: {pixel_format}")
+        self.resolution = tuple(resolution)
+        self.pixel_format = pixel_format
+        self.patterns = patterns
+        self._factor = 1
+        self._roi: Optional[Tuple[int, int, int, int]] = None
+        self._frames: List[np.ndarray] = []
+        self._generate()
+        self._count = 0
+
+    def _image_size(self) -> Tuple[int, int]:
+        """Width and height of the binned and decimated image."""
+        width, height = self.resolution
+        return width // self._factor, height // self._factor
+
+    def _generate(self) -> None:
+        dtype, channels = PIXEL_FORMATS[self.pixel_format]
+        width, height = self._image_size()
+        offset_x, offset_y = 0, 0
+        if self._roi is not None:
+            offset_x, offset_y, width, height = self._roi
+        span = sum(self._image_size())
+        ramp = np.linspace(0, np.iinfo(dtype).max, span, dtype=np.float64)
+        self._frames = []
+        for index in range(self.patterns):
+            start = index * span // self.patterns + offset_x + offset_y
+            rows = np.arange(height)[:, None] + np.arange(width)[None, :] + start
+            frame = ramp[rows % span].astype(dtype)
+            if channels > 1:
+                frame = np.repeat(frame[..., None], channels, axis=2)
+            if is_packed(self.pixel_format):
+                frame = pack12(frame >> 4)
+            self._frames.append(np.ascontiguousarray(frame))
+
+    def set_pixel_format(self, pixel_format: str) -> bool:
+        """Switch to another of :data:`PIXEL_FORMATS`."""
+        if pixel_format not in PIXEL_FORMATS:
+            return False
+        self.pixel_format = pixel_format
+        self._generate()
+        return True
+
+    def set_binning(self, binning: int = 1, decimation: int = 1) -> bool:
+        """Shrink the image by ``binning`` and ``decimation`` in both directions.
+
+        Any region of interest is reset to the whole image.
+        """
+        if binning < 1 or decimation < 1:
+            return False
+        self._factor = binning * decimation
+        self._roi = None
+        self._generate()
+        return True
+
+    def set_roi(self, roi: Optional[Tuple[int, int, int, int]] = None) -> bool:
+        """Crop frames to ``(offset_x, offset_y, width, height)``, or not at all."""
+        if roi is not None:
+            offset_x, offset_y, width, height = roi
+            image_width, image_height = self._image_size()
+            if not (
+                0 <= offset_x
+                and 0 <= offset_y
+                and 0 < width <= image_width - offset_x
+                and 0 < height <= image_height - offset_y
+                and not (is_packed(self.pixel_format) and width % 2)
+            ):
+                return False
+            roi = tuple(roi)
+        self._roi = roi
+        self._generate()
+        return True
+
+    def read(self, image: Optional[np.ndarray] = None):
+        if not self._opened:
+            return False, None
+        self._wait(1.0 / self.fps)
+        frame = self._frames[self._count % len(self._frames)]
+        self._count += 1
+        return True, _deliver(frame, image)
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop in (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT):
+            width, height = self._image_size()
+            if self._roi is not None:
+                width, height = self._roi[2:]
+            return float(width if prop == cv2.CAP_PROP_FRAME_WIDTH else height)
+        return 0.0
+
+
+def _load_event(path: str) -> Tuple[List[np.ndarray], List[float]]:
+    """Return the frames of a recorded event and their times, oldest first."""
+    if path.endswith(ARCHIVE_TYPE):
+        with EventArchiveReader(path) as reader:
+            entries = sorted(
+                range(len(reader)), key=lambda i: reader.metadata(i).get("seq", i)
+            )
+            frames = [np.array(reader.frame(i)) for i in entries]
+            times = [reader.metadata(i).get("host_time", 0.0) for i in entries]
+        return frames, [float(t) for t in times]
+
+    metadata = os.path.join(path, METADATA_FILE)
+    names = {}
+    if os.path.exists(metadata):
+        with open(metadata, newline="") as f:
+            for row in csv.DictReader(f):
+                names[row["name"]] = float(row["host_monotonic"])
+    images = {}
+    for entry in os.listdir(path):
+        match = re.fullmatch(r"(img_\d+)\.\w+", entry)
+        if match:
+            images[match.group(1)] = os.path.join(path, entry)
+    # img_0 is the newest frame of an event
+    order = sorted(images, key=lambda name: -int(name[4:]))
+    frames = [cv2.imread(images[name], cv2.IMREAD_UNCHANGED) for name in order]
+    times = [names.get(name, 0.0) for name in order]
+    return frames, times
+
+
+class ReplayCapture(_PacedCapture):
+    """Play back the event recorded at ``path``.
+
+    Frames follow the recorded receive times divided by ``speed``; a
+    ``speed`` of 0 replays as fast as frames are read, and the configured
+    ``fps`` is used where no times were recorded.  With ``loop`` the event
+    starts over after its last frame, otherwise reads fail from then on.
+    The whole event is decoded when the backend is opened.
+    """
+
+    def __init__(
+        self, path: str, fps: float = 8, speed: float = 1.0, loop: bool = True
+    ) -> None:
+        super().__init__(fps)
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self._frames, times = _load_event(path)
+        if not self._frames:
+            raise FileNotFoundError(f"no recorded frames in {path}")
+        intervals = np.diff(times) if len(times) > 1 else np.array([])
+        self._intervals = [
+            float(interval) if interval > 0 else None for interval in intervals
+        ]
+        self._index = 0
+
+    def read(self, image: Optional[np.ndarray] = None):
+        if not self._opened:
+            return False, None
+        if self._index == len(self._frames):
+            if not self.loop:
+                return False, None
+            self._index = 0
+        if self.speed > 0:
+            interval = None
+            if 0 < self._index <= len(self._intervals):
+                interval = self._intervals[self._index - 1]
+            self._wait((interval or 1.0 / self.fps) / self.speed)
+        frame = self._frames[self._index]
+        self._index += 1
+        return True, _deliver(frame, image)
+
+    def get(self, prop: int) -> float:
+        frame = self._frames[0]
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(frame.shape[1])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(frame.shape[0])
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self._frames))
+        return 0.0
+
+
+def open_backend(backend: str, fps: float, options: Optional[dict] = None):
+    """Open a ``"synthetic"`` or ``"replay"`` backend with ``options``."""
+    options = dict(options or {})
+    if backend == "synthetic":
+        return SyntheticCapture(fps, **options)
+    if backend == "replay":
+        return ReplayCapture(fps=fps, **options)
+    raise ValueError(f"unknown camera backend: {backend}")
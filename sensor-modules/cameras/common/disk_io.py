@@ -0,0 +1,118 @@
+"""Low level helpers for writing events to the SSDs.
+
+Frames are encoded into memory and each file is written with a single
+sequential ``write``, instead of through the small buffered writes of
+``cv2.imwrite``.  Only archives, which grow frame by frame, reserve their
+space with :func:`preallocate`; exFAT has no native ``fallocate``, so glibc
+emulates it by writing zeros and reserving a file that is written at once
+would double its I/O.  Durability is handled once per event by
+:func:`sync_event` rather than per file.
+
+:class:`AlignedBuffer` provides the page-aligned memory ``O_DIRECT`` needs,
+used by :class:`event_archive.EventArchiveWriter` when direct I/O is enabled.
+"""
+
+import mmap
+import os
+from typing import Optional
+
+# Offset, length and memory alignment that satisfies O_DIRECT on the SSDs
+DIRECT_ALIGNMENT = 4096
+
+O_DIRECT = getattr(os, "O_DIRECT", 0)
+
+
+def direct_aligned(size: int) -> int:
+    """Round ``size`` up to :data:`DIRECT_ALIGNMENT`."""
+    return -(-size // DIRECT_ALIGNMENT) * DIRECT_ALIGNMENT
+
+
+def preallocate(fd: int, offset: int, length: int) -> bool:
+    """Reserve ``length`` bytes from ``offset`` so the file is laid out once.
+
+    Returns ``False`` where the platform or file system cannot preallocate,
+    in which case the file simply grows as it is written.
+    """
+    if length <= 0 or not hasattr(os, "posix_fallocate"):
+        return False
+    try:
+        os.posix_fallocate(fd, offset, length)
+    except OSError:
+        return False
+    return True
+
+
+def write_all(fd: int, data, offset: Optional[int] = None) -> None:
+    """Write all of ``data`` at ``offset``, or the file position if ``None``."""
+    view = memoryview(data).cast("B")
+    while view:
+        if offset is None:
+            written = os.write(fd, view)
+        else:
+            written = os.pwrite(fd, view, offset)
+            offset += written
+        view = view[written:]
+
+
+def write_file(path: str, data) -> int:
+    """Write ``data`` to a new file at ``path`` in one sequential write.
+
+    The file is not synced; see :func:`sync_event`.  Returns the bytes
+    written.
+    """
+    size = memoryview(data).nbytes
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        write_all(fd, data)
+    finally:
+        os.close(fd)
+    return size
+
+
+def sync_event(path: str) -> None:
+    """Make an event directory or archive file durable.
+
+    Only the event's own files are synced, every file of a directory
+    followed by the directory itself, and then the parent directory that
+    holds the event's entry.  Other files on the same file system, such as
+    events still being written by other cameras, are left alone.
+    """
+    if os.path.isdir(path):
+        for entry in os.scandir(path):
+            if entry.is_file():
+                _fsync_path(entry.path)
+    _fsync_path(path)
+    _fsync_path(os.path.dirname(os.path.abspath(path)))
+
+
+def _fsync_path(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class AlignedBuffer:
+    """Reusable page-aligned memory for ``O_DIRECT`` writes.
+
+    Anonymous memory maps start on a page boundary, which satisfies the
+    buffer alignment of direct I/O.  The buffer grows as needed.
+    """
+
+    def __init__(self, size: int = DIRECT_ALIGNMENT) -> None:
+        self._mmap = mmap.mmap(-1, direct_aligned(size))
+
+    def fill(self, data) -> memoryview:
+        """Copy ``data`` in, zero-pad it to the alignment and return the view."""
+        view = memoryview(data).cast("B")
+        size = direct_aligned(len(view))
+        if size > len(self._mmap):
+            self._mmap.close()
+            self._mmap = mmap.mmap(-1, size)
+        self._mmap[: len(view)] = view
+        self._mmap[len(view):size] = bytes(size - len(view))
+        return memoryview(self._mmap)[:size]
+
+    def close(self) -> None:
+        self._mmap.close()
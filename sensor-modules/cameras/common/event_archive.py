@@ -0,0 +1,281 @@
+"""Single-file container for the frames of one event.
+
+Writing a burst of frames as one file avoids a file create per frame on the
+exFAT SSDs and lets later analysis map a single frame without loading the
+rest of the event.
+
+File layout::
+
+    header (64 bytes)   magic, version, index offset, index length
+    frame data          one block per frame, each aligned to 64 bytes
+    index (JSON)        offset, size, shape, dtype, codec and metadata per frame
+
+The index is rewritten at the end of the file on :meth:`EventArchiveWriter.close`,
+so an existing archive can be reopened and appended to.
+
+Frames are written with positioned writes into space preallocated for the
+event and nothing is synced, see :func:`disk_io.sync_event`.  With direct I/O the
+frame blocks are aligned to :data:`disk_io.DIRECT_ALIGNMENT` instead, which
+the reader does not need to know about since offsets come from the index.
+"""
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Iterator, Optional
+
+import numpy as np
+
+from disk_io import (
+    DIRECT_ALIGNMENT,
+    O_DIRECT,
+    AlignedBuffer,
+    preallocate,
+    write_all,
+)
+
+# File extension selecting the archive backend through ``IMG_TYPE``
+ARCHIVE_TYPE = ".frames"
+
+MAGIC = b"HYDRAEVT"
+VERSION = 1
+HEADER = struct.Struct("<8sHxxxxxxQQ")
+HEADER_SIZE = 64
+ALIGNMENT = 64
+CODECS = ("raw", "zlib")
+
+
+def _aligned(offset: int, alignment: int = ALIGNMENT) -> int:
+    return -(-offset // alignment) * alignment
+
+
+def _read_index(f) -> tuple:
+    """Return ``(index_offset, entries)`` from an open archive."""
+    f.seek(0)
+    magic, version, index_offset, index_size = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError("not an event archive")
+    if version != VERSION:
+        raise ValueError(f"unsupported event archive version {version}")
+    if index_offset == 0:
+        # Writer did not close the archive; no frames are recoverable
+        return HEADER_SIZE, []
+    f.seek(index_offset)
+    return index_offset, json.loads(f.read(index_size))["frames"]
+
+
+class EventArchiveWriter:
+    """Append frames to an event archive.
+
+    ``compression`` is ``None`` for raw frames, which can be memory-mapped by
+    the reader, or ``"zlib"`` for light compression at ``level``.
+
+    ``preallocate_bytes`` reserves room for the frames about to be appended
+    and ``direct`` writes them with ``O_DIRECT`` where the file system
+    supports it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        compression: Optional[str] = None,
+        level: int = 1,
+        preallocate_bytes: int = 0,
+        direct: bool = False,
+    ) -> None:
+        codec = compression or "raw"
+        if codec not in CODECS:
+            raise ValueError(f"unknown archive compression: {compression}")
+        self.path = path
+        self.codec = codec
+        self.level = level
+
+        new = not os.path.exists(path)
+        if new:
+            self._offset, self._entries = HEADER_SIZE, []
+        else:
+            with open(path, "rb") as f:
+                self._offset, self._entries = _read_index(f)
+
+        self.direct = False
+        if direct and O_DIRECT:
+            try:
+                self._fd = os.open(path, os.O_RDWR | os.O_CREAT | O_DIRECT, 0o644)
+                self.direct = True
+            except OSError:
+                # tmpfs and some FUSE file systems reject O_DIRECT
+                pass
+        if not self.direct:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._alignment = DIRECT_ALIGNMENT if self.direct else ALIGNMENT
+        self._buffer = AlignedBuffer() if self.direct else None
+        self._closed = False
+
+        if new:
+            header = HEADER.pack(MAGIC, VERSION, 0, 0)
+            self._write_at(0, header.ljust(HEADER_SIZE, b"\0"))
+        if preallocate_bytes > 0:
+            preallocate(self._fd, self._offset, preallocate_bytes)
+
+    def _write_at(self, offset: int, data) -> None:
+        if self._buffer is None:
+            write_all(self._fd, data, offset)
+            return
+        # Padding past the data is overwritten by the next block or truncated
+        with self._buffer.fill(data) as block:
+            write_all(self._fd, block, offset)
+
+    def append(self, frame: np.ndarray, **metadata) -> int:
+        """Append ``frame`` and return its index in the archive.
+
+        Keyword arguments (for example ``timestamp``) are stored with the
+        frame in the index and must be JSON serialisable.
+        """
+        frame = np.ascontiguousarray(frame)
+        data = memoryview(frame).cast("B")
+        if self.codec == "zlib":
+            data = zlib.compress(data, self.level)
+
+        offset = _aligned(self._offset, self._alignment)
+        self._write_at(offset, data)
+        self._offset = offset + len(data)
+
+        self._entries.append(
+            dict(
+                metadata,
+                offset=offset,
+                size=len(data),
+                shape=list(frame.shape),
+                dtype=frame.dtype.str,
+                codec=self.codec,
+            )
+        )
+        return len(self._entries) - 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self) -> None:
+        """Write the index, patch the header and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            index = json.dumps({"frames": self._entries}).encode()
+            index_offset = _aligned(self._offset, self._alignment)
+            self._write_at(index_offset, index)
+            # Drops the unused preallocation and any direct I/O padding
+            os.ftruncate(self._fd, index_offset + len(index))
+            header = HEADER.pack(MAGIC, VERSION, index_offset, len(index))
+            if self.direct:
+                # The header block may hold frame data of an older archive,
+                # so only the header bytes are rewritten, through the cache
+                fd = os.open(self.path, os.O_WRONLY)
+                try:
+                    write_all(fd, header, 0)
+                finally:
+                    os.close(fd)
+            else:
+                write_all(self._fd, header, 0)
+        finally:
+            os.close(self._fd)
+            if self._buffer is not None:
+                self._buffer.close()
+
+    def __enter__(self) -> "EventArchiveWriter":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+class EventArchiveReader:
+    """Random access to the frames of an event archive.
+
+    The file is memory-mapped, so reading one raw frame only touches that
+    frame's pages and the returned array is a read-only view of the mapping.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            _, self._entries = _read_index(f)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def metadata(self, index: int) -> dict:
+        """Return the index entry stored for frame ``index``."""
+        return self._entries[index]
+
+    def frame(self, index: int) -> np.ndarray:
+        """Return frame ``index`` without reading any other frame."""
+        entry = self._entries[index]
+        dtype = np.dtype(entry["dtype"])
+        if entry["codec"] == "raw":
+            return np.frombuffer(
+                self._mmap,
+                dtype=dtype,
+                count=int(np.prod(entry["shape"])),
+                offset=entry["offset"],
+            ).reshape(entry["shape"])
+        start = entry["offset"]
+        data = zlib.decompress(self._mmap[start:start + entry["size"]])
+        return np.frombuffer(data, dtype=dtype).reshape(entry["shape"])
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.frame(index)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for index in range(len(self)):
+            yield self.frame(index)
+
+    def close(self) -> None:
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Frames handed out as views still reference the mapping; it is
+            # released once they are garbage collected.
+            pass
+
+    def __enter__(self) -> "EventArchiveReader":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def main():
+    import argparse
+
+    import cv2
+
+    parser = argparse.ArgumentParser(description="Inspect or unpack an event archive")
+    parser.add_argument("archive", help="Path to a .frames event archive")
+    parser.add_argument(
+        "-x", "--extract", metavar="DIR", help="Write every frame to DIR as images"
+    )
+    parser.add_argument(
+        "-t", "--type", default=".png", help="Image type for --extract (Default: .png)"
+    )
+    args = parser.parse_args()
+
+    with EventArchiveReader(args.archive) as reader:
+        for index in range(len(reader)):
+            entry = reader.metadata(index)
+            print(
+                index, entry.get("name", ""), entry["shape"], entry.get("timestamp", "")
+            )
+            if args.extract:
+                os.makedirs(args.extract, exist_ok=True)
+                name = entry.get("name", f"img_{index}")
+                cv2.imwrite(
+                    os.path.join(args.extract, name + args.type), reader.frame(index)
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Queue event triggers and write them in the background.
+
+The main loops used to write an event on the thread that receives triggers,
+so triggers arriving during a write were only seen once it finished.  An
+:class:`EventScheduler` takes triggers as they arrive and writes the events
+one after another from its own thread:
+
+* a trigger whose window overlaps a queued event extends that event;
+* a trigger overlapping the event being written becomes a continuation that
+  starts at the frame after that event's last frame, so no frame is written
+  twice;
+* any other trigger inside the ``LOCKOUT_DELAY`` after an event is dropped,
+  including the lockout that will follow the event being written or queued.
+
+Triggers arriving while the camera is locked out are dropped whatever they
+overlap.
+
+Windows are the configured ``PRE_TRIGGER_FRAMES`` and ``POST_TRIGGER_FRAMES``
+around the trigger time, and an event is never extended beyond
+``ROLL_BUF_SIZE`` post-trigger frames, the most the rolling buffer can hold
+while the event waits for them.
+"""
+
+import datetime
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Optional
+
+from camera import Camera
+from frame_buffer import FrameRingBuffer
+from trigger import Trigger
+
+# Outcomes of EventScheduler.submit
+QUEUED = "queued"
+COALESCED = "coalesced"
+CONTINUED = "continued"
+LOCKED_OUT = "locked_out"
+
+
+@dataclass
+class ScheduledEvent:
+    """An event waiting to be written.
+
+    ``timestamp`` is the wall-clock time of the first trigger, or for a
+    continuation the end of the event it continues.  ``triggers`` counts the
+    triggers merged into the event.
+    """
+
+    trigger: Trigger
+    timestamp: float
+    pre_frames: int
+    post_frames: int
+    triggers: int = 1
+    continuation: bool = False
+
+    def end(self, fps: float) -> float:
+        """Wall-clock time just after the last frame of the event."""
+        return self.timestamp + self.post_frames / fps
+
+
+class EventScheduler:
+    """Write the events of one camera from a background thread.
+
+    ``on_written`` is called from that thread with each event and its path
+    once :meth:`Camera.write_images` returns.
+    """
+
+    def __init__(
+        self,
+        camera: Camera,
+        buffer: FrameRingBuffer,
+        lock: threading.Lock,
+        on_written: Optional[Callable[[ScheduledEvent, str], None]] = None,
+    ) -> None:
+        self.camera = camera
+        self.buffer = buffer
+        self.lock = lock
+        self.on_written = on_written
+        self._pending: Deque[ScheduledEvent] = deque()
+        self._active: Optional[ScheduledEvent] = None
+        self._last_path: Optional[str] = None
+        self._part = 1
+        self._stopped = False
+        self._changed = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name=f"{camera.logger.name}-events", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, trigger: Trigger) -> str:
+        """Schedule the event of ``trigger`` without waiting for any write.
+
+        Returns :data:`QUEUED`, :data:`COALESCED`, :data:`CONTINUED` or
+        :data:`LOCKED_OUT`.
+        """
+        config = self.camera.config
+        fps = config.FPS
+        # A bare trigger happened when it was received
+        if trigger.timestamp is None:
+            trigger = trigger._replace(timestamp=time.time() - trigger.age())
+        timestamp = trigger.timestamp
+        start = timestamp - config.PRE_TRIGGER_FRAMES / fps
+
+        with self._changed:
+            last = self._pending[-1] if self._pending else self._active
+            if time.time() < self.camera.lockout_until:
+                outcome = LOCKED_OUT
+            elif last is not None and start <= last.end(fps):
+                if timestamp + config.POST_TRIGGER_FRAMES / fps <= last.end(fps):
+                    last.triggers += 1
+                    outcome = COALESCED
+                elif last is not self._active and self._extend(last, timestamp):
+                    outcome = COALESCED
+                else:
+                    end = last.end(fps)
+                    event = ScheduledEvent(
+                        trigger._replace(timestamp=end),
+                        end,
+                        0,
+                        0,
+                        triggers=0,
+                        continuation=True,
+                    )
+                    self._extend(event, timestamp)
+                    self._pending.append(event)
+                    outcome = CONTINUED
+            elif (
+                last is not None and timestamp < last.end(fps) + config.LOCKOUT_DELAY
+            ):
+                # The lockout starts once ``last`` is written, at its end at best
+                outcome = LOCKED_OUT
+            else:
+                self._pending.append(
+                    ScheduledEvent(
+                        trigger,
+                        timestamp,
+                        config.PRE_TRIGGER_FRAMES,
+                        config.POST_TRIGGER_FRAMES,
+                    )
+                )
+                outcome = QUEUED
+            self._changed.notify_all()
+
+        self.camera.logger.info(
+            "Trigger %s %s", trigger.event_id or f"at {timestamp:.3f}", outcome
+        )
+        return outcome
+
+    def _extend(self, event: ScheduledEvent, timestamp: float) -> bool:
+        """Extend ``event`` to cover the post-trigger window of ``timestamp``.
+
+        Returns ``False``, leaving ``event`` as it is, if the extended event
+        would no longer fit the rolling buffer.
+        """
+        config = self.camera.config
+        post_frames = (
+            math.ceil((timestamp - event.timestamp) * config.FPS)
+            + config.POST_TRIGGER_FRAMES
+        )
+        if post_frames > config.ROLL_BUF_SIZE:
+            if event.post_frames:
+                return False
+            post_frames = config.ROLL_BUF_SIZE
+        event.post_frames = max(event.post_frames, post_frames)
+        event.triggers += 1
+        return True
+
+    def pending(self) -> int:
+        """Number of events queued or being written."""
+        with self._changed:
+            return len(self._pending) + (self._active is not None)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every scheduled event is written; ``False`` on timeout."""
+        with self._changed:
+            return self._changed.wait_for(
+                lambda: not self._pending and self._active is None, timeout
+            )
+
+    def stop(self) -> None:
+        """Write the events still queued, then end the writer thread."""
+        with self._changed:
+            self._stopped = True
+            self._changed.notify_all()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self._pending or self._stopped)
+                if not self._pending:
+                    return
+                event = self._pending.popleft()
+                self._active = event
+            try:
+                path = self._write(event)
+                if self.on_written is not None:
+                    self.on_written(event, path)
+            except Exception:
+                self.camera.logger.exception("Could not write event")
+            finally:
+                with self._changed:
+                    self._active = None
+                    self._changed.notify_all()
+
+    def _write(self, event: ScheduledEvent) -> str:
+        camera = self.camera
+        camera.logger.info(
+            "Starting event %.3f ms after trigger receipt (%d triggers)",
+            event.trigger.age() * 1000,
+            event.triggers,
+        )
+        if event.continuation and self._last_path and camera.last_stop_seq is not None:
+            self._part += 1
+            dtime_str = f"{os.path.basename(self._last_path)}_{self._part}"
+            return camera.write_images(
+                self.buffer,
+                self.lock,
+                dtime_str,
+                pre_frames=0,
+                post_frames=event.post_frames,
+                start_seq=camera.last_stop_seq,
+            )
+
+        self._part = 1
+        dtime_str = datetime.datetime.fromtimestamp(event.timestamp).strftime(
+            "%Y-%m-%d-%H-%M-%S"
+        )
+        self._last_path = camera.write_images(
+            self.buffer,
+            self.lock,
+            dtime_str,
+            event.trigger,
+            pre_frames=event.pre_frames,
+            post_frames=event.post_frames,
+        )
+        return self._last_path
@@ -0,0 +1,484 @@
+"""Write buffered event frames to disk.
+
+:class:`EncoderPool` encodes the frames of one event in parallel and is used
+both in-process and inside :class:`EventWriterProcess`, which runs it in a
+separate interpreter so that encoding does not compete with frame capture for
+the GIL.
+
+Events are written as a directory of ``img_{idx}`` image files with the
+timing of every frame in ``frames.csv``, or as a single :mod:`event_archive`
+file, which keeps the timing in its index, when ``img_type`` is
+:data:`event_archive.ARCHIVE_TYPE`.
+
+Images are encoded in memory and written with :func:`disk_io.write_file`;
+with ``sync`` an event is made durable once its last snapshot is written, not
+per file or per snapshot.
+
+Frames are written as captured.  Raw Bayer frames stay raw, and their
+``pixel_format`` is recorded with every frame for :mod:`bayer` to debayer
+them later.
+"""
+
+import collections
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+import csv
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Callable, Deque, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from disk_io import sync_event, write_file
+from event_archive import ARCHIVE_TYPE, EventArchiveWriter
+from frame_buffer import FrameSnapshot
+from shared_frame_buffer import SharedFrameSnapshot, SharedSnapshotReader
+
+# Per-frame timing written next to the images of each event
+METADATA_FILE = "frames.csv"
+METADATA_COLUMNS = (
+    "name",
+    "seq",
+    "frame_id",
+    "device_timestamp_ns",
+    "host_monotonic",
+    "wall_time",
+)
+
+# Reader used by process pool workers, created by ``_init_worker``
+_worker_reader: Optional[SharedSnapshotReader] = None
+
+
+def frame_indices(
+    snapshot: FrameSnapshot, newest_seq: Optional[int] = None
+) -> List[int]:
+    """Return the ``img_{idx}`` index of each frame of ``snapshot``.
+
+    ``img_0`` is the newest frame of the event.  Without ``newest_seq`` the
+    newest frame of the snapshot is used, otherwise indices count back from
+    that sequence number so that an event written in several snapshots gets
+    consistent names, with gaps where frames were lost.
+    """
+    if newest_seq is None:
+        return list(range(len(snapshot) - 1, -1, -1))
+    return [int(newest_seq - seq) for seq in snapshot.seqs]
+
+
+def event_paths(indices: List[int], dtime_path: str, img_type: str) -> List[str]:
+    """Return the output path for each frame index."""
+    return [os.path.join(dtime_path, f"img_{idx}{img_type}") for idx in indices]
+
+
+def write_metadata(
+    dtime_path: str,
+    snapshot: FrameSnapshot,
+    indices: List[int],
+    pixel_format: Optional[str] = None,
+) -> int:
+    """Append the timing of each frame of ``snapshot`` to the event's CSV.
+
+    A ``pixel_format`` column is added when one is given.
+    """
+    path = os.path.join(dtime_path, METADATA_FILE)
+    new_file = not os.path.exists(path)
+    extra = () if pixel_format is None else (pixel_format,)
+    with open(path, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(METADATA_COLUMNS + (("pixel_format",) if extra else ()))
+        for pos, idx in enumerate(indices):
+            writer.writerow(
+                (
+                    f"img_{idx}",
+                    int(snapshot.seqs[pos]),
+                    int(snapshot.frame_ids[pos]),
+                    int(snapshot.device_timestamps[pos]),
+                    repr(float(snapshot.host_times[pos])),
+                    repr(float(snapshot.timestamps[pos])),
+                )
+                + extra
+            )
+    # Not an image, so it does not add to the event's image count
+    return 0
+
+
+def _encode_frame(img: np.ndarray, path: str) -> int:
+    ok, data = cv2.imencode(os.path.splitext(path)[1], img)
+    if not ok:
+        return 0
+    write_file(path, data)
+    return 1
+
+
+def _write_archive(
+    path: str,
+    snapshot: FrameSnapshot,
+    items,
+    indices: List[int],
+    compression: Optional[str],
+    preallocate_bytes: int = 0,
+    direct: bool = False,
+    pixel_format: Optional[str] = None,
+) -> int:
+    """Append ``(position, frame)`` items of ``snapshot`` to one archive."""
+    extra = {} if pixel_format is None else {"pixel_format": pixel_format}
+    written = 0
+    with EventArchiveWriter(
+        path, compression, preallocate_bytes=preallocate_bytes, direct=direct
+    ) as archive:
+        for pos, img in items:
+            archive.append(
+                img,
+                name=f"img_{indices[pos]}",
+                seq=int(snapshot.seqs[pos]),
+                timestamp=float(snapshot.timestamps[pos]),
+                frame_id=int(snapshot.frame_ids[pos]),
+                device_timestamp=int(snapshot.device_timestamps[pos]),
+                host_time=float(snapshot.host_times[pos]),
+                **extra,
+            )
+            written += 1
+    return written
+
+
+def _write_shared_archive(
+    path: str,
+    snapshot: SharedFrameSnapshot,
+    indices: List[int],
+    compression: Optional[str],
+    direct: bool = False,
+    pixel_format: Optional[str] = None,
+) -> int:
+    """Write a whole shared snapshot to an archive inside a pool worker."""
+    frame_nbytes = np.dtype(snapshot.dtype).itemsize * int(
+        np.prod(snapshot.frame_shape)
+    )
+    return _write_archive(
+        path,
+        snapshot,
+        _worker_reader.items(snapshot),
+        indices,
+        compression,
+        len(snapshot) * frame_nbytes,
+        direct,
+        pixel_format,
+    )
+
+
+def _init_worker() -> None:
+    global _worker_reader
+    _worker_reader = SharedSnapshotReader()
+
+
+def _encode_shared(snapshot: SharedFrameSnapshot, paths: List[str]) -> int:
+    """Encode a slice of a shared snapshot inside a pool worker."""
+    written = 0
+    for pos, img in _worker_reader.items(snapshot):
+        written += _encode_frame(img, paths[pos])
+    return written
+
+
+class EncoderPool:
+    """Encode and write the frames of an event in parallel.
+
+    ``kind`` selects a ``"thread"`` pool (OpenCV releases the GIL while
+    encoding) or a ``"process"`` pool.  Process workers read shared snapshots
+    straight from shared memory; frames of any other snapshot are pickled to
+    them.  An archive is a single sequential file, so it is written by one
+    worker; ``compression`` and ``direct`` are passed to
+    :class:`EventArchiveWriter`.  With ``sync`` every event is synced to disk
+    before its final snapshot is reported complete.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        kind: str = "thread",
+        compression: Optional[str] = None,
+        sync: bool = False,
+        direct: bool = False,
+    ) -> None:
+        if workers <= 0:
+            raise ValueError("workers must be a positive number")
+        self.workers = workers
+        self.kind = kind
+        self.compression = compression
+        self.sync = sync
+        self.direct = direct
+        if kind == "thread":
+            self._executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="encoder"
+            )
+        elif kind == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        else:
+            raise ValueError(f"unknown encoder pool kind: {kind}")
+
+    def submit(
+        self,
+        snapshot: FrameSnapshot,
+        frames: Optional[Sequence[np.ndarray]],
+        dtime_path: str,
+        img_type: str,
+        callback: Optional[Callable[[int, str], None]] = None,
+        newest_seq: Optional[int] = None,
+        pixel_format: Optional[str] = None,
+        final: bool = True,
+    ) -> Future:
+        """Start writing an event and return a future for the image count.
+
+        ``frames`` are the snapshot's frames oldest first, with ``None`` for
+        frames that could not be read.  They may be ``None`` altogether for a
+        shared snapshot written by a process pool.
+        ``callback(count, path)`` runs once every file is on disk, where
+        ``path`` is the event directory or archive file.  ``newest_seq`` is
+        passed to :func:`frame_indices` to name the files and
+        ``pixel_format`` is recorded with every frame.  An event written in
+        several snapshots is synced once, after the one submitted as
+        ``final``, which must not start before the earlier ones are written.
+        """
+        shared = self.kind == "process" and isinstance(snapshot, SharedFrameSnapshot)
+        indices = frame_indices(snapshot, newest_seq)
+        if img_type == ARCHIVE_TYPE:
+            path = dtime_path + ARCHIVE_TYPE
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            if shared:
+                future = self._executor.submit(
+                    _write_shared_archive,
+                    path,
+                    snapshot,
+                    indices,
+                    self.compression,
+                    self.direct,
+                    pixel_format,
+                )
+            else:
+                items = [
+                    (pos, img) for pos, img in enumerate(frames) if img is not None
+                ]
+                future = self._executor.submit(
+                    _write_archive,
+                    path,
+                    snapshot,
+                    items,
+                    indices,
+                    self.compression,
+                    sum(img.nbytes for _, img in items),
+                    self.direct,
+                    pixel_format,
+                )
+            return self._gather([future], path, callback, final)
+
+        os.makedirs(dtime_path, exist_ok=True)
+        paths = event_paths(indices, dtime_path, img_type)
+
+        if shared:
+            futures = []
+            for chunk in np.array_split(np.arange(len(snapshot)), self.workers):
+                if len(chunk) == 0:
+                    continue
+                part = snapshot.subset(chunk)
+                futures.append(
+                    self._executor.submit(
+                        _encode_shared, part, [paths[pos] for pos in chunk]
+                    )
+                )
+        else:
+            futures = [
+                self._executor.submit(_encode_frame, img, path)
+                for img, path in zip(frames, paths)
+                if img is not None
+            ]
+        futures.append(
+            self._executor.submit(
+                write_metadata, dtime_path, snapshot, indices, pixel_format
+            )
+        )
+
+        return self._gather(futures, dtime_path, callback, final)
+
+    def _gather(
+        self, futures: List[Future], path: str, callback, final: bool = True
+    ) -> Future:
+        """Combine per-frame futures into one event future."""
+        result: Future = Future()
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def finish() -> None:
+            try:
+                count = sum(future.result() for future in futures)
+                if self.sync and final:
+                    sync_event(path)
+                if callback is not None:
+                    callback(count, path)
+            except Exception as exc:
+                result.set_exception(exc)
+            else:
+                result.set_result(count)
+
+        def done(_: Future) -> None:
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                finish()
+
+        if not futures:
+            finish()
+        for future in futures:
+            future.add_done_callback(done)
+        return result
+
+    def write(self, *args, **kwargs) -> int:
+        """Like :meth:`submit` but block until the event is on disk."""
+        return self.submit(*args, **kwargs).result()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def _writer_main(
+    jobs,
+    results,
+    workers: int,
+    compression: Optional[str],
+    sync: bool = False,
+    direct: bool = False,
+) -> None:
+    """Entry point of the writer process."""
+    reader = SharedSnapshotReader()
+    # Already outside the capture interpreter, so threads are enough here
+    encoder = EncoderPool(workers, "thread", compression, sync, direct)
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            snapshot, dtime_path, img_type, newest_seq, pixel_format, final = job
+            try:
+                frames = [None] * len(snapshot)
+                for pos, img in reader.items(snapshot):
+                    frames[pos] = img
+                count = encoder.write(
+                    snapshot,
+                    frames,
+                    dtime_path,
+                    img_type,
+                    newest_seq=newest_seq,
+                    pixel_format=pixel_format,
+                    final=final,
+                )
+                del frames
+                results.put((count, None))
+            except Exception as exc:
+                results.put((0, repr(exc)))
+    finally:
+        encoder.shutdown()
+        reader.close()
+
+
+class EventWriterProcess:
+    """Writes :class:`SharedFrameSnapshot` events from a child process.
+
+    The child is started with the ``spawn`` method so that it does not inherit
+    the camera handles and threads of the capture process.  Only the snapshot
+    descriptor crosses the process boundary; the frames are read straight out
+    of the shared ring and encoded by a pool of ``workers`` threads, see
+    :class:`EncoderPool` for ``compression``, ``sync`` and ``direct``.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        compression: Optional[str] = None,
+        sync: bool = False,
+        direct: bool = False,
+    ) -> None:
+        ctx = multiprocessing.get_context("spawn")
+        self._jobs = ctx.Queue()
+        self._results = ctx.Queue()
+        self._process = ctx.Process(
+            target=_writer_main,
+            args=(self._jobs, self._results, workers, compression, sync, direct),
+            name="event-writer",
+            daemon=True,
+        )
+        self._process.start()
+        self._pending: Deque[Future] = collections.deque()
+        self._pending_lock = threading.Lock()
+        self._collector = threading.Thread(
+            target=self._collect, name="event-writer-results", daemon=True
+        )
+        self._collector.start()
+
+    def submit(
+        self,
+        snapshot: SharedFrameSnapshot,
+        dtime_path: str,
+        img_type: str,
+        newest_seq: Optional[int] = None,
+        pixel_format: Optional[str] = None,
+        final: bool = True,
+    ) -> Future:
+        """Queue ``snapshot`` for writing and return a future for the count.
+
+        Jobs are written in order, see :meth:`EncoderPool.submit` for
+        ``final``.  The future fails with :class:`RuntimeError` if the writer process
+        reports an error or is no longer running.
+        """
+        future: Future = Future()
+        with self._pending_lock:
+            if not self._process.is_alive():
+                future.set_exception(RuntimeError("event writer process exited"))
+                return future
+            self._pending.append(future)
+            self._jobs.put(
+                (snapshot, dtime_path, img_type, newest_seq, pixel_format, final)
+            )
+        return future
+
+    def write(self, *args, **kwargs) -> int:
+        """Like :meth:`submit` but block until the event is on disk."""
+        return self.submit(*args, **kwargs).result()
+
+    def _collect(self) -> None:
+        """Resolve pending futures from the results queue, in order."""
+        while True:
+            try:
+                count, error = self._results.get(timeout=1)
+            except queue.Empty:
+                if self._process.is_alive():
+                    continue
+                break
+            except (EOFError, OSError):
+                break
+            with self._pending_lock:
+                future = self._pending.popleft()
+            if error is not None:
+                future.set_exception(RuntimeError(f"event writer failed: {error}"))
+            else:
+                future.set_result(count)
+
+        with self._pending_lock:
+            while self._pending:
+                self._pending.popleft().set_exception(
+                    RuntimeError("event writer process exited")
+                )
+
+    def is_alive(self) -> bool:
+        return self._process.is_alive()
+
+    def stop(self) -> None:
+        """Ask the writer process to exit and wait for it."""
+        if self._process.is_alive():
+            self._jobs.put(None)
+            self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
@@ -0,0 +1,363 @@
+"""Preallocated rolling buffer for camera frames."""
+
+from dataclasses import dataclass, replace
+from typing import Iterator, Optional, Sequence
+import threading
+import time
+
+import numpy as np
+
+
+@dataclass(frozen=True, eq=False)
+class FrameSnapshot:
+    """Frozen view of one bank of a :class:`FrameRingBuffer`.
+
+    Only slot indices and per-frame metadata are recorded, so taking a
+    snapshot is O(1) in the frame size and the snapshot is cheap to pickle.
+    The frames themselves stay in the ring's slab until :meth:`release`.
+
+    ``timestamps`` are host wall-clock times, ``host_times`` host
+    ``time.monotonic()`` receive times and ``device_timestamps`` the camera's
+    own timestamps in nanoseconds (-1 if unknown, as for ``frame_ids``).
+    """
+
+    bank: int
+    slots: np.ndarray
+    seqs: np.ndarray
+    timestamps: np.ndarray
+    frame_ids: np.ndarray
+    device_timestamps: np.ndarray
+    host_times: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def subset(self, positions: Sequence[int]) -> "FrameSnapshot":
+        """Return a snapshot of the frames at ``positions`` only."""
+        return replace(
+            self,
+            **{name: getattr(self, name)[positions] for name in PER_FRAME_FIELDS},
+        )
+
+
+# Snapshot fields holding one entry per frame
+PER_FRAME_FIELDS = (
+    "slots",
+    "seqs",
+    "timestamps",
+    "frame_ids",
+    "device_timestamps",
+    "host_times",
+)
+
+
+class FrameRingBuffer:
+    """Fixed-size rolling buffer of frames backed by one NumPy slab.
+
+    The slab of shape ``(banks, capacity, H, W[, C])`` is allocated when the
+    first frame is appended.  Every later frame is copied into the slab in
+    place, so capturing does not allocate and free a full resolution array per
+    tick.  Once the active bank is full its oldest frame is overwritten.
+
+    With more than one bank, :meth:`snapshot` freezes the active bank and
+    capture carries on in a free one, which lets an event be written out while
+    new frames keep arriving.
+
+    Iterating over the buffer yields the frames of the active bank oldest
+    first, the same order the ``collections.deque`` it replaces used.  The
+    yielded arrays are views into the slab and are only valid until the slot
+    is overwritten, so callers must hold the capture lock while reading them.
+    """
+
+    def __init__(self, capacity: int, banks: int = 1) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be a positive number of frames")
+        if banks <= 0:
+            raise ValueError("banks must be a positive number")
+        self.capacity = capacity
+        self.banks = banks
+        self._slab: Optional[np.ndarray] = None
+        self._seqs: Optional[np.ndarray] = None
+        self._timestamps: Optional[np.ndarray] = None
+        self._frame_ids: Optional[np.ndarray] = None
+        self._device_timestamps: Optional[np.ndarray] = None
+        self._host_times: Optional[np.ndarray] = None
+        self._held = [False] * banks
+        self._bank = 0
+        # Index of the slot the next frame is written to
+        self._head = 0
+        self._count = 0
+        # (bank, slot) handed out by ``reserve`` and not yet committed
+        self._reserved: Optional[tuple] = None
+        # Total number of frames appended, used as a sequence number
+        self._seq = 0
+        self._appended = threading.Condition()
+
+    def _create_arrays(self, frame_shape: tuple, dtype: np.dtype) -> None:
+        """Allocate the slab and per-slot header arrays."""
+        self._slab = np.empty((self.banks, self.capacity) + frame_shape, dtype=dtype)
+        slots = (self.banks, self.capacity)
+        self._seqs = np.full(slots, -1, dtype=np.int64)
+        self._timestamps = np.zeros(slots, dtype=np.float64)
+        self._frame_ids = np.full(slots, -1, dtype=np.int64)
+        self._device_timestamps = np.full(slots, -1, dtype=np.int64)
+        self._host_times = np.zeros(slots, dtype=np.float64)
+
+    def _publish(self) -> None:
+        """Hook called after the write position changes."""
+
+    def _allocate(self, frame: np.ndarray) -> None:
+        self._create_arrays(frame.shape, frame.dtype)
+        self._held = [False] * self.banks
+        self._reserved = None
+        self._bank = 0
+        self._head = 0
+        self._count = 0
+
+    def append(
+        self,
+        frame: np.ndarray,
+        timestamp: Optional[float] = None,
+        frame_id: int = -1,
+        device_timestamp: int = -1,
+        host_time: Optional[float] = None,
+    ) -> None:
+        """Copy ``frame`` into the next slot, dropping the oldest if full.
+
+        ``timestamp`` and ``host_time`` default to the current wall-clock and
+        monotonic times.  ``frame_id`` and ``device_timestamp`` are the values
+        reported by the camera, if any.
+        """
+        frame = np.asarray(frame)
+        if (
+            self._slab is None
+            or self._slab.shape[2:] != frame.shape
+            or self._slab.dtype != frame.dtype
+        ):
+            # First frame, or the camera came back with a different format
+            # after a reset.  Old frames cannot share a slab with new ones.
+            self._allocate(frame)
+
+        np.copyto(self._slab[self._bank, self._head], frame)
+        self._advance(timestamp, frame_id, device_timestamp, host_time)
+
+    def reserve(self) -> Optional[np.ndarray]:
+        """Return the slot the next frame goes to, so it can be filled in place.
+
+        The slot is excluded from iteration and snapshots until
+        :meth:`commit` or :meth:`cancel` is called, so it may be written
+        without holding the capture lock.  Returns ``None`` until the slab
+        has been allocated by a first :meth:`append`.
+        """
+        if self._slab is None:
+            return None
+        self._reserved = (self._bank, self._head)
+        return self._slab[self._bank, self._head]
+
+    def commit(
+        self,
+        timestamp: Optional[float] = None,
+        frame_id: int = -1,
+        device_timestamp: int = -1,
+        host_time: Optional[float] = None,
+    ) -> None:
+        """Publish the frame written into the slot from :meth:`reserve`."""
+        bank, slot = self._reserved
+        self._reserved = None
+        if (bank, slot) != (self._bank, self._head):
+            # A snapshot swapped banks while the slot was being filled; the
+            # frame is intact but has to be copied into the new bank.
+            self.append(
+                self._slab[bank, slot], timestamp, frame_id, device_timestamp, host_time
+            )
+            return
+        self._advance(timestamp, frame_id, device_timestamp, host_time)
+
+    def cancel(self) -> None:
+        """Drop the reservation made by :meth:`reserve`."""
+        self._reserved = None
+
+    def _advance(
+        self,
+        timestamp: Optional[float],
+        frame_id: int,
+        device_timestamp: int,
+        host_time: Optional[float],
+    ) -> None:
+        """Record the metadata of the frame at the head and move on."""
+        self._seqs[self._bank, self._head] = self._seq
+        self._timestamps[self._bank, self._head] = (
+            time.time() if timestamp is None else timestamp
+        )
+        self._frame_ids[self._bank, self._head] = frame_id
+        self._device_timestamps[self._bank, self._head] = device_timestamp
+        self._host_times[self._bank, self._head] = (
+            time.monotonic() if host_time is None else host_time
+        )
+        self._seq += 1
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        self._publish()
+        with self._appended:
+            self._appended.notify_all()
+
+    def seq_at(self, timestamp: float) -> int:
+        """Return the sequence number of the first frame taken at ``timestamp``.
+
+        That is the oldest frame of the active bank whose wall-clock
+        timestamp is not before ``timestamp``, or :attr:`seq` if every frame
+        is older.  A ``timestamp`` older than the whole bank gives its oldest
+        frame.
+        """
+        if self._slab is None:
+            return self._seq
+        slots = self.order()
+        later = np.flatnonzero(self._timestamps[self._bank, slots] >= timestamp)
+        if len(later) == 0:
+            return self._seq
+        return int(self._seqs[self._bank, slots[later[0]]])
+
+    def wait_for_seq(self, seq: int, timeout: Optional[float] = None) -> bool:
+        """Block until frame ``seq`` has been appended or ``timeout`` expires.
+
+        Returns ``True`` if the frame arrived in time.
+        """
+        with self._appended:
+            return self._appended.wait_for(lambda: self._seq > seq, timeout)
+
+    def clear(self) -> None:
+        """Forget all buffered frames while keeping the slab allocated."""
+        self._head = 0
+        self._count = 0
+        self._publish()
+
+    def _slot(self, index: int) -> int:
+        """Map a chronological index (0 is oldest) to a slab slot."""
+        count = self._valid_count()
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("frame index out of range")
+        return (self._head - count + index) % self.capacity
+
+    def _valid_count(self) -> int:
+        """Number of readable frames, excluding a reserved slot."""
+        reserved = self._reserved == (self._bank, self._head)
+        if reserved and self._count == self.capacity:
+            # The oldest frame is being overwritten in place
+            return self._count - 1
+        return self._count
+
+    def order(self) -> np.ndarray:
+        """Return the active bank's slots holding frames, oldest first."""
+        count = self._valid_count()
+        return (np.arange(count) + self._head - count) % self.capacity
+
+    def frames(self) -> np.ndarray:
+        """Return a chronological copy of the buffered frames."""
+        if self._slab is None:
+            return np.empty((0,))
+        return self._slab[self._bank][self.order()]
+
+    def snapshot(
+        self, start_seq: Optional[int] = None, stop_seq: Optional[int] = None
+    ) -> Optional[FrameSnapshot]:
+        """Freeze the active bank and continue capturing into a free one.
+
+        Only frames with ``start_seq <= seq < stop_seq`` are included in the
+        snapshot.  Older frames are discarded and newer ones, captured after
+        the window, are copied into the new bank so that a following
+        snapshot starting at ``stop_seq`` still finds them.  Returns ``None``
+        if every other bank is still held by an earlier snapshot.  The
+        returned snapshot must be handed back to :meth:`release` once its
+        frames have been consumed.
+        """
+        free = [
+            bank
+            for bank in range(self.banks)
+            if bank != self._bank and not self._held[bank]
+        ]
+        if self._slab is None or not free:
+            return None
+
+        slots = self.order()
+        seqs = self._seqs[self._bank, slots]
+        keep = np.ones(len(slots), dtype=bool)
+        if start_seq is not None:
+            keep &= seqs >= start_seq
+        if stop_seq is not None:
+            keep &= seqs < stop_seq
+        later = slots[seqs >= stop_seq] if stop_seq is not None else slots[:0]
+        slots = slots[keep]
+        snapshot = FrameSnapshot(
+            bank=self._bank,
+            slots=slots,
+            seqs=seqs[keep],
+            timestamps=self._timestamps[self._bank, slots],
+            frame_ids=self._frame_ids[self._bank, slots],
+            device_timestamps=self._device_timestamps[self._bank, slots],
+            host_times=self._host_times[self._bank, slots],
+        )
+        self._held[self._bank] = True
+        frozen, self._bank = self._bank, free[0]
+        for head, slot in enumerate(later):
+            np.copyto(self._slab[self._bank, head], self._slab[frozen, slot])
+            for header in (
+                self._seqs,
+                self._timestamps,
+                self._frame_ids,
+                self._device_timestamps,
+                self._host_times,
+            ):
+                header[self._bank, head] = header[frozen, slot]
+        self._head = len(later) % self.capacity
+        self._count = len(later)
+        self._publish()
+        return snapshot
+
+    def release(self, snapshot: FrameSnapshot) -> None:
+        """Return the bank frozen by ``snapshot`` to the free pool."""
+        self._held[snapshot.bank] = False
+
+    def snapshot_frames(self, snapshot: FrameSnapshot) -> Iterator[np.ndarray]:
+        """Yield views of the frames in ``snapshot``, oldest first."""
+        bank = self._slab[snapshot.bank]
+        for slot in snapshot.slots:
+            yield bank[slot]
+
+    def __len__(self) -> int:
+        return self._valid_count()
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self._slab[self._bank, self._slot(index)]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        bank = self._slab[self._bank] if self._slab is not None else None
+        for slot in self.order():
+            yield bank[slot]
+
+    def __reversed__(self) -> Iterator[np.ndarray]:
+        bank = self._slab[self._bank] if self._slab is not None else None
+        for slot in self.order()[::-1]:
+            yield bank[slot]
+
+    @property
+    def seq(self) -> int:
+        """Sequence number the next appended frame will get."""
+        return self._seq
+
+    @property
+    def frame_shape(self) -> Optional[tuple]:
+        """Shape of a single buffered frame, or ``None`` before allocation."""
+        return None if self._slab is None else self._slab.shape[2:]
+
+    @property
+    def frame_nbytes(self) -> int:
+        """Bytes of a single buffered frame, 0 before allocation."""
+        return 0 if self._slab is None else self._slab[0, 0].nbytes
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the preallocated slab in bytes."""
+        return 0 if self._slab is None else self._slab.nbytes
@@ -0,0 +1,112 @@
+"""Group the frames of hardware-synchronized cameras into framesets.
+
+With one camera set up as the sync master and the others as triggered
+slaves (``SYNC_ROLE``), every master exposure triggers one frame on each
+slave.  A camera's frame IDs count the triggers since its stream started,
+so each camera records the offset from its frame IDs to the trigger index
+whenever a stream starts, and frames are grouped by the resulting trigger
+index.  Host receive times, which jitter by more than a frame period under
+load, are not used for matching.
+"""
+
+import bisect
+import csv
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from event_archive import ARCHIVE_TYPE, EventArchiveReader
+from event_writer import METADATA_FILE
+
+# Frameset table written for every synchronized event
+FRAMESETS_FILE = "framesets.csv"
+
+
+def read_event_frames(dtime_path: str) -> List[dict]:
+    """Return ``name``, ``seq``, ``frame_id`` and ``host_time`` of each frame.
+
+    ``dtime_path`` is the event path without extension, as returned by
+    :meth:`Camera.write_images`; both image directories and archives are
+    read.  Frames are returned oldest first.
+    """
+    frames = []
+    if os.path.exists(dtime_path + ARCHIVE_TYPE):
+        with EventArchiveReader(dtime_path + ARCHIVE_TYPE) as reader:
+            for index in range(len(reader)):
+                entry = reader.metadata(index)
+                frames.append(
+                    dict(
+                        name=entry["name"],
+                        seq=int(entry["seq"]),
+                        frame_id=int(entry["frame_id"]),
+                        host_time=float(entry["host_time"]),
+                    )
+                )
+    else:
+        with open(os.path.join(dtime_path, METADATA_FILE), newline="") as f:
+            for row in csv.DictReader(f):
+                frames.append(
+                    dict(
+                        name=row["name"],
+                        seq=int(row["seq"]),
+                        frame_id=int(row["frame_id"]),
+                        host_time=float(row["host_monotonic"]),
+                    )
+                )
+    return sorted(frames, key=lambda frame: frame["seq"])
+
+
+def trigger_indices(
+    frames: List[dict], offsets: Sequence[Tuple[int, int]]
+) -> List[Optional[int]]:
+    """Return the trigger index of each of ``frames``.
+
+    ``offsets`` are a camera's ``(first sequence number, offset)`` stream
+    starts (see :attr:`Camera.trigger_offsets`), oldest first.  Frames
+    without a frame ID or from before the first known stream get ``None``.
+    """
+    starts = [seq for seq, _ in offsets]
+    indices = []
+    for frame in frames:
+        stream = bisect.bisect_right(starts, frame["seq"]) - 1
+        if stream < 0 or frame["frame_id"] < 0:
+            indices.append(None)
+        else:
+            indices.append(frame["frame_id"] + offsets[stream][1])
+    return indices
+
+
+def write_framesets(
+    event_paths: Dict[str, str],
+    reference: str,
+    offsets: Dict[str, Sequence[Tuple[int, int]]],
+) -> Optional[str]:
+    """Write the framesets of one event captured by several cameras.
+
+    ``event_paths`` maps camera names to their event path, ``reference``
+    names the sync master and ``offsets`` holds every camera's stream
+    starts.  One row is written per master frame with its trigger index and
+    the image name of every camera, empty where a camera has no frame of
+    that trigger.  The table is written into the master's event directory,
+    or next to its archive, and its path is returned.
+    """
+    names = [reference] + sorted(name for name in event_paths if name != reference)
+    columns = {}
+    for name in names:
+        frames = read_event_frames(event_paths[name])
+        columns[name] = {
+            index: frame["name"]
+            for frame, index in zip(frames, trigger_indices(frames, offsets[name]))
+            if index is not None
+        }
+
+    dtime_path = event_paths[reference]
+    if os.path.isdir(dtime_path):
+        path = os.path.join(dtime_path, FRAMESETS_FILE)
+    else:
+        path = f"{dtime_path}.{FRAMESETS_FILE}"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["trigger_index"] + names)
+        for index in sorted(columns[reference]):
+            writer.writerow([index] + [columns[n].get(index, "") for n in names])
+    return path
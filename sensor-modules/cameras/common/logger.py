@@ -1,6 +1,84 @@
+import atexit
 import datetime
 import logging
+import logging.handlers
+import queue
+import threading
+import time
 from pathlib import Path
+from typing import Dict
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per log level for messages logged on hot paths.
+
+    ``limits`` maps level names to the number of messages per second let
+    through; levels without a limit are never dropped.  Each bucket holds up
+    to one second worth of messages, so short bursts pass unchanged.  The
+    number of dropped messages is appended to the next message of the same
+    level that gets through.
+    """
+
+    def __init__(self, limits: Dict[str, float]) -> None:
+        super().__init__()
+        self._rates = {
+            logging.getLevelName(name): rate for name, rate in limits.items()
+        }
+        self._tokens = dict(self._rates)
+        self._updated = {level: time.monotonic() for level in self._rates}
+        self._dropped = dict.fromkeys(self._rates, 0)
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self._rates.get(record.levelno)
+        if rate is None:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            tokens = self._tokens[record.levelno] + (
+                now - self._updated[record.levelno]
+            ) * rate
+            self._updated[record.levelno] = now
+            if tokens < 1:
+                self._tokens[record.levelno] = tokens
+                self._dropped[record.levelno] += 1
+                return False
+            self._tokens[record.levelno] = min(tokens, rate) - 1
+            dropped = self._dropped[record.levelno]
+            self._dropped[record.levelno] = 0
+        if dropped:
+            record.msg = (
+                f"{record.msg} [{dropped} {record.levelname} messages dropped]"
+            )
+        return True
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue records as they are, so formatting happens on the listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+# Running listeners by logger name, stopped when replaced or at exit
+_listeners: Dict[str, logging.handlers.QueueListener] = {}
+
+
+def _stop_listener(name: str) -> None:
+    listener = _listeners.pop(name, None)
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+def _stop_listeners() -> None:
+    for name in list(_listeners):
+        _stop_listener(name)
+
+
+atexit.register(_stop_listeners)
 
 
 class Logger:
@@ -10,6 +88,10 @@ class Logger:
     logging related attributes (``LOG_FILE``, ``FILEMODE`` etc.).  This mirrors
     the previous behaviour of ``bubblecam_config`` but allows other cameras to
     supply their own settings without duplicating the implementation.
+
+    Records are handed to a queue and written by a background thread, so a
+    log call never waits on the disk.  The file is rotated once it reaches
+    ``LOG_MAX_BYTES`` and ``LOG_RATE_LIMITS`` caps the rate of chatty levels.
     """
 
     def __init__(self, config, name: str) -> None:
@@ -17,12 +99,37 @@ class Logger:
         log_dir = Path(__file__).resolve().parent.parent / name / "logs"
         log_dir.mkdir(parents=True, exist_ok=True)
         log_filename = log_dir / f"{curr_date}_{config.LOG_FILE}.log"
-        log_filename.touch()
-        logging.basicConfig(
-            filename=str(log_filename),
-            filemode=config.FILEMODE,
-            format=config.MESSAGE_FORMAT,
-            datefmt=config.DATE_FORMAT,
-            level=logging.DEBUG,
+        # RotatingFileHandler always appends, so FILEMODE "w" truncates here
+        open(log_filename, config.FILEMODE).close()
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            str(log_filename),
+            maxBytes=config.LOG_MAX_BYTES,
+            backupCount=config.LOG_BACKUPS,
+        )
+        file_handler.setFormatter(
+            logging.Formatter(config.MESSAGE_FORMAT, config.DATE_FORMAT)
         )
-        self.logger = logging.getLogger(__name__)
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler = _DeferredQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(config.LOG_RATE_LIMITS))
+
+        self.logger = logging.getLogger(config.LOGGER_NAME)
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(queue_handler)
+
+        # A camera reopened in the same process replaces its old listener
+        _stop_listener(config.LOGGER_NAME)
+        self.name = config.LOGGER_NAME
+        self.listener = logging.handlers.QueueListener(log_queue, file_handler)
+        self.listener.start()
+        _listeners[config.LOGGER_NAME] = self.listener
+
+    def close(self) -> None:
+        """Write out queued records and close the log file."""
+        if _listeners.get(self.name) is self.listener:
+            _stop_listener(self.name)
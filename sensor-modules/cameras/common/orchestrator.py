@@ -0,0 +1,273 @@
+"""Run several triggered cameras from one process.
+
+Each camera keeps its own ``config.py``, rolling buffer and capture thread,
+while the Spinnaker system, the trigger subscriber and the event writers are
+shared.  Opening every camera through one Spinnaker system enumerates the USB
+bus once per camera instead of once per process, and the cameras no longer
+carry a writer process and interpreter each.
+
+Every camera has its own :class:`EventScheduler`, so a trigger is queued on
+all of them and they write in parallel.  Cameras wired for hardware sync
+(``SYNC_ROLE``) are started slaves first, and every event additionally gets a
+:mod:`frameset` table aligning their frames once all of them have written it.
+
+Run it with the names of the camera directories to start::
+
+    python common/orchestrator.py bubblecam foamcam
+"""
+
+from collections import Counter
+import functools
+import importlib.util
+import os
+import threading
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, Optional, Sequence, Tuple
+
+from camera import Camera
+from event_scheduler import EventScheduler, ScheduledEvent
+from event_writer import EncoderPool, EventWriterProcess
+from frame_buffer import FrameRingBuffer
+from frameset import write_framesets
+from state import State, StateMonitor
+from trigger import Trigger, TriggerSubscriber
+
+CAMERAS_DIR = Path(__file__).resolve().parent.parent
+# Seconds to wait for every synchronized camera to write an event before
+# giving up on its framesets
+FRAMESET_TIMEOUT = 600.0
+
+
+def load_config(name: str) -> ModuleType:
+    """Load ``<name>/config.py`` under a name unique to that camera.
+
+    Every camera's configuration module is called ``config``, so they are
+    loaded by path rather than imported.
+    """
+    path = CAMERAS_DIR / name / "config.py"
+    if not path.is_file():
+        raise FileNotFoundError(f"no configuration for camera {name!r}: {path}")
+    spec = importlib.util.spec_from_file_location(f"{name}_config", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _writer_options(config: ModuleType) -> tuple:
+    """Writer settings that cameras must agree on to share a writer."""
+    return (config.ARCHIVE_COMPRESSION, config.WRITE_SYNC, config.WRITE_DIRECT)
+
+
+class Orchestrator:
+    """Capture from several cameras and write their events on one trigger.
+
+    Cameras whose configs agree on ``ARCHIVE_COMPRESSION``, ``WRITE_SYNC``
+    and ``WRITE_DIRECT`` share one writer process.  Those without a writer
+    process that also agree on ``ENCODER_POOL`` share one in-process encoder
+    pool, sized for all of them.
+    """
+
+    def __init__(self, names: Sequence[str]) -> None:
+        self.configs = {name: load_config(name) for name in names}
+        self.sync_master = self._sync_master()
+
+        writer_workers: Counter = Counter()
+        encoder_workers: Counter = Counter()
+        for config in self.configs.values():
+            options = _writer_options(config)
+            if config.WRITER_PROCESS:
+                writer_workers[options] += config.ENCODER_WORKERS
+            else:
+                encoder_workers[(config.ENCODER_POOL,) + options] += (
+                    config.ENCODER_WORKERS
+                )
+
+        # Writers are started before any camera is opened, see Camera
+        writers = {
+            options: EventWriterProcess(workers, *options)
+            for options, workers in writer_workers.items()
+        }
+        encoders = {
+            key: EncoderPool(workers, *key) for key, workers in encoder_workers.items()
+        }
+        self.writers = list(writers.values())
+        self.encoders = list(encoders.values())
+
+        self.cameras: Dict[str, Camera] = {}
+        self.buffers: Dict[str, FrameRingBuffer] = {}
+        self.locks: Dict[str, threading.Lock] = {}
+        self.threads: Dict[str, threading.Thread] = {}
+        self.schedulers: Dict[str, EventScheduler] = {}
+        for name, config in self.configs.items():
+            camera = Camera(
+                name,
+                config,
+                writer=writers.get(_writer_options(config)),
+                encoder=encoders.get((config.ENCODER_POOL,) + _writer_options(config)),
+            )
+            self.cameras[name] = camera
+            self.buffers[name] = camera.create_buffer()
+            self.locks[name] = threading.Lock()
+            self.schedulers[name] = EventScheduler(
+                camera,
+                self.buffers[name],
+                self.locks[name],
+                on_written=functools.partial(self._on_written, name),
+            )
+
+        # Monotonic time of the first write and the event paths of the
+        # synchronized cameras by event name, until complete or timed out
+        self._synced_paths: Dict[str, Tuple[float, Dict[str, str]]] = {}
+        self._synced_lock = threading.Lock()
+
+        # One subscriber connected to every configured trigger publisher
+        endpoints = set()
+        for config in self.configs.values():
+            endpoints.add(f"tcp://{config.SERVER_IP}:{config.SERVER_PORT}")
+            endpoints.update(config.TRIGGER_ENDPOINTS)
+        self.subscriber = TriggerSubscriber(sorted(endpoints))
+        self.monitor = StateMonitor()
+
+    def _sync_master(self) -> Optional[str]:
+        """Return the sync master's name, or ``None`` without sync."""
+        roles = {name: config.SYNC_ROLE for name, config in self.configs.items()}
+        masters = [name for name, role in roles.items() if role == "master"]
+        if "slave" in roles.values() and len(masters) != 1:
+            raise ValueError("synchronized cameras need exactly one sync master")
+        return masters[0] if masters else None
+
+    def _start_capture(self, name: str) -> None:
+        thread = threading.Thread(
+            target=self.cameras[name].capture_loop,
+            args=(self.buffers[name], self.locks[name]),
+            name=f"{name}-capture",
+            daemon=True,
+        )
+        thread.start()
+        self.threads[name] = thread
+
+    def start(self) -> None:
+        """Start one capture thread per camera.
+
+        Slaves begin acquisition before any capture thread starts, so they
+        are armed for the master's first trigger.
+        """
+        for name, config in self.configs.items():
+            if config.SYNC_ROLE == "slave":
+                self.cameras[name].cam.resume()
+        for name in self.cameras:
+            self._start_capture(name)
+
+    def set_state(self, state: State) -> None:
+        """Switch every camera to the glider ``state``."""
+        for camera in self.cameras.values():
+            camera.set_state(state)
+
+    def submit(self, trigger: Trigger) -> Dict[str, str]:
+        """Schedule the event of ``trigger`` on every camera.
+
+        Cameras name events after the trigger time, so configs that agree on
+        the trigger windows name a shared event alike.  Returns the outcome
+        of :meth:`EventScheduler.submit` for each camera.
+        """
+        return {
+            name: scheduler.submit(trigger)
+            for name, scheduler in self.schedulers.items()
+        }
+
+    def _on_written(self, name: str, event: ScheduledEvent, path: str) -> None:
+        """Write the framesets once every synchronized camera has the event."""
+        if self.sync_master is None or self.configs[name].SYNC_ROLE is None:
+            return
+        synced_names = {
+            camera for camera, config in self.configs.items() if config.SYNC_ROLE
+        }
+        key = os.path.basename(path)
+        master = self.cameras[self.sync_master]
+        now = time.monotonic()
+        with self._synced_lock:
+            for stale, (first, paths) in list(self._synced_paths.items()):
+                if now - first > FRAMESET_TIMEOUT:
+                    del self._synced_paths[stale]
+                    master.logger.warning(
+                        "No framesets for %s: only %s wrote it",
+                        stale,
+                        ", ".join(sorted(paths)),
+                    )
+            paths = self._synced_paths.setdefault(key, (now, {}))[1]
+            paths[name] = path
+            if set(paths) != synced_names:
+                return
+            del self._synced_paths[key]
+
+        offsets = {
+            camera: list(self.cameras[camera].trigger_offsets) for camera in paths
+        }
+        try:
+            write_framesets(paths, self.sync_master, offsets)
+        except (OSError, KeyError, ValueError) as exc:
+            master.logger.error("Could not write framesets: %s", exc)
+
+    def run(self) -> None:
+        """Capture until stopped, writing events on every trigger.
+
+        The glider state is polled from :attr:`monitor` on every pass, so
+        the cameras idle and resume with it.
+        """
+        self.set_state(self.monitor.get_state())
+        self.start()
+        while not self.subscriber.stopped:
+            for name, thread in self.threads.items():
+                if not thread.is_alive():
+                    self.cameras[name].cam.reset()
+                    self._start_capture(name)
+            self.set_state(self.monitor.get_state())
+
+            # The timeout bounds how long a dead capture thread or a state change
+            # goes unnoticed
+            trigger = self.subscriber.wait(timeout=1.0)
+            if trigger is not None and trigger.message.startswith("trigger"):
+                self.submit(trigger)
+
+    def stop(self) -> None:
+        """Make :meth:`run` return; safe to call from any thread."""
+        self.subscriber.stop()
+
+    def power_off(self) -> None:
+        for scheduler in self.schedulers.values():
+            scheduler.stop()
+        for camera in self.cameras.values():
+            camera.power_off()
+        for writer in self.writers:
+            writer.stop()
+        for encoder in self.encoders:
+            encoder.shutdown()
+        self.subscriber.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Run several triggered cameras in one process"
+    )
+    parser.add_argument(
+        "cameras",
+        nargs="+",
+        help="Camera directories to load config.py from, e.g. bubblecam foamcam",
+    )
+    args = parser.parse_args()
+
+    orchestrator = Orchestrator(args.cameras)
+    try:
+        orchestrator.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        orchestrator.power_off()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Frame ring buffer living in :mod:`multiprocessing.shared_memory`.
+
+The capture process owns a :class:`SharedFrameRingBuffer`.  Snapshots taken
+from it only describe where the frames live (segment name, bank and slots),
+so a writer process can attach to the segment with
+:class:`SharedSnapshotReader` and read the event window in place instead of
+receiving the frames through a pickle.
+
+Segment layout::
+
+    int64[4]                 active bank, write index, frame count, next seq
+    int64[banks, capacity]   sequence number of each slot
+    float64[banks, capacity] wall-clock capture time of each slot
+    int64[banks, capacity]   camera frame ID of each slot
+    int64[banks, capacity]   camera timestamp (ns) of each slot
+    float64[banks, capacity] host monotonic receive time of each slot
+    (padding to 64 bytes)
+    dtype[banks, capacity, H, W[, C]]  frame slab
+"""
+
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from frame_buffer import FrameRingBuffer, FrameSnapshot
+
+HEADER_FIELDS = 4
+SLAB_ALIGNMENT = 64
+# Per-slot arrays following the header, in segment order
+SLOT_ARRAYS = (
+    ("_seqs", np.int64),
+    ("_timestamps", np.float64),
+    ("_frame_ids", np.int64),
+    ("_device_timestamps", np.int64),
+    ("_host_times", np.float64),
+)
+
+
+@dataclass(frozen=True, eq=False)
+class SharedFrameSnapshot(FrameSnapshot):
+    """Snapshot that also records how to map the shared segment."""
+
+    segment: str = ""
+    banks: int = 0
+    capacity: int = 0
+    frame_shape: Tuple[int, ...] = ()
+    dtype: str = ""
+
+
+def _layout(banks: int, capacity: int, frame_shape: tuple, dtype: np.dtype) -> tuple:
+    """Return the per-slot array offsets, the slab offset and the segment size."""
+    slots = banks * capacity
+    offsets = []
+    offset = HEADER_FIELDS * 8
+    for _, slot_dtype in SLOT_ARRAYS:
+        offsets.append(offset)
+        offset += slots * np.dtype(slot_dtype).itemsize
+    slab_offset = -(-offset // SLAB_ALIGNMENT) * SLAB_ALIGNMENT
+    slab_bytes = slots * int(np.prod(frame_shape)) * np.dtype(dtype).itemsize
+    return offsets, slab_offset, slab_offset + slab_bytes
+
+
+def _map_arrays(buf, banks: int, capacity: int, frame_shape: tuple, dtype) -> dict:
+    """Create views of the header, per-slot arrays and slab over ``buf``."""
+    offsets, slab_offset, _ = _layout(banks, capacity, frame_shape, dtype)
+    arrays = {"_header": np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=buf)}
+    for (name, slot_dtype), offset in zip(SLOT_ARRAYS, offsets):
+        arrays[name] = np.ndarray(
+            (banks, capacity), dtype=slot_dtype, buffer=buf, offset=offset
+        )
+    arrays["_slab"] = np.ndarray(
+        (banks, capacity) + tuple(frame_shape),
+        dtype=dtype,
+        buffer=buf,
+        offset=slab_offset,
+    )
+    return arrays
+
+
+class SharedFrameRingBuffer(FrameRingBuffer):
+    """:class:`FrameRingBuffer` whose slab and header are in shared memory.
+
+    A new segment is created whenever the slab is (re)allocated, i.e. on the
+    first frame and whenever the frame format changes.  Snapshots carry the
+    name of the segment they refer to, so a segment replaced while snapshots
+    of it are still held is only unlinked once the last of them is released.
+    """
+
+    def __init__(self, capacity: int, banks: int = 2) -> None:
+        super().__init__(capacity, banks)
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._header: Optional[np.ndarray] = None
+        # Replaced segments by name, with the number of snapshots still held
+        self._retired: Dict[str, List] = {}
+
+    def _create_arrays(self, frame_shape: tuple, dtype: np.dtype) -> None:
+        held = sum(self._held)
+        if self._shm is not None and held:
+            # A writer may not have attached yet to the snapshots' segment
+            self._retired[self._shm.name] = [self._shm, held]
+            self._drop_views()
+            self._shm = None
+        self._close_segment()
+        size = _layout(self.banks, self.capacity, frame_shape, dtype)[2]
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        arrays = _map_arrays(
+            self._shm.buf, self.banks, self.capacity, frame_shape, dtype
+        )
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self._header[:] = 0
+        self._seqs[:] = -1
+        self._frame_ids[:] = -1
+        self._device_timestamps[:] = -1
+
+    def _publish(self) -> None:
+        if self._header is not None:
+            self._header[:] = (self._bank, self._head, self._count, self._seq)
+
+    def snapshot(
+        self, start_seq: Optional[int] = None, stop_seq: Optional[int] = None
+    ) -> Optional[SharedFrameSnapshot]:
+        snapshot = super().snapshot(start_seq, stop_seq)
+        if snapshot is None:
+            return None
+        return SharedFrameSnapshot(
+            **vars(snapshot),
+            segment=self._shm.name,
+            banks=self.banks,
+            capacity=self.capacity,
+            frame_shape=tuple(self._slab.shape[2:]),
+            dtype=self._slab.dtype.str,
+        )
+
+    def release(self, snapshot: SharedFrameSnapshot) -> None:
+        retired = self._retired.get(snapshot.segment)
+        if retired is None:
+            super().release(snapshot)
+            return
+        retired[1] -= 1
+        if retired[1] == 0:
+            del self._retired[snapshot.segment]
+            _unlink(retired[0])
+
+    def snapshot_frames(self, snapshot: SharedFrameSnapshot) -> Iterator[np.ndarray]:
+        retired = self._retired.get(snapshot.segment)
+        if retired is None:
+            yield from super().snapshot_frames(snapshot)
+            return
+        bank = _map_arrays(
+            retired[0].buf,
+            snapshot.banks,
+            snapshot.capacity,
+            snapshot.frame_shape,
+            np.dtype(snapshot.dtype),
+        )["_slab"][snapshot.bank]
+        for slot in snapshot.slots:
+            yield bank[slot]
+
+    def _drop_views(self) -> None:
+        # Views must be dropped before the mapping can be closed
+        self._header = self._slab = None
+        for name, _ in SLOT_ARRAYS:
+            setattr(self, name, None)
+
+    def _close_segment(self) -> None:
+        """Unmap and unlink the current shared segment, if one was created."""
+        if self._shm is None:
+            return
+        self._drop_views()
+        _unlink(self._shm)
+        self._shm = None
+
+    def close(self) -> None:
+        """Unmap and unlink every shared segment, held by snapshots or not."""
+        self._close_segment()
+        for shm, _ in self._retired.values():
+            _unlink(shm)
+        self._retired.clear()
+
+
+def _unlink(shm: shared_memory.SharedMemory) -> None:
+    """Unlink ``shm`` and unmap it unless frames read from it are still alive."""
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+    try:
+        shm.close()
+    except BufferError:
+        # Unmapped once the last view is collected
+        pass
+
+
+class SharedSnapshotReader:
+    """Read :class:`SharedFrameSnapshot` frames from another process.
+
+    The most recently used segment stays attached between snapshots so that
+    consecutive events do not pay for a new mapping.
+    """
+
+    def __init__(self) -> None:
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._arrays: Optional[dict] = None
+
+    def _attach(self, snapshot: SharedFrameSnapshot) -> None:
+        if self._shm is not None and self._shm.name == snapshot.segment:
+            return
+        self.close()
+        self._shm = shared_memory.SharedMemory(name=snapshot.segment)
+        self._arrays = _map_arrays(
+            self._shm.buf,
+            snapshot.banks,
+            snapshot.capacity,
+            snapshot.frame_shape,
+            np.dtype(snapshot.dtype),
+        )
+
+    def items(self, snapshot: SharedFrameSnapshot) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield ``(position, frame)`` views of the snapshot, oldest first.
+
+        Slots whose sequence number no longer matches the snapshot were
+        overwritten after it was taken and are skipped.
+        """
+        self._attach(snapshot)
+        bank_seqs = self._arrays["_seqs"][snapshot.bank]
+        bank = self._arrays["_slab"][snapshot.bank]
+        for pos, (slot, seq) in enumerate(zip(snapshot.slots, snapshot.seqs)):
+            if bank_seqs[slot] != seq:
+                continue
+            yield pos, bank[slot]
+
+    def frames(self, snapshot: SharedFrameSnapshot) -> Iterator[np.ndarray]:
+        """Yield views of the snapshot's valid frames, oldest first."""
+        for _, frame in self.items(snapshot):
+            yield frame
+
+    def close(self) -> None:
+        """Detach from the current segment without unlinking it."""
+        if self._shm is None:
+            return
+        self._arrays = None
+        self._shm.close()
+        self._shm = None
@@ -8,3 +8,11 @@ class State(Enum):
     QUIESCENT = 2
     STORM = 3
     WAVEBREAK = 4
+
+
+class StateMonitor:
+    """Placeholder state monitor returning the current glider state."""
+
+    def get_state(self) -> State:
+        # In real deployment, this would query an external system
+        return State.STORM
@@ -0,0 +1,212 @@
+"""Disk space accounting and retention for a camera's ``IMG_DIR``.
+
+A :class:`StorageManager` indexes the entries of the image directory once at
+startup and from then on only adds what the camera records as written, so
+neither the quota check nor eviction rescans the directory.  Free space on
+the disk is read with ``statvfs`` every ``refresh_interval`` seconds and
+estimated from the bytes written in between.
+
+Writes are admitted while they keep the camera within ``quota`` and the disk
+above ``min_free``.  Past either limit the ``policy`` decides:
+
+* ``"evict_oldest"`` deletes the camera's oldest entries until the write fits;
+* ``"compress"`` admits the write in a compressed image format while it still
+  fits on the disk and in the quota;
+* ``"refuse_low_priority"`` refuses low priority writes and admits the rest
+  while they still fit on the disk and in the quota.
+"""
+
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict, deque
+from logging import Logger
+from typing import Deque, NamedTuple, Optional, Tuple
+
+# Outcomes of StorageManager.admit
+ALLOW = "allow"
+COMPRESS = "compress"
+REFUSE = "refuse"
+
+STORAGE_POLICIES = ("evict_oldest", "compress", "refuse_low_priority")
+
+
+class StorageStatus(NamedTuple):
+    """Usage of one image directory.
+
+    ``rate`` is the recent write rate in bytes per second and
+    ``seconds_left`` the time until a limit is reached at that rate.
+    """
+
+    used: int
+    quota: Optional[int]
+    free: int
+    rate: float
+    seconds_left: float
+
+
+def path_size(path: str) -> int:
+    """Bytes used by the file or directory tree at ``path``, 0 if missing."""
+    try:
+        if not os.path.isdir(path):
+            return os.path.getsize(path)
+    except OSError:
+        return 0
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _existing_parent(path: str) -> str:
+    """``path`` or its closest existing parent, for ``statvfs``."""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+class StorageManager:
+    """Track the space used by one camera and decide which writes may go.
+
+    ``quota`` is in bytes for everything under ``root`` (``None`` for no
+    quota) and ``min_free`` the bytes to keep free on its disk.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        quota: Optional[int] = None,
+        min_free: int = 0,
+        policy: str = "evict_oldest",
+        logger: Optional[Logger] = None,
+        refresh_interval: float = 10.0,
+        rate_window: float = 60.0,
+    ) -> None:
+        if policy not in STORAGE_POLICIES:
+            raise ValueError(f"unknown storage policy {policy!r}")
+        self.root = str(root)
+        self.quota = quota
+        self.min_free = min_free
+        self.policy = policy
+        self.logger = logger
+        self.refresh_interval = refresh_interval
+        self.rate_window = rate_window
+
+        # Entries under root with their size, oldest first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._used = 0
+        self._free = 0
+        self._free_at = float("-inf")
+        self._written: Deque[Tuple[float, int]] = deque()
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _scan(self) -> None:
+        """Index what is already under ``root``; only done at startup."""
+        try:
+            entries = list(os.scandir(self.root))
+        except OSError:
+            return
+        sized = []
+        for entry in entries:
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            sized.append((mtime, entry.path, path_size(entry.path)))
+        for _, path, size in sorted(sized):
+            self._entries[path] = size
+            self._used += size
+
+    def _free_bytes(self) -> int:
+        now = time.monotonic()
+        if now - self._free_at >= self.refresh_interval:
+            self._free = shutil.disk_usage(_existing_parent(self.root)).free
+            self._free_at = now
+        return self._free
+
+    def _fits(self, nbytes: int, min_free: int) -> bool:
+        if self.quota is not None and self._used + nbytes > self.quota:
+            return False
+        return self._free_bytes() - nbytes >= min_free
+
+    def admit(self, nbytes: int, low_priority: bool = False) -> str:
+        """Decide on a write of about ``nbytes`` bytes.
+
+        Returns :data:`ALLOW`, :data:`COMPRESS` or :data:`REFUSE`; with the
+        ``"evict_oldest"`` policy old entries are deleted to make room first.
+        """
+        with self._lock:
+            if self._fits(nbytes, self.min_free):
+                return ALLOW
+            if self.policy == "evict_oldest":
+                self._evict(nbytes)
+                return ALLOW if self._fits(nbytes, self.min_free) else REFUSE
+            if not self._fits(nbytes, 0):
+                return REFUSE
+            if self.policy == "compress":
+                return COMPRESS
+            return REFUSE if low_priority else ALLOW
+
+    def _evict(self, nbytes: int) -> None:
+        while self._entries and not self._fits(nbytes, self.min_free):
+            path, size = self._entries.popitem(last=False)
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as exc:
+                if self.logger is not None:
+                    self.logger.error("Could not evict %s: %s", path, exc)
+                continue
+            self._used -= size
+            self._free += size
+            if self.logger is not None:
+                self.logger.info("Evicted %s to free %d bytes", path, size)
+
+    def record(self, path: str, nbytes: Optional[int] = None) -> None:
+        """Account for the entry at ``path`` under ``root`` once written.
+
+        ``nbytes`` defaults to the size of the file or directory; recording
+        a path again accounts for the bytes it grew by.
+        """
+        if nbytes is None:
+            nbytes = path_size(path)
+        with self._lock:
+            added = nbytes - self._entries.pop(path, 0)
+            self._entries[path] = nbytes
+            self._used += added
+            self._free -= added
+            self._written.append((time.monotonic(), added))
+
+    def rate(self) -> float:
+        """Bytes per second written over the last ``rate_window`` seconds."""
+        with self._lock:
+            cutoff = time.monotonic() - self.rate_window
+            while self._written and self._written[0][0] < cutoff:
+                self._written.popleft()
+            return sum(nbytes for _, nbytes in self._written) / self.rate_window
+
+    def status(self) -> StorageStatus:
+        """Current usage, write rate and time left before a limit is hit."""
+        rate = self.rate()
+        with self._lock:
+            free = self._free_bytes()
+            remaining = free - self.min_free
+            if self.quota is not None:
+                remaining = min(remaining, self.quota - self._used)
+            used = self._used
+        seconds_left = max(remaining, 0) / rate if rate > 0 else float("inf")
+        return StorageStatus(used, self.quota, free, rate, seconds_left)
@@ -0,0 +1,103 @@
+import csv
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from bayer import debayer, debayer_event, pack12, parse_bayer, unpack12
+from camera_backends import SyntheticCapture
+from event_writer import METADATA_FILE, EncoderPool
+from frame_buffer import FrameRingBuffer
+
+
+def _red_mosaic(height=8, width=8, value=255, dtype=np.uint8):
+    """An RGGB mosaic of a uniformly red scene."""
+    mosaic = np.zeros((height, width), dtype=dtype)
+    mosaic[0::2, 0::2] = value
+    return mosaic
+
+
+def test_parse_bayer():
+    assert parse_bayer("BayerRG8") == ("RG", 8, "")
+    assert parse_bayer("BayerGB12p") == ("GB", 12, "p")
+    assert parse_bayer("BayerBG12Packed") == ("BG", 12, "Packed")
+    assert parse_bayer("Mono8") is None
+    assert parse_bayer(None) is None
+
+
+@pytest.mark.parametrize("lsb_first", [True, False])
+def test_pack12_round_trip(lsb_first):
+    samples = np.arange(4 * 6, dtype=np.uint16).reshape(4, 6) * 170 % 4096
+    packed = pack12(samples, lsb_first)
+    # Two 12-bit samples in three bytes
+    assert packed.shape == (4, 9) and packed.dtype == np.uint8
+    np.testing.assert_array_equal(unpack12(packed, lsb_first), samples)
+
+
+def test_unpack12_follows_the_p_layout():
+    packed = np.array([[0x21, 0x43, 0x65]], dtype=np.uint8)
+    np.testing.assert_array_equal(unpack12(packed), [[0x321, 0x654]])
+    np.testing.assert_array_equal(unpack12(packed, False), [[0x213, 0x654]])
+
+
+def test_debayer_restores_colour():
+    colour = debayer(_red_mosaic(), "BayerRG8")
+    assert colour.shape == (8, 8, 3) and colour.dtype == np.uint8
+    # Away from the borders the scene is pure red
+    np.testing.assert_array_equal(colour[3, 3], [0, 0, 255])
+
+    packed = pack12(_red_mosaic(value=4095, dtype=np.uint16))
+    colour = debayer(packed, "BayerRG12p")
+    assert colour.dtype == np.uint16
+    np.testing.assert_array_equal(colour[3, 3], [0, 0, 65520])
+
+    with pytest.raises(ValueError):
+        debayer(_red_mosaic(), "Mono8")
+
+
+def test_synthetic_packed_frames_are_two_thirds_of_mono16():
+    capture = SyntheticCapture(fps=1000, resolution=(16, 4), pixel_format="Mono16")
+    mono16 = capture.read()[1]
+    assert capture.set_pixel_format("BayerRG12p")
+    packed = capture.read()[1]
+    assert packed.shape == (4, 24) and packed.dtype == np.uint8
+    assert packed.nbytes * 4 == mono16.nbytes * 3
+    assert capture.get(cv2.CAP_PROP_FRAME_WIDTH) == 16
+
+
+@pytest.mark.parametrize("img_type", [".png", ".frames"])
+def test_events_record_pixel_format_and_debayer_later(tmp_path, img_type):
+    buffer = FrameRingBuffer(2, banks=2)
+    for _ in range(2):
+        buffer.append(_red_mosaic())
+    snapshot = buffer.snapshot()
+    pool = EncoderPool()
+    try:
+        pool.write(
+            snapshot,
+            list(buffer.snapshot_frames(snapshot)),
+            str(tmp_path / "event"),
+            img_type,
+            pixel_format="BayerRG8",
+        )
+    finally:
+        pool.shutdown()
+
+    if img_type == ".frames":
+        path = str(tmp_path / "event.frames")
+    else:
+        path = str(tmp_path / "event")
+        with open(Path(path) / METADATA_FILE, newline="") as f:
+            assert [row["pixel_format"] for row in csv.DictReader(f)] == [
+                "BayerRG8"
+            ] * 2
+        # Stored as the raw mosaic
+        raw = cv2.imread(str(Path(path) / "img_0.png"), cv2.IMREAD_UNCHANGED)
+        np.testing.assert_array_equal(raw, _red_mosaic())
+
+    assert debayer_event(path, str(tmp_path / "colour")) == 2
+    colour = cv2.imread(str(tmp_path / "colour" / "img_0.png"))
+    np.testing.assert_array_equal(colour[3, 3], [0, 0, 255])
@@ -0,0 +1,49 @@
+import logging
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import benchmark
+import camera
+from benchmark import METRICS, Scenario, compare, run_scenario, scenario_config
+
+
+def test_scenario_config_overrides_camera_config(tmp_path):
+    scenario = Scenario(".frames", 12, (64, 48), 50.0, False)
+    config = scenario_config(scenario, "bubblecam", str(tmp_path))
+    assert config.IMG_TYPE == ".frames"
+    assert config.ROLL_BUF_SIZE == config.PRE_TRIGGER_FRAMES == 12
+    assert config.POST_TRIGGER_FRAMES == 0
+    assert config.CAMERA_BACKEND == "synthetic"
+    assert config.CAMERA_BACKEND_OPTIONS == {"resolution": (64, 48)}
+    assert config.STORAGE_QUOTA is None
+    # Untouched settings come from the camera's config.py
+    assert config.LOG_FILE == benchmark.load_config("bubblecam").LOG_FILE
+
+
+def test_run_scenario_measures_every_metric(monkeypatch):
+    monkeypatch.setattr(
+        camera, "Logger", lambda *_: SimpleNamespace(logger=logging.getLogger("test"))
+    )
+    scenario = Scenario(".png", 4, (32, 24), 200.0, False)
+    result = run_scenario(scenario, "bubblecam", duration=0.1, events=2)
+    assert result["key"] == scenario.key()
+    assert result["capture_fps"] > 0
+    assert 0 < result["first_file_latency_s"] <= result["first_file_latency_max_s"]
+    assert result["flush_s_per_mb"] > result["flush_s_per_frame"] > 0
+    # No writer process to measure
+    assert result["writer_peak_rss_mb"] is None
+    assert set(METRICS) <= set(result)
+
+
+def test_compare_reports_regressions_beyond_tolerance():
+    baseline = [dict(key="a", capture_fps=100.0, flush_s_per_frame=0.01)]
+    results = [
+        dict(key="a", capture_fps=95.0, flush_s_per_frame=0.02),
+        dict(key="b", capture_fps=1.0),
+    ]
+    regressions = compare(results, baseline, tolerance=0.1)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("a: flush_s_per_frame")
+    assert len(compare(results, baseline, tolerance=0.01)) == 2
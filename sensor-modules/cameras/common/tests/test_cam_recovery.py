@@ -0,0 +1,193 @@
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import cam
+
+
+class FakeCapture:
+    """Stands in for ``EasyPySpin.VideoCapture``."""
+
+    instances = []
+    system_refs = 0
+    settings_valid = True
+    format_valid = True
+
+    def __init__(self, *_):
+        self.restarts = 0
+        self.reinits = 0
+        self.calls = []
+        self.released = False
+        FakeCapture.instances.append(self)
+
+    @classmethod
+    def retain_system(cls):
+        cls.system_refs += 1
+
+    @classmethod
+    def release_system(cls):
+        cls.system_refs -= 1
+
+    def apply_settings(self, settings):
+        self.calls.append("apply_settings")
+        return self.settings_valid
+
+    def set_pixel_format(self, pixel_format):
+        self.calls.append(("set_pixel_format", pixel_format))
+        return True
+
+    def set_binning(self, binning, decimation):
+        self.calls.append(("set_binning", binning, decimation))
+        return True
+
+    def set_roi(self, roi):
+        self.calls.append(("set_roi", roi))
+        return self.format_valid
+
+    def set_sync_role(self, role, line):
+        self.calls.append(("set_sync_role", role, line))
+        return True
+
+    def restart_stream(self):
+        self.restarts += 1
+
+    def reinitialize(self):
+        self.reinits += 1
+        self.calls = []
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        self.released = True
+
+
+def _cam(monkeypatch, **kwargs):
+    FakeCapture.instances = []
+    FakeCapture.system_refs = 0
+    monkeypatch.setattr(cam, "SpinVideoCapture", FakeCapture)
+    sleeps = []
+    monkeypatch.setattr(cam.time, "sleep", sleeps.append)
+    camera = cam.Cam(
+        "testcam",
+        None,
+        0,
+        1000,
+        0,
+        10,
+        0.25,
+        8,
+        1,
+        ".png",
+        4,
+        recovery_retries=2,
+        recovery_backoff=0.5,
+        recovery_backoff_max=1.5,
+        **kwargs,
+    )
+    return camera, sleeps
+
+
+def test_recovery_escalates_and_backs_off(monkeypatch):
+    """Retries come first, then cheaper resets before backed off reopens."""
+    camera, sleeps = _cam(monkeypatch)
+    first = camera.camera
+
+    steps = [camera.recover() for _ in range(7)]
+
+    assert steps == [
+        cam.RETRY,
+        cam.RETRY,
+        cam.RESTART_STREAM,
+        cam.REINITIALIZE,
+        cam.REOPEN,
+        cam.REOPEN,
+        cam.REOPEN,
+    ]
+    assert (first.restarts, first.reinits) == (1, 1)
+    assert sleeps == [0.5, 1.0, 1.5]
+    assert len(FakeCapture.instances) == 4
+    # The system is held across every reopen
+    assert FakeCapture.system_refs == 1
+
+    seconds, step, failures = camera.recovered()
+    assert (step, failures) == (cam.REOPEN, 7)
+    assert seconds >= 0
+    assert camera.recovered() is None
+
+    camera.power_off()
+    assert FakeCapture.system_refs == 0
+
+
+def test_errors_skip_retries(monkeypatch):
+    """An exception from the camera goes straight to a stream restart."""
+    camera, _ = _cam(monkeypatch)
+
+    assert camera.recover(transient=False) == cam.RESTART_STREAM
+
+
+def test_region_is_set_before_the_frame_rate(monkeypatch):
+    """The frame size bounds the frame rate, so it is applied first."""
+    camera, _ = _cam(
+        monkeypatch, roi=[8, 16, 640, 480], binning=2, pixel_format="BayerRG8"
+    )
+    assert camera.camera.calls == [
+        ("set_pixel_format", "BayerRG8"),
+        ("set_binning", 2, 1),
+        ("set_roi", (8, 16, 640, 480)),
+        "apply_settings",
+        ("set_sync_role", None, "Line2"),
+    ]
+
+
+def _reinitialize(camera):
+    """Fail reads until recovery reaches its reinitialize step."""
+    while camera.recover(transient=False) != cam.REINITIALIZE:
+        pass
+
+
+def test_reinitialize_restores_format_and_sync_role(monkeypatch):
+    """Reinitializing resets every node, so the whole configuration goes back."""
+    camera, _ = _cam(
+        monkeypatch, roi=[8, 16, 640, 480], pixel_format="BayerRG8", sync_role="slave"
+    )
+    _reinitialize(camera)
+
+    assert camera.camera.reinits == 1
+    assert camera.camera.calls == [
+        ("set_pixel_format", "BayerRG8"),
+        ("set_binning", 1, 1),
+        ("set_roi", (8, 16, 640, 480)),
+        "apply_settings",
+        ("set_sync_role", "slave", "Line2"),
+    ]
+    assert len(FakeCapture.instances) == 1
+
+
+def test_refused_reinitialize_reopens(monkeypatch):
+    """A camera that will not take its configuration back is reopened."""
+    camera, sleeps = _cam(monkeypatch)
+    first = camera.camera
+    first.format_valid = False
+
+    assert camera.recover(transient=False) == cam.RESTART_STREAM
+    assert camera.recover(transient=False) == cam.REOPEN
+    assert first.reinits == 1
+    assert sleeps == [0.5]
+    assert camera.camera is not first
+
+
+@pytest.mark.parametrize("refused", ["settings_valid", "format_valid"])
+def test_refused_configuration_fails_the_open(monkeypatch, refused):
+    """A camera refusing its configuration is not swapped for a cv2 device."""
+    monkeypatch.setattr(FakeCapture, refused, False)
+    monkeypatch.setattr(cam.cv2, "VideoCapture", MagicMock())
+    with pytest.raises(RuntimeError):
+        _cam(monkeypatch)
+
+    assert FakeCapture.instances[0].released
+    assert FakeCapture.system_refs == 0
+    cam.cv2.VideoCapture.assert_not_called()
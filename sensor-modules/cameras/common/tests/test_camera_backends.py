@@ -0,0 +1,132 @@
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import camera
+import cv2
+from cam import Cam
+from camera_backends import ReplayCapture, SyntheticCapture
+from event_writer import EncoderPool
+from frame_buffer import FrameRingBuffer
+from state import State
+from test_camera_write import _config
+
+
+def _record_event(tmp_path, img_type):
+    buffer = FrameRingBuffer(4, banks=2)
+    for value in range(4):
+        buffer.append(
+            np.full((6, 8), value, dtype=np.uint8), host_time=10.0 + 0.02 * value
+        )
+    snapshot = buffer.snapshot()
+    pool = EncoderPool()
+    try:
+        pool.write(
+            snapshot,
+            list(buffer.snapshot_frames(snapshot)),
+            str(tmp_path / "event"),
+            img_type,
+        )
+    finally:
+        pool.shutdown()
+    return str(tmp_path / "event") + (img_type if img_type == ".frames" else "")
+
+
+def test_synthetic_frames_follow_format_and_rate():
+    capture = SyntheticCapture(fps=100, resolution=(16, 8), pixel_format="Mono16")
+    out = np.empty((8, 16), dtype=np.uint16)
+    start = time.monotonic()
+    for _ in range(10):
+        success, frame = capture.read(out)
+        assert success and frame is out
+    # Ten frames at 100 fps take at least nine frame periods
+    assert time.monotonic() - start >= 0.085
+    assert capture.read()[1].dtype == np.uint16
+    capture.release()
+    assert not capture.isOpened() and capture.read() == (False, None)
+
+
+def test_synthetic_binning_and_roi_shrink_frames():
+    capture = SyntheticCapture(fps=1000, resolution=(64, 48))
+    assert capture.set_binning(2)
+    assert capture.read()[1].shape == (24, 32)
+    assert capture.set_roi((4, 2, 16, 8))
+    assert capture.read()[1].shape == (8, 16)
+    assert capture.get(cv2.CAP_PROP_FRAME_WIDTH) == 16
+    assert capture.get(cv2.CAP_PROP_FRAME_HEIGHT) == 8
+    # Regions are taken from the binned image
+    assert not capture.set_roi((20, 0, 16, 8))
+    assert capture.set_roi(None)
+    assert capture.get(cv2.CAP_PROP_FRAME_WIDTH) == 32
+
+
+def test_cam_applies_region_to_backends(tmp_path):
+    args = ("testcam", None, 0, 1000, 0, 10, 0.25, 1000, 1, ".png", 4)
+    synthetic = Cam(
+        *args,
+        backend="synthetic",
+        backend_options={"resolution": (64, 48)},
+        roi=(0, 0, 20, 10),
+        decimation=2,
+    )
+    success, record = synthetic.capture_record()
+    assert success and record.image.shape == (10, 20)
+    synthetic.power_off()
+
+    # Recordings cannot be cropped on capture
+    with pytest.raises(ValueError):
+        Cam(
+            *args,
+            backend="replay",
+            backend_options={"path": _record_event(tmp_path, ".png")},
+            roi=(0, 0, 4, 4),
+        )
+
+
+def test_replay_plays_events_oldest_first(tmp_path):
+    """Directories and archives replay in capture order at the recorded pace."""
+    for img_type in (".png", ".frames"):
+        capture = ReplayCapture(
+            _record_event(tmp_path / img_type[1:], img_type), loop=False
+        )
+        start = time.monotonic()
+        values = [int(capture.read()[1][0, 0]) for _ in range(4)]
+        assert values == [0, 1, 2, 3]
+        assert time.monotonic() - start >= 0.05
+        assert capture.read() == (False, None)
+
+
+def test_capture_loop_and_write_on_synthetic_backend(monkeypatch, tmp_path):
+    """The whole capture and write pipeline runs without a camera."""
+    monkeypatch.setattr(
+        camera, "Logger", lambda *_: SimpleNamespace(logger=logging.getLogger("test"))
+    )
+    config = _config(
+        tmp_path,
+        FPS=200,
+        PRE_TRIGGER_FRAMES=3,
+        POST_TRIGGER_FRAMES=2,
+        CAMERA_BACKEND="synthetic",
+        CAMERA_BACKEND_OPTIONS={"resolution": (32, 24)},
+    )
+    cam = camera.Camera("synthetic", config)
+    buffer = cam.create_buffer()
+    lock = threading.Lock()
+    threading.Thread(target=cam.capture_loop, args=(buffer, lock), daemon=True).start()
+    deadline = time.monotonic() + 2
+    while buffer.seq < 4 and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+    path = cam.write_images(buffer, lock, "event")
+    cam.set_state(State.QUIESCENT)
+    cam.encoder.shutdown()
+
+    names = sorted(p.name for p in Path(path).glob("img_*.png"))
+    assert names == [f"img_{idx}.png" for idx in range(5)]
@@ -0,0 +1,54 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from test_camera_write import _camera, _config
+from EasyPySpin import FrameRecord
+from state import State
+
+
+def _wait_until(predicate, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_capture_pauses_outside_capture_states(monkeypatch, tmp_path):
+    """Idle states stop acquisition and STORM resumes it."""
+    cam = _camera(monkeypatch, _config(tmp_path))
+    cam.cam.frames_dropped = 0
+    cam.cam.recovered.return_value = None
+    captured = threading.Event()
+
+    def capture_record(out):
+        captured.set()
+        time.sleep(0.01)
+        return True, FrameRecord(np.zeros((2, 2), np.uint8), 1, -1, time.monotonic())
+
+    cam.cam.capture_record.side_effect = capture_record
+    cam.set_state(State.QUIESCENT)
+    buffer = cam.create_buffer()
+    thread = threading.Thread(
+        target=cam.capture_loop, args=(buffer, threading.Lock()), daemon=True
+    )
+    thread.start()
+
+    assert _wait_until(lambda: cam.cam.pause.called)
+    cam.set_state(State.LOW_POWER)
+    assert _wait_until(lambda: cam.cam.power_off.called)
+    assert not captured.is_set()
+
+    cam.set_state(State.STORM)
+    assert captured.wait(1)
+    assert _wait_until(lambda: cam.resume_latency is not None)
+    cam.cam.resume.assert_called_once()
+
+    # Park the capture thread
+    cam.set_state(State.QUIESCENT)
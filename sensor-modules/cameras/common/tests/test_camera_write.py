@@ -0,0 +1,350 @@
+import datetime
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import camera
+import event_writer
+from storage import COMPRESS
+from trigger import Trigger
+
+
+def _config(tmp_path, **overrides):
+    values = dict(
+        CAMERA_ID=0,
+        EXPOSURE=1000,
+        GAIN=0,
+        BRIGHTNESS=10,
+        GAMMA=0.25,
+        FPS=8,
+        BACKLIGHT=1,
+        PRE_TRIGGER_FRAMES=3,
+        POST_TRIGGER_FRAMES=0,
+        LOCKOUT_DELAY=1,
+        IMG_DIR=str(tmp_path),
+        IMG_TYPE=".png",
+        ROLL_BUF_SIZE=4,
+        ROLL_BUF_BANKS=2,
+        WRITER_PROCESS=False,
+        ENCODER_WORKERS=1,
+        ENCODER_POOL="thread",
+        ARCHIVE_COMPRESSION=None,
+        WRITE_SYNC=False,
+        WRITE_DIRECT=False,
+        STREAM_BUFFER_MODE="NewestOnly",
+        STREAM_BUFFER_COUNT=None,
+        RECOVERY_RETRIES=3,
+        RECOVERY_BACKOFF=0.5,
+        RECOVERY_BACKOFF_MAX=30,
+        SYNC_ROLE=None,
+        SYNC_LINE="Line2",
+        CAMERA_BACKEND="spinnaker",
+        CAMERA_BACKEND_OPTIONS={},
+        ROI=None,
+        BINNING=1,
+        DECIMATION=1,
+        PIXEL_FORMAT=None,
+        STORAGE_QUOTA=None,
+        STORAGE_MIN_FREE=0,
+        STORAGE_POLICY="evict_oldest",
+        STORAGE_COMPRESSED_TYPE=".jpg",
+        WAVEBREAK_DETECTION=False,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def _camera(monkeypatch, config):
+    monkeypatch.setattr(camera, "Cam", MagicMock())
+    monkeypatch.setattr(
+        camera, "Logger", lambda *_: SimpleNamespace(logger=logging.getLogger("test"))
+    )
+    return camera.Camera("testcam", config)
+
+
+def test_write_images_encodes_outside_the_lock(monkeypatch, tmp_path):
+    """Capture must be able to take the lock while an event is encoded."""
+    cam = _camera(monkeypatch, _config(tmp_path))
+    buffer = cam.create_buffer()
+    lock = threading.Lock()
+    for value in range(3):
+        buffer.append(np.full((2, 2), value, dtype=np.uint8))
+
+    written = {}
+
+    def fake_encode(img, path):
+        assert not lock.locked()
+        # Frames arriving mid-write land in the fresh bank
+        with lock:
+            buffer.append(np.full((2, 2), 9, dtype=np.uint8))
+        written[Path(path).name] = int(img[0, 0])
+        return 1
+
+    monkeypatch.setattr(event_writer, "_encode_frame", fake_encode)
+    cam.write_images(buffer, lock)
+    cam.encoder.shutdown()
+
+    assert written == {"img_0.png": 2, "img_1.png": 1, "img_2.png": 0}
+    assert [int(f[0, 0]) for f in buffer] == [9, 9, 9]
+    assert cam.lockout_until > 0
+    assert buffer.snapshot() is not None
+
+
+def test_pre_and_post_trigger_windows(monkeypatch, tmp_path):
+    """Pre-trigger frames are flushed at once and post-trigger ones follow."""
+    config = _config(
+        tmp_path, PRE_TRIGGER_FRAMES=2, POST_TRIGGER_FRAMES=2, FPS=50, WRITE_SYNC=True
+    )
+    cam = _camera(monkeypatch, config)
+    buffer = cam.create_buffer()
+    lock = threading.Lock()
+    for value in range(4):
+        buffer.append(np.full((2, 2), value, dtype=np.uint8))
+
+    written = {}
+
+    def fake_encode(img, path):
+        written[Path(path).name] = int(img[0, 0])
+        return 1
+
+    def capture():
+        for value in range(10, 13):
+            time.sleep(0.02)
+            with lock:
+                buffer.append(np.full((2, 2), value, dtype=np.uint8))
+
+    synced = []
+    monkeypatch.setattr(event_writer, "_encode_frame", fake_encode)
+    monkeypatch.setattr(event_writer, "sync_event", synced.append)
+    capture_thread = threading.Thread(target=capture)
+    capture_thread.start()
+    path = cam.write_images(buffer, lock)
+    capture_thread.join()
+    cam.encoder.shutdown()
+
+    # Written in two snapshots but synced once
+    assert synced == [path]
+    assert written == {
+        "img_3.png": 2,
+        "img_2.png": 3,
+        "img_1.png": 10,
+        "img_0.png": 11,
+    }
+
+
+def _write_with_slow_encoder(monkeypatch, tmp_path, banks):
+    """Write an event encoding 0.3 s per frame while capture runs at 20 fps."""
+    config = _config(
+        tmp_path,
+        PRE_TRIGGER_FRAMES=3,
+        POST_TRIGGER_FRAMES=4,
+        ROLL_BUF_SIZE=4,
+        ROLL_BUF_BANKS=banks,
+        FPS=20,
+    )
+    cam = _camera(monkeypatch, config)
+    buffer = cam.create_buffer()
+    lock = threading.Lock()
+    for value in range(3):
+        buffer.append(np.full((2, 2), value, dtype=np.uint8))
+
+    written = {}
+    stop = threading.Event()
+
+    def slow_encode(img, path):
+        time.sleep(0.3)
+        written[Path(path).name] = int(img[0, 0])
+        return 1
+
+    def capture():
+        value = 10
+        while not stop.is_set():
+            time.sleep(0.05)
+            with lock:
+                buffer.append(np.full((2, 2), value, dtype=np.uint8))
+            value += 1
+
+    monkeypatch.setattr(event_writer, "_encode_frame", slow_encode)
+    capture_thread = threading.Thread(target=capture)
+    capture_thread.start()
+    try:
+        cam.write_images(buffer, lock)
+    finally:
+        stop.set()
+        capture_thread.join()
+        cam.encoder.shutdown()
+    return written
+
+
+def test_slow_write_keeps_post_trigger_frames(monkeypatch, tmp_path):
+    """Capture wraps its bank many times while the pre-trigger frames write."""
+    written = _write_with_slow_encoder(monkeypatch, tmp_path, banks=3)
+    assert written == {
+        "img_6.png": 0,
+        "img_5.png": 1,
+        "img_4.png": 2,
+        "img_3.png": 10,
+        "img_2.png": 11,
+        "img_1.png": 12,
+        "img_0.png": 13,
+    }
+
+
+def test_overwritten_post_trigger_frames_are_counted(monkeypatch, tmp_path, caplog):
+    """With two banks the post-trigger frames wait for the first write."""
+    with caplog.at_level(logging.WARNING, logger="test"):
+        written = _write_with_slow_encoder(monkeypatch, tmp_path, banks=2)
+    assert len(written) < 7
+    assert f"{7 - len(written)} of 7 frames" in caplog.text
+
+
+def test_delayed_trigger_selects_frames_by_timestamp(monkeypatch, tmp_path):
+    """Frames are picked around the publisher's time, not the arrival time."""
+    config = _config(
+        tmp_path, PRE_TRIGGER_FRAMES=2, POST_TRIGGER_FRAMES=2, ROLL_BUF_SIZE=8, FPS=1
+    )
+    cam = _camera(monkeypatch, config)
+    buffer = cam.create_buffer()
+    lock = threading.Lock()
+    start = time.time() - 6
+    for value in range(6):
+        frame = np.full((2, 2), value, dtype=np.uint8)
+        buffer.append(frame, timestamp=start + value)
+
+    written = {}
+
+    def fake_encode(img, path):
+        written[Path(path).name] = int(img[0, 0])
+        return 1
+
+    monkeypatch.setattr(event_writer, "_encode_frame", fake_encode)
+    trigger = Trigger("trigger", time.monotonic(), timestamp=start + 2, event_id="e1")
+    cam.write_images(buffer, lock, trigger=trigger)
+    cam.encoder.shutdown()
+
+    assert written == {
+        "img_3.png": 0,
+        "img_2.png": 1,
+        "img_1.png": 2,
+        "img_0.png": 3,
+    }
+
+
+def test_skewed_trigger_clock_falls_back_to_receipt(monkeypatch, tmp_path, caplog):
+    """A publisher clock an hour ahead must not pick frames by its time."""
+    config = _config(tmp_path, PRE_TRIGGER_FRAMES=2, ROLL_BUF_SIZE=8, FPS=1)
+    cam = _camera(monkeypatch, config)
+    buffer = cam.create_buffer()
+    lock = threading.Lock()
+    start = time.time() - 6
+    for value in range(6):
+        frame = np.full((2, 2), value, dtype=np.uint8)
+        buffer.append(frame, timestamp=start + value)
+
+    written = {}
+
+    def fake_encode(img, path):
+        written[Path(path).name] = int(img[0, 0])
+        return 1
+
+    monkeypatch.setattr(event_writer, "_encode_frame", fake_encode)
+    trigger = Trigger("trigger", time.monotonic(), timestamp=time.time() + 3600)
+    with caplog.at_level(logging.WARNING, logger="test"):
+        path = cam.write_images(buffer, lock, trigger=trigger)
+    cam.encoder.shutdown()
+
+    assert "using the receipt" in caplog.text
+    # Named and windowed by the receipt, not an hour from now
+    event_time = datetime.datetime.strptime(Path(path).name, "%Y-%m-%d-%H-%M-%S")
+    assert abs(event_time.timestamp() - time.time()) < 60
+    assert written == {"img_1.png": 4, "img_0.png": 5}
+
+
+def _failed_write(monkeypatch, tmp_path, alive, owned):
+    """Wait for an event the writer process failed, returning the camera."""
+    cam = _camera(monkeypatch, _config(tmp_path))
+    monkeypatch.setattr(camera, "EventWriterProcess", MagicMock())
+    writer = cam.writer = MagicMock()
+    writer.is_alive.return_value = alive
+    cam._owns_writer = owned
+    buffer = cam.create_buffer()
+    buffer.append(np.zeros((2, 2), dtype=np.uint8))
+    snapshot = buffer.snapshot()
+    future = Future()
+    future.set_exception(RuntimeError("event writer failed: disk full"))
+    monkeypatch.setattr(event_writer, "_encode_frame", lambda img, path: 1)
+    try:
+        written = cam._wait_written(
+            future, buffer, snapshot, str(tmp_path / "event"), 0, ".png"
+        )
+    finally:
+        if cam._encoder is not None:
+            cam._encoder.shutdown()
+    return cam, writer, written
+
+
+def test_running_writer_is_kept_after_a_failed_event(monkeypatch, tmp_path):
+    cam, writer, written = _failed_write(monkeypatch, tmp_path, True, True)
+    assert written == 0
+    writer.stop.assert_not_called()
+    assert cam.writer is writer
+    # No encoder pool is started while the writer process does the writing
+    assert cam._encoder is None
+
+
+def test_exited_shared_writer_is_left_to_its_owner(monkeypatch, tmp_path):
+    cam, writer, written = _failed_write(monkeypatch, tmp_path, False, False)
+    # Written in-process instead
+    assert written == 1
+    assert cam._encoder is not None
+    writer.stop.assert_not_called()
+    assert cam.writer is writer
+    camera.EventWriterProcess.assert_not_called()
+
+
+def test_exited_own_writer_is_restarted(monkeypatch, tmp_path):
+    cam, writer, written = _failed_write(monkeypatch, tmp_path, False, True)
+    assert written == 1
+    writer.stop.assert_called_once()
+    assert cam.writer is camera.EventWriterProcess.return_value
+
+
+@pytest.mark.parametrize(
+    "img_type, pixel_format, expected",
+    [
+        (".png", None, ".jpg"),
+        (".png", "BayerRG8", ".png"),
+        (".frames", None, ".frames"),
+    ],
+)
+def test_compression_keeps_raw_frames_and_archives(
+    monkeypatch, tmp_path, img_type, pixel_format, expected
+):
+    """Low storage never turns raw Bayer frames or archives into JPEGs."""
+    config = _config(tmp_path, IMG_TYPE=img_type, PIXEL_FORMAT=pixel_format)
+    cam = _camera(monkeypatch, config)
+    monkeypatch.setattr(cam.storage, "admit", lambda *_, **__: COMPRESS)
+    submitted = []
+
+    def submit(buffer, snapshot, dtime_path, newest_seq, img_type, final=True):
+        submitted.append(img_type)
+        future = Future()
+        future.set_result(len(snapshot))
+        return future
+
+    monkeypatch.setattr(cam, "_submit_snapshot", submit)
+    buffer = cam.create_buffer()
+    buffer.append(np.zeros((2, 2), dtype=np.uint8))
+    cam.write_images(buffer, threading.Lock())
+    cam.encoder.shutdown()
+
+    assert submitted == [expected]
@@ -0,0 +1,205 @@
+import importlib
+import sys
+import types
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import EasyPySpin
+
+
+class FakeNode:
+    """A GenICam node holding one value, standing in for every node type."""
+
+    def __init__(self, value=0, minimum=0, maximum=1_000_000):
+        self.value = value
+        self.minimum = minimum
+        self.maximum = maximum
+        self.writes = []
+
+    def GetValue(self):
+        return self.value
+
+    def SetValue(self, value):
+        self.value = value
+        self.writes.append(value)
+
+    SetIntValue = SetValue
+
+    def GetMin(self):
+        return self.minimum
+
+    def GetMax(self):
+        return self.maximum
+
+    def GetEntryByName(self, name):
+        return FakeNode(name)
+
+    def GetCurrentEntry(self):
+        return self
+
+    def GetSymbolic(self):
+        return self.value
+
+
+class FakeNodeMap:
+    def __init__(self, **values):
+        self.nodes = {name: FakeNode(value) for name, value in values.items()}
+
+    def GetNode(self, name):
+        return self.nodes.setdefault(name, FakeNode())
+
+
+def _fake_pyspin():
+    """A ``PySpin`` module with one camera whose nodes are all available."""
+    cam = MagicMock()
+    cam.IsStreaming.return_value = True
+    cam.GetNodeMap.return_value = FakeNodeMap(PixelFormat="Mono8")
+    cam.GetTLStreamNodeMap.return_value = FakeNodeMap()
+    for name in (
+        "ExposureAuto",
+        "ExposureTime",
+        "GainAuto",
+        "Gain",
+        "AutoExposureEVCompensation",
+        "Gamma",
+        "AcquisitionFrameRateEnable",
+        "AcquisitionFrameRate",
+        "DeviceIndicatorMode",
+    ):
+        setattr(cam, name, FakeNode(maximum=100_000))
+
+    system = MagicMock()
+    system.GetCameras.return_value.GetByIndex.return_value = cam
+    pyspin = types.ModuleType("PySpin")
+    pyspin.System = MagicMock()
+    pyspin.System.GetInstance.return_value = system
+    pyspin.IsAvailable = pyspin.IsReadable = pyspin.IsWritable = (
+        lambda node: node is not None
+    )
+    pyspin.CEnumerationPtr = pyspin.CIntegerPtr = lambda node: node
+    for index, name in enumerate(
+        (
+            "ExposureAuto_Continuous",
+            "ExposureAuto_Off",
+            "GainAuto_Continuous",
+            "GainAuto_Off",
+            "DeviceIndicatorMode_Active",
+            "DeviceIndicatorMode_Inactive",
+        )
+    ):
+        setattr(pyspin, name, index)
+    return pyspin
+
+
+@pytest.fixture
+def easypyspin(monkeypatch):
+    """The real ``EasyPySpin`` module, imported against a fake ``PySpin``."""
+    monkeypatch.setitem(sys.modules, "PySpin", _fake_pyspin())
+    module = importlib.import_module("EasyPySpin.EasyPySpin")
+    yield module
+    module.VideoCapture._system = None
+    module.VideoCapture._system_refcount = 0
+    sys.modules.pop("EasyPySpin.EasyPySpin", None)
+    if hasattr(EasyPySpin, "EasyPySpin"):
+        del EasyPySpin.EasyPySpin
+
+
+def _image(frame_id, incomplete=False):
+    image = MagicMock()
+    image.IsIncomplete.return_value = incomplete
+    image.GetNDArray.return_value = np.full((2, 2), frame_id % 256, np.uint8)
+    image.GetFrameID.return_value = frame_id
+    image.GetTimeStamp.return_value = frame_id * 1000
+    return image
+
+
+def test_frame_id_gaps_count_dropped_frames(easypyspin):
+    capture = easypyspin.VideoCapture(0)
+    images = [_image(5), _image(6), _image(7, incomplete=True), _image(9)]
+    images += [_image(10), _image(14)]
+    capture.cam.GetNextImage.side_effect = images
+
+    records = [capture.read(with_record=True) for _ in images]
+
+    assert [record.frame_id for ok, record in records if ok] == [5, 6, 9, 10, 14]
+    assert not records[2][0]
+    # 7 and 8 before frame 9, 11 to 13 before frame 14
+    assert capture.frames_dropped == 5
+    assert all(image.Release.called for image in images)
+
+
+def test_stream_statistics_report_frame_id_gaps(easypyspin):
+    capture = easypyspin.VideoCapture(0)
+    capture.cam.GetNextImage.side_effect = [_image(1), _image(4)]
+    capture.read()
+    capture.read()
+    stream = capture.cam.GetTLStreamNodeMap()
+    stream.GetNode("StreamDroppedFrameCount").value = 1
+    stream.GetNode("StreamLostFrameCount").value = 0
+
+    assert capture.get_stream_statistics() == {
+        "StreamDroppedFrameCount": 1,
+        "StreamLostFrameCount": 0,
+        "StreamIncompleteFrameCount": 0,
+        "StreamBufferUnderrunCount": 0,
+        "FrameIDGaps": 2,
+    }
+    # The larger of the frame ID gaps and the transport layer's count
+    assert capture.dropped_frames() == 2
+    stream.GetNode("StreamLostFrameCount").value = 4
+    assert capture.dropped_frames() == 5
+
+
+def _writes(capture):
+    """Values written to each settings node since the last call."""
+    writes = {}
+    for name, node in capture._nodes.items():
+        if isinstance(node, FakeNode) and node.writes:
+            writes[name] = node.writes
+            node.writes = []
+    return writes
+
+
+def test_apply_settings_validates_before_writing(easypyspin):
+    capture = easypyspin.VideoCapture(0)
+    settings = {cv2.CAP_PROP_EXPOSURE: 1000, cv2.CAP_PROP_FPS: 8}
+
+    assert not capture.apply_settings({**settings, cv2.CAP_PROP_GAIN: "high"})
+    assert not capture.apply_settings({**settings, cv2.CAP_PROP_ZOOM: 2})
+    assert _writes(capture) == {}
+    assert capture._applied == {}
+
+    assert capture.apply_settings(settings)
+    writes = _writes(capture)
+    assert writes["ExposureTime"] == [1000]
+    assert writes["AcquisitionFrameRate"] == [8]
+
+
+def test_apply_settings_skips_unchanged_values(easypyspin):
+    capture = easypyspin.VideoCapture(0)
+    settings = {
+        cv2.CAP_PROP_EXPOSURE: 1000,
+        cv2.CAP_PROP_GAIN: 2,
+        cv2.CAP_PROP_GAMMA: 0.25,
+        cv2.CAP_PROP_FPS: 8,
+    }
+    assert capture.apply_settings(settings)
+    _writes(capture)
+
+    assert capture.apply_settings(settings)
+    assert _writes(capture) == {}
+
+    assert capture.apply_settings({**settings, cv2.CAP_PROP_GAIN: 4})
+    gain_auto_off = easypyspin.PySpin.GainAuto_Off
+    assert _writes(capture) == {"GainAuto": [gain_auto_off], "Gain": [4]}
+    assert capture._applied[cv2.CAP_PROP_GAIN] == 4
+
+    # Changed behind the capture's back, e.g. by a power cycle
+    capture._nodes["Gamma"].value = 1.0
+    assert capture.apply_settings({**settings, cv2.CAP_PROP_GAIN: 4})
+    assert _writes(capture) == {"Gamma": [0.25]}
@@ -0,0 +1,83 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from event_archive import EventArchiveReader, EventArchiveWriter
+from event_writer import EncoderPool
+from frame_buffer import FrameRingBuffer
+
+
+@pytest.mark.parametrize("compression", [None, "zlib"])
+def test_round_trip_and_append(tmp_path, compression):
+    """Frames and metadata survive a close/reopen/append cycle."""
+    path = str(tmp_path / "event.frames")
+    with EventArchiveWriter(path, compression) as archive:
+        archive.append(np.full((3, 5), 1, dtype=np.uint8), timestamp=1.5)
+        archive.append(np.full((3, 5, 3), 2, dtype=np.uint16), timestamp=2.5)
+    with EventArchiveWriter(path, compression) as archive:
+        archive.append(np.full((3, 5), 3, dtype=np.uint8), timestamp=3.5)
+
+    with EventArchiveReader(path) as reader:
+        assert len(reader) == 3
+        assert reader.metadata(1)["timestamp"] == 2.5
+        second = reader.frame(1)
+        assert second.shape == (3, 5, 3) and second.dtype == np.uint16
+        assert [int(frame.flat[0]) for frame in reader] == [1, 2, 3]
+        del second
+
+
+def test_raw_frames_are_mapped_not_copied(tmp_path):
+    path = str(tmp_path / "event.frames")
+    with EventArchiveWriter(path) as archive:
+        archive.append(np.arange(12, dtype=np.uint8).reshape(3, 4))
+
+    reader = EventArchiveReader(path)
+    frame = reader.frame(0)
+    assert not frame.flags.writeable
+    assert not frame.flags.owndata
+    assert frame[2, 3] == 11
+    del frame
+    reader.close()
+
+
+def test_encoder_pool_writes_event_archive(tmp_path):
+    """IMG_TYPE ".frames" writes one file named after the event."""
+    buffer = FrameRingBuffer(3, banks=2)
+    for value in range(3):
+        buffer.append(np.full((2, 2), value, dtype=np.uint8), timestamp=float(value))
+    snapshot = buffer.snapshot()
+    pool = EncoderPool()
+    try:
+        count = pool.write(
+            snapshot,
+            list(buffer.snapshot_frames(snapshot)),
+            str(tmp_path / "2024-01-01-00-00-00"),
+            ".frames",
+        )
+    finally:
+        pool.shutdown()
+
+    assert count == 3
+    with EventArchiveReader(str(tmp_path / "2024-01-01-00-00-00.frames")) as reader:
+        assert reader.metadata(0)["name"] == "img_2"
+        assert reader.metadata(2)["timestamp"] == 2.0
+        assert int(reader.frame(2)[0, 0]) == 2
+
+
+def test_direct_preallocated_archive_is_trimmed_and_appendable(tmp_path):
+    """Direct I/O padding and unused preallocation do not reach the file."""
+    path = str(tmp_path / "event.frames")
+    frames = [np.full((3, 7), value, dtype=np.uint8) for value in range(3)]
+    with EventArchiveWriter(path, preallocate_bytes=1 << 20, direct=True) as archive:
+        for frame in frames[:2]:
+            archive.append(frame, timestamp=0.0)
+    with EventArchiveWriter(path, direct=True) as archive:
+        archive.append(frames[2], timestamp=0.0)
+
+    assert os.path.getsize(path) < 1 << 20
+    with EventArchiveReader(path) as reader:
+        assert [int(frame[0, 0]) for frame in reader] == [0, 1, 2]
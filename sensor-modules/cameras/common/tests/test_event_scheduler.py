@@ -0,0 +1,188 @@
+import csv
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import event_writer
+from event_writer import METADATA_FILE
+from event_scheduler import COALESCED, CONTINUED, LOCKED_OUT, QUEUED, EventScheduler
+from test_camera_state import _wait_until
+from test_camera_write import _camera, _config
+from trigger import Trigger
+
+
+def _append(buffer, lock, values, start):
+    for value in values:
+        with lock:
+            buffer.append(np.full((2, 2), value, dtype=np.uint8), timestamp=start + value)
+
+
+def test_overlapping_triggers_extend_events(monkeypatch, tmp_path):
+    """Triggers during a write continue it without writing a frame twice."""
+    config = _config(
+        tmp_path,
+        FPS=1,
+        PRE_TRIGGER_FRAMES=2,
+        POST_TRIGGER_FRAMES=2,
+        ROLL_BUF_SIZE=8,
+        LOCKOUT_DELAY=0,
+    )
+    cam = _camera(monkeypatch, config)
+    buffer = cam.create_buffer()
+    lock = threading.Lock()
+    # Frame 5 was taken just now
+    start = time.time() - 5
+    _append(buffer, lock, range(6), start)
+
+    written = {}
+
+    def fake_encode(img, path):
+        path = Path(path)
+        written.setdefault(path.parent.name, set()).add(int(img[0, 0]))
+        return 1
+
+    monkeypatch.setattr(event_writer, "_encode_frame", fake_encode)
+    paths = []
+    scheduler = EventScheduler(
+        cam, buffer, lock, on_written=lambda event, path: paths.append(path)
+    )
+
+    def trigger(offset):
+        return Trigger("trigger", time.monotonic(), timestamp=start + offset)
+
+    assert scheduler.submit(trigger(5.0)) == QUEUED
+    # The first event waits for its post-trigger frames
+    assert _wait_until(lambda: cam.last_stop_seq is not None)
+    assert scheduler.submit(trigger(6.0)) == CONTINUED
+    assert scheduler.submit(trigger(7.0)) == COALESCED
+    assert scheduler.submit(trigger(5.5)) == COALESCED
+    assert scheduler.pending() == 2
+
+    # Frames after the first event arrive once it has taken its last one
+    _append(buffer, lock, [6], start)
+    assert _wait_until(lambda: paths)
+    _append(buffer, lock, range(7, 10), start)
+    assert scheduler.join(timeout=2)
+    scheduler.stop()
+    cam.encoder.shutdown()
+
+    first, second = (Path(path).name for path in paths)
+    assert second == f"{first}_2"
+    assert written == {first: {3, 4, 5, 6}, second: {7, 8}}
+
+
+def test_continuation_frames_are_contiguous(monkeypatch, tmp_path):
+    """Frames buffered after a delayed event's window start its continuation."""
+    config = _config(
+        tmp_path,
+        FPS=1,
+        PRE_TRIGGER_FRAMES=2,
+        POST_TRIGGER_FRAMES=2,
+        ROLL_BUF_SIZE=10,
+        LOCKOUT_DELAY=0,
+    )
+    cam = _camera(monkeypatch, config)
+    buffer = cam.create_buffer()
+    lock = threading.Lock()
+    start = time.time() - 9
+    for value in range(10):
+        buffer.append(
+            np.full((2, 2), value, dtype=np.uint8),
+            timestamp=start + value,
+            frame_id=1000 + value,
+        )
+
+    released = threading.Event()
+
+    def fake_encode(img, path):
+        released.wait(timeout=5)
+        return 1
+
+    monkeypatch.setattr(event_writer, "_encode_frame", fake_encode)
+    paths = []
+    scheduler = EventScheduler(
+        cam, buffer, lock, on_written=lambda event, path: paths.append(path)
+    )
+
+    def trigger(offset):
+        return Trigger("trigger", time.monotonic(), timestamp=start + offset)
+
+    # Every frame of the first event is already buffered, and so are the
+    # ones after it that the continuation needs
+    assert scheduler.submit(trigger(3.0)) == QUEUED
+    assert _wait_until(lambda: cam.last_stop_seq is not None)
+    assert scheduler.submit(trigger(4.5)) == CONTINUED
+    released.set()
+    assert scheduler.join(timeout=5)
+    scheduler.stop()
+    cam.encoder.shutdown()
+
+    def frame_ids(path):
+        with open(Path(path) / METADATA_FILE, newline="") as f:
+            return sorted(int(row["frame_id"]) for row in csv.DictReader(f))
+
+    first, second = (frame_ids(path) for path in paths)
+    assert first == [1001, 1002, 1003, 1004]
+    assert second == [1005, 1006]
+
+
+def test_triggers_inside_lockout_are_dropped(monkeypatch, tmp_path):
+    cam = _camera(monkeypatch, _config(tmp_path, LOCKOUT_DELAY=60))
+    scheduler = EventScheduler(cam, cam.create_buffer(), threading.Lock())
+    cam.lockout_until = time.time() + 60
+
+    assert scheduler.submit(Trigger("trigger", time.monotonic())) == LOCKED_OUT
+    assert scheduler.pending() == 0
+    scheduler.stop()
+    cam.encoder.shutdown()
+
+
+def test_lockout_after_the_active_event_applies_to_queued_triggers(
+    monkeypatch, tmp_path
+):
+    """A trigger behind the event being written still respects its lockout."""
+    config = _config(
+        tmp_path,
+        FPS=1,
+        PRE_TRIGGER_FRAMES=2,
+        POST_TRIGGER_FRAMES=2,
+        ROLL_BUF_SIZE=24,
+        LOCKOUT_DELAY=5,
+    )
+    cam = _camera(monkeypatch, config)
+    buffer = cam.create_buffer()
+    lock = threading.Lock()
+    start = time.time() - 20
+    _append(buffer, lock, range(20), start)
+
+    released = threading.Event()
+
+    def fake_encode(img, path):
+        released.wait(timeout=5)
+        return 1
+
+    monkeypatch.setattr(event_writer, "_encode_frame", fake_encode)
+    paths = []
+    scheduler = EventScheduler(
+        cam, buffer, lock, on_written=lambda event, path: paths.append(path)
+    )
+
+    def trigger(offset):
+        return Trigger("trigger", time.monotonic(), timestamp=start + offset)
+
+    assert scheduler.submit(trigger(3.0)) == QUEUED
+    assert _wait_until(lambda: cam.last_stop_seq is not None)
+    # The first event ends at 5.0, so its lockout lasts until at least 10.0
+    assert scheduler.submit(trigger(8.0)) == LOCKED_OUT
+    assert scheduler.submit(trigger(12.0)) == QUEUED
+    assert scheduler.pending() == 2
+    released.set()
+    assert scheduler.join(timeout=5)
+    scheduler.stop()
+    cam.encoder.shutdown()
+
+    assert len(paths) == 2
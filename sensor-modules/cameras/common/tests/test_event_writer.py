@@ -0,0 +1,137 @@
+import csv
+import sys
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import disk_io
+from event_archive import EventArchiveReader
+from event_writer import EncoderPool, EventWriterProcess
+from frame_buffer import FrameRingBuffer
+from shared_frame_buffer import SharedFrameRingBuffer
+
+
+def test_writer_process_reads_snapshot_from_shared_memory(tmp_path):
+    """The writer process should write a snapshot taken in this process."""
+    buffer = SharedFrameRingBuffer(4)
+    writer = EventWriterProcess(workers=2)
+    try:
+        for value in range(6):
+            buffer.append(
+                np.full((8, 8), value, dtype=np.uint8),
+                frame_id=100 + value,
+                device_timestamp=1000 * value,
+            )
+        snapshot = buffer.snapshot()
+        # Capture keeps going in the other bank while the event is written
+        buffer.append(np.full((8, 8), 99, dtype=np.uint8))
+
+        count = writer.write(snapshot, str(tmp_path), ".png")
+        buffer.release(snapshot)
+    finally:
+        writer.stop()
+        buffer.close()
+
+    assert count == 4
+    newest = cv2.imread(str(tmp_path / "img_0.png"), cv2.IMREAD_GRAYSCALE)
+    oldest = cv2.imread(str(tmp_path / "img_3.png"), cv2.IMREAD_GRAYSCALE)
+    assert newest[0, 0] == 5
+    assert oldest[0, 0] == 2
+    with open(tmp_path / "frames.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["name"] for row in rows] == ["img_3", "img_2", "img_1", "img_0"]
+    assert rows[-1]["frame_id"] == "105"
+    assert rows[-1]["device_timestamp_ns"] == "5000"
+
+
+def test_reallocation_keeps_segments_of_pending_snapshots(tmp_path):
+    """A new frame format must not unlink frames still queued for writing."""
+    buffer = SharedFrameRingBuffer(4)
+    writer = EventWriterProcess()
+    try:
+        for value in range(3):
+            buffer.append(np.full((8, 8), value, dtype=np.uint8))
+        snapshot = buffer.snapshot()
+        future = writer.submit(snapshot, str(tmp_path), ".png")
+        # A new region of interest reallocates the ring
+        buffer.append(np.full((4, 4), 9, dtype=np.uint8))
+        count = future.result(timeout=30)
+
+        frames = [int(frame[0, 0]) for frame in buffer.snapshot_frames(snapshot)]
+        assert frames == [0, 1, 2]
+        buffer.release(snapshot)
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=snapshot.segment)
+    finally:
+        writer.stop()
+        buffer.close()
+
+    assert count == 3
+    newest = cv2.imread(str(tmp_path / "img_0.png"), cv2.IMREAD_GRAYSCALE)
+    assert newest[0, 0] == 2
+
+
+def test_encoder_pool_names_frames_and_reports_completion(tmp_path):
+    """Parallel encoding keeps img_0 as the newest frame and calls back once."""
+    buffer = FrameRingBuffer(5, banks=2)
+    for value in range(5):
+        buffer.append(np.full((4, 4), value, dtype=np.uint8))
+    snapshot = buffer.snapshot()
+    frames = list(buffer.snapshot_frames(snapshot))
+    calls = []
+    pool = EncoderPool(workers=3, sync=True)
+    try:
+        count = pool.write(
+            snapshot,
+            frames,
+            str(tmp_path),
+            ".png",
+            callback=lambda n, path: calls.append((n, path)),
+        )
+    finally:
+        pool.shutdown()
+
+    assert count == 5
+    assert calls == [(5, str(tmp_path))]
+    for idx in range(5):
+        img = cv2.imread(str(tmp_path / f"img_{idx}.png"), cv2.IMREAD_GRAYSCALE)
+        assert img[0, 0] == 4 - idx
+
+
+def test_process_pool_reads_shared_snapshots(tmp_path):
+    """Process workers read shared snapshots straight from shared memory."""
+    buffer = SharedFrameRingBuffer(4)
+    pool = EncoderPool(workers=2, kind="process")
+    try:
+        for value in range(4):
+            buffer.append(np.full((8, 8), value, dtype=np.uint8), frame_id=value)
+        snapshot = buffer.snapshot()
+        # No frames are passed, so they can only come from the shared ring
+        images = pool.write(snapshot, None, str(tmp_path / "event"), ".png")
+        archived = pool.write(snapshot, None, str(tmp_path / "event"), ".frames")
+        buffer.release(snapshot)
+    finally:
+        pool.shutdown()
+        buffer.close()
+
+    assert images == archived == 4
+    for idx in range(4):
+        img = cv2.imread(
+            str(tmp_path / "event" / f"img_{idx}.png"), cv2.IMREAD_GRAYSCALE
+        )
+        assert img[0, 0] == 3 - idx
+    with EventArchiveReader(str(tmp_path / "event.frames")) as reader:
+        assert [int(frame[0, 0]) for frame in reader] == [0, 1, 2, 3]
+
+
+def test_loose_files_are_not_preallocated(monkeypatch, tmp_path):
+    """Emulated fallocate on exFAT would write every image twice."""
+    calls = []
+    monkeypatch.setattr(disk_io, "preallocate", lambda *args: calls.append(args))
+    assert disk_io.write_file(str(tmp_path / "img_0.png"), b"image") == 5
+    assert calls == []
+    assert (tmp_path / "img_0.png").read_bytes() == b"image"
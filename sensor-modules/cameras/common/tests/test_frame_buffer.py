@@ -0,0 +1,119 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from frame_buffer import FrameRingBuffer
+
+
+def _frame(value, shape=(4, 6)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+def test_frames_are_copied_into_one_slab():
+    """Appending should reuse the preallocated slab rather than keep refs."""
+    buffer = FrameRingBuffer(3)
+    frame = _frame(1)
+    buffer.append(frame)
+    slab = buffer._slab
+
+    frame[:] = 9
+    buffer.append(_frame(2))
+
+    assert buffer._slab is slab
+    assert slab.shape == (1, 3, 4, 6)
+    assert buffer[0][0, 0] == 1
+
+
+def test_wraps_and_iterates_oldest_first():
+    """Once full the oldest frame is overwritten and order is preserved."""
+    buffer = FrameRingBuffer(3)
+    for value in range(5):
+        buffer.append(_frame(value))
+
+    assert len(buffer) == 3
+    assert [int(f[0, 0]) for f in buffer] == [2, 3, 4]
+    assert [int(f[0, 0]) for f in reversed(buffer)] == [4, 3, 2]
+    assert buffer.frames()[:, 0, 0].tolist() == [2, 3, 4]
+    assert int(buffer[-1][0, 0]) == 4
+    with pytest.raises(IndexError):
+        buffer[3]
+
+
+def test_reallocates_when_frame_format_changes():
+    """A camera reopened with a new resolution starts a fresh slab."""
+    buffer = FrameRingBuffer(2)
+    buffer.append(_frame(1))
+    buffer.append(_frame(2, shape=(2, 2, 3)))
+
+    assert len(buffer) == 1
+    assert buffer.frame_shape == (2, 2, 3)
+
+
+def test_snapshot_freezes_bank_and_swaps():
+    """A snapshot keeps its frames while capture continues in a new bank."""
+    buffer = FrameRingBuffer(3, banks=2)
+    for value in range(4):
+        buffer.append(_frame(value), timestamp=float(value))
+
+    snapshot = buffer.snapshot()
+    buffer.append(_frame(7))
+
+    assert len(buffer) == 1
+    assert snapshot.seqs.tolist() == [1, 2, 3]
+    assert snapshot.timestamps.tolist() == [1.0, 2.0, 3.0]
+    assert [int(f[0, 0]) for f in buffer.snapshot_frames(snapshot)] == [1, 2, 3]
+    # The only other bank is held until the snapshot is released
+    assert buffer.snapshot() is None
+    buffer.release(snapshot)
+    assert buffer.snapshot() is not None
+
+
+def test_reserved_slot_is_filled_in_place():
+    """A reserved slot is hidden from readers until it is committed."""
+    buffer = FrameRingBuffer(2, banks=2)
+    buffer.append(_frame(1))
+    buffer.append(_frame(2))
+
+    slot = buffer.reserve()
+    slot[:] = 3
+    # The oldest frame is being overwritten, so it is no longer readable
+    assert [int(f[0, 0]) for f in buffer] == [2]
+    buffer.commit(frame_id=42)
+
+    assert [int(f[0, 0]) for f in buffer] == [2, 3]
+    assert buffer.snapshot().frame_ids.tolist() == [-1, 42]
+
+
+def test_commit_after_bank_swap_moves_frame():
+    """A frame filled during a snapshot lands in the new active bank."""
+    buffer = FrameRingBuffer(2, banks=2)
+    buffer.append(_frame(1))
+    buffer.append(_frame(2))
+
+    slot = buffer.reserve()
+    snapshot = buffer.snapshot()
+    slot[:] = 3
+    buffer.commit()
+
+    assert [int(f[0, 0]) for f in buffer.snapshot_frames(snapshot)] == [2]
+    assert [int(f[0, 0]) for f in buffer] == [3]
+
+
+def test_frames_after_the_window_move_to_the_new_bank():
+    """Frames past ``stop_seq`` stay buffered for the next snapshot."""
+    buffer = FrameRingBuffer(4, banks=2)
+    for value in range(4):
+        buffer.append(_frame(value), timestamp=float(value))
+
+    snapshot = buffer.snapshot(1, 3)
+    buffer.append(_frame(4))
+
+    assert snapshot.seqs.tolist() == [1, 2]
+    assert [int(f[0, 0]) for f in buffer] == [3, 4]
+    buffer.release(snapshot)
+    tail = buffer.snapshot(3)
+    assert tail.seqs.tolist() == [3, 4]
+    assert tail.timestamps[0] == 3.0
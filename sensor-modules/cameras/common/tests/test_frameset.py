@@ -0,0 +1,63 @@
+import csv
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from event_writer import frame_indices, write_metadata
+from frame_buffer import FrameRingBuffer
+from frameset import write_framesets
+from test_camera_write import _camera, _config
+
+
+def _event(path, frame_ids, host_times):
+    buffer = FrameRingBuffer(len(frame_ids), banks=2)
+    for frame_id, host_time in zip(frame_ids, host_times):
+        frame = np.zeros((2, 2), np.uint8)
+        buffer.append(frame, frame_id=frame_id, host_time=host_time)
+    snapshot = buffer.snapshot()
+    path.mkdir()
+    write_metadata(str(path), snapshot, frame_indices(snapshot))
+    return str(path)
+
+
+def test_framesets_align_slaves_to_master(tmp_path):
+    """Slave frames are grouped under the master's trigger index."""
+    paths = {
+        "master": _event(tmp_path / "m", [10, 11, 12, 13], [0.0, 0.125, 0.25, 0.375]),
+        # The slave restarted its stream and missed one trigger, and its
+        # host times lag by more than a frame period
+        "slave": _event(tmp_path / "s", [0, 1, 0], [0.3, 0.4, 0.6]),
+    }
+    offsets = {"master": [(0, -10)], "slave": [(0, 0), (2, 3)]}
+
+    path = write_framesets(paths, "master", offsets)
+
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows == [
+        ["trigger_index", "master", "slave"],
+        ["0", "img_3", "img_2"],
+        ["1", "img_2", "img_1"],
+        ["2", "img_1", ""],
+        ["3", "img_0", "img_0"],
+    ]
+
+
+def test_stream_starts_set_trigger_offsets(monkeypatch, tmp_path):
+    """Restarted streams carry on at the trigger index they resume at."""
+    slave = _camera(monkeypatch, _config(tmp_path, SYNC_ROLE="slave", FPS=8))
+    slave._track_trigger_index(0, 5, 10.0)
+    slave._track_trigger_index(1, 6, 10.125)
+    # Frame IDs restart after the stream was down for four triggers
+    slave._track_trigger_index(2, 0, 10.75)
+    assert list(slave.trigger_offsets) == [(0, -5), (2, 6)]
+
+    master = _camera(monkeypatch, _config(tmp_path, SYNC_ROLE="master", FPS=8))
+    master._track_trigger_index(0, 0, 10.0)
+    master._track_trigger_index(1, 1, 10.125)
+    # The master triggers nothing while its stream is restarted
+    master._stream_restarted = True
+    master._track_trigger_index(2, 0, 12.0)
+    assert list(master.trigger_offsets) == [(0, 0), (2, 2)]
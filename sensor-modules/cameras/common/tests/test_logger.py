@@ -0,0 +1,83 @@
+import datetime
+import logging
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import logger
+
+
+def _record(level):
+    return logging.LogRecord("test", level, __file__, 1, "frame %d", (1,), None)
+
+
+def test_rate_limit_drops_and_reports(monkeypatch):
+    """Chatty levels are capped and the drop count is reported later."""
+    now = [0.0]
+    monkeypatch.setattr(logger.time, "monotonic", lambda: now[0])
+    limiter = logger.RateLimitFilter({"INFO": 2})
+
+    passed = [limiter.filter(_record(logging.INFO)) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+    # Unlimited levels always pass
+    assert limiter.filter(_record(logging.WARNING))
+
+    now[0] = 1.0
+    record = _record(logging.INFO)
+    assert limiter.filter(record)
+    assert record.getMessage() == "frame 1 [3 INFO messages dropped]"
+
+
+def _logger(monkeypatch, tmp_path, **overrides):
+    """A camera logger writing to ``tmp_path/testcam/logs``."""
+    monkeypatch.setattr(logger, "__file__", str(tmp_path / "common" / "logger.py"))
+    now = datetime.datetime(2024, 1, 1, 12, 0)
+    monkeypatch.setattr(
+        logger, "datetime", SimpleNamespace(datetime=SimpleNamespace(now=lambda: now))
+    )
+    values = dict(
+        LOG_FILE="tcam",
+        FILEMODE="w",
+        LOGGER_NAME="Test Logger",
+        DATE_FORMAT="%Y-%m-%dT%H:%M:%S",
+        MESSAGE_FORMAT="%(levelname)s # %(message)s",
+        LOG_MAX_BYTES=1024,
+        LOG_BACKUPS=2,
+        LOG_RATE_LIMITS={},
+    )
+    values.update(overrides)
+    return logger.Logger(SimpleNamespace(**values), "testcam")
+
+
+def test_records_reach_the_rotated_file(monkeypatch, tmp_path):
+    """Records go through the queue to a file rotated at LOG_MAX_BYTES."""
+    log = _logger(monkeypatch, tmp_path)
+    for index in range(100):
+        log.logger.info("event %02d written to disk", index)
+    log.close()
+
+    path = tmp_path / "testcam" / "logs" / "2024-01-01-12-00_tcam.log"
+    files = [path, Path(f"{path}.1"), Path(f"{path}.2")]
+    assert all(file.stat().st_size <= 1024 for file in files)
+    assert not Path(f"{path}.3").exists()
+    # The newest records are in the current file, oldest first
+    lines = path.read_text().splitlines()
+    assert lines[-1] == "INFO # event 99 written to disk"
+    older = Path(f"{path}.1").read_text().splitlines()
+    assert int(older[-1].split()[3]) + 1 == int(lines[0].split()[3])
+
+
+def test_filemode_w_truncates_the_log(monkeypatch, tmp_path):
+    log = _logger(monkeypatch, tmp_path)
+    log.logger.info("first run")
+    log.close()
+    log = _logger(monkeypatch, tmp_path)
+    log.logger.info("second run")
+    log.close()
+    log = _logger(monkeypatch, tmp_path, FILEMODE="a")
+    log.logger.info("third run")
+    log.close()
+
+    path = tmp_path / "testcam" / "logs" / "2024-01-01-12-00_tcam.log"
+    assert path.read_text().splitlines() == ["INFO # second run", "INFO # third run"]
@@ -0,0 +1,102 @@
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, call
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import orchestrator
+from state import State
+
+
+def test_configs_load_side_by_side():
+    """Every camera's config.py is loaded even though they share a name."""
+    bubblecam = orchestrator.load_config("bubblecam")
+    foamcam = orchestrator.load_config("foamcam")
+
+    assert bubblecam is not foamcam
+    assert (bubblecam.LOG_FILE, foamcam.LOG_FILE) == ("bcam", "fcam")
+    with pytest.raises(FileNotFoundError):
+        orchestrator.load_config("nocam")
+
+
+def test_cameras_share_one_writer(monkeypatch):
+    """Cameras with matching writer settings get one writer sized for both."""
+    for name in ("Camera", "EventWriterProcess", "EncoderPool"):
+        monkeypatch.setattr(orchestrator, name, MagicMock())
+
+    orch = orchestrator.Orchestrator(["bubblecam", "foamcam"])
+    try:
+        orchestrator.EventWriterProcess.assert_called_once_with(8, None, True, False)
+        # Nothing is encoded in-process unless the writer exits
+        orchestrator.EncoderPool.assert_not_called()
+        writers = {
+            call.kwargs["writer"] for call in orchestrator.Camera.call_args_list
+        }
+        assert writers == {orchestrator.EventWriterProcess.return_value}
+        encoders = [
+            call.kwargs["encoder"] for call in orchestrator.Camera.call_args_list
+        ]
+        assert encoders == [None, None]
+        assert set(orch.cameras) == {"bubblecam", "foamcam"}
+    finally:
+        orch.power_off()
+
+
+def test_incomplete_synced_events_are_evicted(monkeypatch):
+    """Events some synchronized camera never wrote do not pile up."""
+    for name in ("Camera", "EventWriterProcess", "EncoderPool", "write_framesets"):
+        monkeypatch.setattr(orchestrator, name, MagicMock())
+    now = [1000.0]
+    monkeypatch.setattr(orchestrator.time, "monotonic", lambda: now[0])
+
+    orch = orchestrator.Orchestrator(["bubblecam", "foamcam"])
+    try:
+        orch.configs["bubblecam"].SYNC_ROLE = "master"
+        orch.configs["foamcam"].SYNC_ROLE = "slave"
+        orch.sync_master = "bubblecam"
+
+        # Only the master writes the first event
+        orch._on_written("bubblecam", None, "/data/bcam/2024-01-01-00-00-00")
+        assert list(orch._synced_paths) == ["2024-01-01-00-00-00"]
+
+        now[0] += orchestrator.FRAMESET_TIMEOUT + 1
+        orch._on_written("bubblecam", None, "/data/bcam/2024-01-01-00-10-00")
+        orch._on_written("foamcam", None, "/data/fcam/2024-01-01-00-10-00")
+        assert orch._synced_paths == {}
+        orchestrator.write_framesets.assert_called_once()
+        paths = orchestrator.write_framesets.call_args.args[0]
+        assert paths == {
+            "bubblecam": "/data/bcam/2024-01-01-00-10-00",
+            "foamcam": "/data/fcam/2024-01-01-00-10-00",
+        }
+    finally:
+        orch.power_off()
+
+
+def test_run_follows_the_glider_state(monkeypatch):
+    """Every camera is switched to the monitored state on each pass."""
+    for name in ("EventWriterProcess", "EncoderPool", "TriggerSubscriber"):
+        monkeypatch.setattr(orchestrator, name, MagicMock())
+    monkeypatch.setattr(
+        orchestrator, "Camera", MagicMock(side_effect=lambda *_, **__: MagicMock())
+    )
+
+    orch = orchestrator.Orchestrator(["bubblecam", "foamcam"])
+    states = [State.STORM, State.STORM, State.QUIESCENT, State.STORM]
+    orch.monitor = MagicMock()
+    orch.monitor.get_state.side_effect = states
+    subscriber = orch.subscriber
+    subscriber.stopped = False
+
+    def wait(timeout):
+        subscriber.stopped = orch.monitor.get_state.call_count == len(states)
+        return None
+
+    subscriber.wait.side_effect = wait
+    try:
+        orch.run()
+        for camera in orch.cameras.values():
+            assert camera.set_state.call_args_list == [call(s) for s in states]
+    finally:
+        orch.power_off()
@@ -0,0 +1,51 @@
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import storage
+from storage import ALLOW, COMPRESS, REFUSE, StorageManager
+
+
+def _event(root, name, nbytes, mtime):
+    path = root / name
+    path.mkdir()
+    (path / "img_0.png").write_bytes(b"x" * nbytes)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_oldest_events_are_evicted_to_fit_the_quota(tmp_path):
+    """Existing events are indexed once and evicted oldest first."""
+    old = _event(tmp_path, "old", 600, 1)
+    new = _event(tmp_path, "new", 300, 2)
+    manager = StorageManager(str(tmp_path), quota=1000)
+    assert manager.status().used == 900
+
+    assert manager.admit(50) == ALLOW
+    assert manager.admit(400) == ALLOW
+    assert not old.exists() and new.exists()
+    assert manager.status().used == 300
+
+    manager.record(str(_event(tmp_path, "latest", 400, 3)))
+    status = manager.status()
+    assert status.used == 700
+    assert status.rate > 0
+    assert manager.admit(2000) == REFUSE
+
+
+def test_policies_past_the_free_space_floor(monkeypatch, tmp_path):
+    """Past the floor writes are compressed or low priority ones refused."""
+    disk = SimpleNamespace(free=10_000)
+    monkeypatch.setattr(storage.shutil, "disk_usage", lambda _: disk)
+    compress = StorageManager(str(tmp_path), min_free=9_500, policy="compress")
+    refuse = StorageManager(
+        str(tmp_path), min_free=9_500, policy="refuse_low_priority"
+    )
+
+    assert compress.admit(100) == ALLOW
+    assert compress.admit(1000) == COMPRESS
+    assert compress.admit(20_000) == REFUSE
+    assert refuse.admit(1000) == ALLOW
+    assert refuse.admit(1000, low_priority=True) == REFUSE
@@ -0,0 +1,56 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import zmq
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from trigger import TriggerSubscriber, parse_trigger, trigger_message
+
+
+def test_trigger_wakes_waiting_loop():
+    """A published trigger is returned without waiting for the timeout."""
+    context = zmq.Context()
+    publisher = context.socket(zmq.PUB)
+    port = publisher.bind_to_random_port("tcp://127.0.0.1")
+    subscriber = TriggerSubscriber([f"tcp://127.0.0.1:{port}"], context=context)
+    try:
+        # Publish until the subscription has propagated
+        trigger = None
+        deadline = time.monotonic() + 5
+        while trigger is None and time.monotonic() < deadline:
+            publisher.send_string("trigger")
+            trigger = subscriber.wait(timeout=0.05)
+        assert trigger is not None
+        assert trigger.message == "trigger"
+        assert 0 <= trigger.age() < 1
+    finally:
+        subscriber.close()
+        publisher.close(linger=0)
+        context.term()
+
+
+def test_stop_wakes_waiting_loop():
+    """stop() from another thread ends a blocking wait right away."""
+    subscriber = TriggerSubscriber([])
+    try:
+        threading.Timer(0.05, subscriber.stop).start()
+        start = time.monotonic()
+        assert subscriber.wait(timeout=5) is None
+        assert time.monotonic() - start < 1
+        assert subscriber.stopped
+    finally:
+        subscriber.close()
+
+
+def test_trigger_payload_round_trip():
+    """Timestamps and event IDs survive; bare and malformed triggers parse."""
+    trigger = parse_trigger(trigger_message(123.5, "abc"), 1.0)
+    assert (trigger.timestamp, trigger.event_id, trigger.received) == (
+        123.5,
+        "abc",
+        1.0,
+    )
+    assert parse_trigger("trigger", 1.0).timestamp is None
+    assert parse_trigger("trigger {not json", 1.0).event_id is None
@@ -0,0 +1,102 @@
+import sys
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+import zmq
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from test_camera_write import _camera, _config
+from trigger import TriggerSubscriber
+from wavebreak import WavebreakDetector, WavebreakPublisher
+
+
+def _foam(fraction, shape=(64, 80)):
+    """A frame whose top ``fraction`` of rows is whitewater."""
+    frame = np.full(shape, 40, dtype=np.uint8)
+    frame[: int(round(fraction * shape[0]))] = 250
+    return frame
+
+
+def test_whitewater_hysteresis_fires_once_per_wavebreak():
+    detector = WavebreakDetector(on=0.3, off=0.1, frames=2, downsample=4)
+    fractions = [0.0, 0.5, 0.0, 0.5, 0.5, 0.2, 0.6, 0.05, 0.05, 0.5, 0.5]
+    onsets = [
+        detector.update(_foam(fraction), float(index))
+        for index, fraction in enumerate(fractions)
+    ]
+    # A single bright frame is not enough, hovering between the thresholds
+    # does not fire again and the detector re-arms once below ``off``
+    assert [onset for onset in onsets if onset is not None] == [3.0, 9.0]
+    assert onsets[4] == 3.0 and onsets[10] == 9.0
+    assert detector.active
+
+
+def test_whitewater_uses_full_scale_of_the_dtype():
+    detector = WavebreakDetector(downsample=1, brightness=0.5)
+    frame = np.zeros((4, 4), dtype=np.uint16)
+    frame[0] = 40000
+    frame[1] = 200
+    assert detector.score(frame) == pytest.approx(0.25)
+    color = np.zeros((4, 4, 3), dtype=np.uint8)
+    color[:2] = 255
+    color[1, :, 2] = 0
+    assert detector.score(color) == pytest.approx(0.25)
+
+
+def test_difference_scores_change_between_frames():
+    detector = WavebreakDetector("difference", on=0.2, off=0.1, frames=1)
+    still = np.zeros((32, 32), dtype=np.uint8)
+    assert detector.update(still, 1.0) is None
+    assert detector.last_score == 0.0
+    moved = np.full((32, 32), 102, dtype=np.uint8)
+    assert detector.update(moved, 2.0) == 2.0
+    assert detector.last_score == pytest.approx(0.4)
+    assert detector.update(moved, 3.0) is None
+    assert not detector.active
+
+
+def test_cost_is_reported_and_reset():
+    detector = WavebreakDetector()
+    frame = np.zeros((1080, 1440), dtype=np.uint8)
+    for index in range(20):
+        detector.update(frame, float(index))
+    frames, mean, worst = detector.cost(reset=True)
+    assert frames == 20
+    # Well within the 125 ms between frames at 8 fps
+    assert 0 < mean <= worst < 0.125
+    assert detector.cost() == (0, 0.0, 0.0)
+
+
+def test_publisher_sends_trigger_with_onset_time():
+    context = zmq.Context()
+    publisher = WavebreakPublisher("tcp://127.0.0.1:*", context=context)
+    endpoint = publisher.socket.getsockopt_string(zmq.LAST_ENDPOINT)
+    subscriber = TriggerSubscriber([endpoint], context=context)
+    try:
+        onset = time.monotonic() - 2.0
+        trigger = None
+        deadline = time.monotonic() + 5
+        while trigger is None and time.monotonic() < deadline:
+            publisher.publish(onset)
+            trigger = subscriber.wait(timeout=0.05)
+        assert trigger is not None
+        assert trigger.event_id
+        assert trigger.timestamp == pytest.approx(time.time() - 2.0, abs=0.5)
+    finally:
+        subscriber.close()
+        publisher.close()
+        context.term()
+
+
+def test_capture_detection_publishes_onsets(monkeypatch, tmp_path):
+    cam = _camera(monkeypatch, _config(tmp_path))
+    assert cam.detector is None
+    cam.detector = WavebreakDetector(on=0.3, off=0.1, frames=1, downsample=2)
+    cam.publisher = MagicMock()
+    cam._detect(_foam(0.0), 1.0)
+    cam._detect(_foam(0.8), 2.0)
+    cam._detect(_foam(0.8), 3.0)
+    cam.publisher.publish.assert_called_once_with(2.0)
@@ -0,0 +1,139 @@
+"""Event-driven reception of trigger messages.
+
+:class:`TriggerSubscriber` blocks on a :class:`zmq.Poller` over the trigger
+subscription and an internal control pipe, so a trigger is handled as soon
+as it arrives rather than on the next turn of a polling loop, and other
+threads can wake the waiting loop through :meth:`TriggerSubscriber.wake`.
+
+A trigger message is the topic, optionally followed by a space and a JSON
+object with the publisher's wall-clock ``time`` of the event and an
+``event_id``::
+
+    trigger {"time": 1718000000.123, "event_id": "3f2a..."}
+
+A bare ``trigger`` is still accepted and taken to mean "now".
+"""
+
+import json
+import threading
+import time
+import uuid
+from typing import Iterable, NamedTuple, Optional
+
+import zmq
+
+# Topic published by the conductivity UI and other trigger sources
+TRIGGER_TOPIC = "trigger"
+
+
+class Trigger(NamedTuple):
+    """A trigger message and the ``time.monotonic()`` it was received at.
+
+    ``timestamp`` is the publisher's ``time.time()`` of the event and
+    ``event_id`` its identifier, both ``None`` for a bare trigger.
+    """
+
+    message: str
+    received: float
+    timestamp: Optional[float] = None
+    event_id: Optional[str] = None
+
+    def age(self) -> float:
+        """Seconds since the trigger was received."""
+        return time.monotonic() - self.received
+
+
+def trigger_message(
+    timestamp: Optional[float] = None,
+    event_id: Optional[str] = None,
+    topic: str = TRIGGER_TOPIC,
+) -> str:
+    """Build a trigger message for the event at ``timestamp`` (default now)."""
+    payload = {
+        "time": time.time() if timestamp is None else timestamp,
+        "event_id": event_id or uuid.uuid4().hex,
+    }
+    return f"{topic} {json.dumps(payload)}"
+
+
+def parse_trigger(message: str, received: float) -> Trigger:
+    """Parse a trigger ``message`` received at monotonic time ``received``.
+
+    A payload that is missing or malformed leaves ``timestamp`` and
+    ``event_id`` as ``None``.
+    """
+    _, _, body = message.partition(" ")
+    try:
+        payload = json.loads(body) if body else {}
+        timestamp = payload.get("time")
+        timestamp = None if timestamp is None else float(timestamp)
+        event_id = payload.get("event_id")
+        event_id = None if event_id is None else str(event_id)
+    except (ValueError, TypeError, AttributeError):
+        return Trigger(message, received)
+    return Trigger(message, received, timestamp, event_id)
+
+
+class TriggerSubscriber:
+    """Subscribe to trigger messages from one or more publishers.
+
+    ``endpoints`` are ZMQ addresses such as ``"tcp://192.168.100.2:5555"``.
+    """
+
+    def __init__(
+        self,
+        endpoints: Iterable[str],
+        topic: str = TRIGGER_TOPIC,
+        context: Optional[zmq.Context] = None,
+    ) -> None:
+        self._owns_context = context is None
+        self.context = context or zmq.Context()
+        self.socket = self.context.socket(zmq.SUB)
+        for endpoint in endpoints:
+            self.socket.connect(endpoint)
+        self.socket.setsockopt_string(zmq.SUBSCRIBE, topic)
+
+        # Control pipe used by other threads to wake ``wait``
+        address = f"inproc://trigger-control-{id(self)}"
+        self._control = self.context.socket(zmq.PAIR)
+        self._control.bind(address)
+        self._waker = self.context.socket(zmq.PAIR)
+        self._waker.connect(address)
+        self._waker_lock = threading.Lock()
+
+        self._poller = zmq.Poller()
+        self._poller.register(self.socket, zmq.POLLIN)
+        self._poller.register(self._control, zmq.POLLIN)
+        self.stopped = False
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Trigger]:
+        """Block until a trigger arrives and return it.
+
+        Returns ``None`` once ``timeout`` seconds have passed, or when woken
+        through :meth:`wake` or :meth:`stop`.
+        """
+        timeout_ms = None if timeout is None else timeout * 1000
+        events = dict(self._poller.poll(timeout_ms))
+        if self.socket in events:
+            message = self.socket.recv_string()
+            return parse_trigger(message, time.monotonic())
+        if self._control in events:
+            self._control.recv()
+        return None
+
+    def wake(self) -> None:
+        """Make a pending or the next :meth:`wait` return ``None``."""
+        with self._waker_lock:
+            self._waker.send(b"")
+
+    def stop(self) -> None:
+        """Set :attr:`stopped` and wake the waiting loop."""
+        self.stopped = True
+        self.wake()
+
+    def close(self) -> None:
+        self.socket.close(linger=0)
+        self._control.close(linger=0)
+        self._waker.close(linger=0)
+        if self._owns_context:
+            self.context.term()
@@ -0,0 +1,237 @@
+"""Onboard wavebreak detection on the frames of a camera.
+
+:class:`WavebreakDetector` scores every frame on a strided, downsampled view
+with a single vectorized NumPy pass:
+
+* ``"whitewater"``: the fraction of pixels brighter than ``brightness`` of
+  full scale, which rises as foam covers the view;
+* ``"difference"``: the mean absolute change from the previous frame as a
+  fraction of full scale, which rises as a breaking wave moves through it.
+
+A wavebreak begins once the score stays at or above ``on`` for ``frames``
+frames and ends once it stays below ``off`` for as long, so a score
+hovering around one threshold does not fire repeatedly.
+
+:class:`WavebreakPublisher` announces each wavebreak with a regular trigger
+message (see :func:`trigger.trigger_message`), so every camera subscribed to
+its endpoint writes the event like one triggered from the conductivity UI.
+"""
+
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+import zmq
+
+from trigger import TRIGGER_TOPIC, trigger_message
+
+# Scores computed by ``WavebreakDetector``
+WAVEBREAK_METRICS = ("whitewater", "difference")
+
+
+class WavebreakDetector:
+    """Detect the start of wavebreaks in a stream of frames.
+
+    Frames are downsampled by taking every ``downsample``-th pixel in both
+    directions and colour frames by their darkest channel, since whitewater
+    is bright in all of them.  The time spent per frame is accumulated for
+    :meth:`cost`.
+    """
+
+    def __init__(
+        self,
+        metric: str = "whitewater",
+        on: float = 0.05,
+        off: float = 0.02,
+        frames: int = 2,
+        downsample: int = 8,
+        brightness: float = 0.8,
+    ) -> None:
+        if metric not in WAVEBREAK_METRICS:
+            raise ValueError(f"unknown wavebreak metric: {metric}")
+        if off > on:
+            raise ValueError("wavebreak off threshold cannot exceed the on threshold")
+        self.metric = metric
+        self.on = on
+        self.off = off
+        self.frames = max(1, frames)
+        self.downsample = max(1, downsample)
+        self.brightness = brightness
+
+        self.active = False
+        self.last_score = 0.0
+        # Consecutive frames past the threshold that would change ``active``
+        self._run = 0
+        self._run_start: Optional[float] = None
+        # Previous downsampled frame and scratch space for "difference"
+        self._previous: Optional[np.ndarray] = None
+        self._diff: Optional[np.ndarray] = None
+        self._cost_total = 0.0
+        self._cost_max = 0.0
+        self._cost_frames = 0
+
+    def _downsampled(self, frame: np.ndarray) -> np.ndarray:
+        small = frame[:: self.downsample, :: self.downsample]
+        if small.ndim == 3:
+            small = small.min(axis=2)
+        return small
+
+    @staticmethod
+    def _full_scale(dtype: np.dtype) -> float:
+        if np.issubdtype(dtype, np.integer):
+            return float(np.iinfo(dtype).max)
+        return 1.0
+
+    def score(self, frame: np.ndarray) -> float:
+        """Return the configured score of ``frame``, between 0 and 1."""
+        small = self._downsampled(frame)
+        full_scale = self._full_scale(small.dtype)
+        if self.metric == "whitewater":
+            bright = np.count_nonzero(small >= self.brightness * full_scale)
+            return bright / small.size
+
+        if self._previous is None or self._previous.shape != small.shape:
+            self._previous = small.astype(np.float32)
+            self._diff = np.empty_like(self._previous)
+            return 0.0
+        np.subtract(small, self._previous, out=self._diff, dtype=np.float32)
+        np.abs(self._diff, out=self._diff)
+        np.copyto(self._previous, small, casting="unsafe")
+        return float(self._diff.mean()) / full_scale
+
+    def update(self, frame: np.ndarray, host_time: float) -> Optional[float]:
+        """Score ``frame``, received at ``host_time``, and track wavebreaks.
+
+        Returns the ``host_time`` of the first frame of a wavebreak once it
+        is confirmed, and ``None`` otherwise.
+        """
+        start = time.perf_counter()
+        score = self.last_score = self.score(frame)
+        onset = None
+        if not self.active:
+            if score >= self.on:
+                if self._run == 0:
+                    self._run_start = host_time
+                self._run += 1
+                if self._run >= self.frames:
+                    self.active = True
+                    self._run = 0
+                    onset = self._run_start
+            else:
+                self._run = 0
+        elif score < self.off:
+            self._run += 1
+            if self._run >= self.frames:
+                self.active = False
+                self._run = 0
+        else:
+            self._run = 0
+
+        cost = time.perf_counter() - start
+        self._cost_total += cost
+        self._cost_max = max(self._cost_max, cost)
+        self._cost_frames += 1
+        return onset
+
+    def cost(self, reset: bool = False) -> Tuple[int, float, float]:
+        """Return ``(frames, mean, max)`` seconds spent per frame.
+
+        With ``reset`` the statistics start over, so that periodic reports
+        cover only the frames since the last one.
+        """
+        frames = self._cost_frames
+        result = (
+            frames,
+            self._cost_total / frames if frames else 0.0,
+            self._cost_max,
+        )
+        if reset:
+            self._cost_total = self._cost_max = 0.0
+            self._cost_frames = 0
+        return result
+
+
+class WavebreakPublisher:
+    """Publish a trigger for every detected wavebreak.
+
+    ``endpoint`` is the address bound by the PUB socket, for example
+    ``"tcp://*:5556"``; subscribers add the matching ``tcp://<host>:5556``
+    to their trigger endpoints.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        topic: str = TRIGGER_TOPIC,
+        context: Optional[zmq.Context] = None,
+    ) -> None:
+        self._owns_context = context is None
+        self.context = context or zmq.Context()
+        self.socket = self.context.socket(zmq.PUB)
+        self.socket.bind(endpoint)
+        self.topic = topic
+
+    def publish(self, host_time: float) -> str:
+        """Publish the wavebreak that began at monotonic ``host_time``.
+
+        Returns the message sent, which carries the wall-clock time of the
+        onset so that cameras pick frames by it rather than by arrival.
+        """
+        timestamp = time.time() - (time.monotonic() - host_time)
+        message = trigger_message(timestamp, topic=self.topic)
+        self.socket.send_string(message)
+        return message
+
+    def close(self) -> None:
+        self.socket.close(linger=0)
+        if self._owns_context:
+            self.context.term()
+
+
+def main():
+    import argparse
+
+    from camera_backends import ReplayCapture
+
+    parser = argparse.ArgumentParser(
+        description="Run wavebreak detection over a recorded event"
+    )
+    parser.add_argument("event", help="Event directory or .frames archive")
+    parser.add_argument(
+        "--metric",
+        choices=WAVEBREAK_METRICS,
+        default="whitewater",
+        help="Score to threshold (Default: whitewater)",
+    )
+    parser.add_argument("--on", type=float, default=0.05, help="(Default: 0.05)")
+    parser.add_argument("--off", type=float, default=0.02, help="(Default: 0.02)")
+    parser.add_argument("--frames", type=int, default=2, help="(Default: 2)")
+    parser.add_argument("--downsample", type=int, default=8, help="(Default: 8)")
+    parser.add_argument("--brightness", type=float, default=0.8, help="(Default: 0.8)")
+    parser.add_argument(
+        "--fps", type=float, default=8, help="Frame rate to budget for (Default: 8)"
+    )
+    args = parser.parse_args()
+
+    detector = WavebreakDetector(
+        args.metric, args.on, args.off, args.frames, args.downsample, args.brightness
+    )
+    capture = ReplayCapture(args.event, speed=0, loop=False)
+    index = 0
+    success, frame = capture.read()
+    while success:
+        onset = detector.update(frame, float(index))
+        marker = " wavebreak" if onset is not None else ""
+        print(f"{index} {detector.last_score:.4f}{marker}")
+        index += 1
+        success, frame = capture.read()
+
+    frames, mean, worst = detector.cost()
+    print(
+        f"{frames} frames: {mean * 1000:.3f} ms mean, {worst * 1000:.3f} ms max "
+        f"per frame ({1000 / args.fps:.1f} ms budget at {args.fps:g} fps)"
+    )
+
+
+if __name__ == "__main__":
+    main()
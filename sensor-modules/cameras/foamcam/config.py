@@ -10,16 +10,48 @@ Contains
 ########### Camera constants ###########
 # Maximum number of images in rolling buffer at once
 ROLL_BUF_SIZE = 40
+# Number of rolling buffer banks; capture fills one while the others are
+# written, and each costs ROLL_BUF_SIZE frames of memory.  With two, the
+# post-trigger frames are frozen once the pre-trigger ones are written, so
+# some are overwritten if that write takes longer than ROLL_BUF_SIZE / FPS
+# seconds (5 s here).  Raise to 3 if the "no longer buffered" warning shows
+# up, e.g. on a slow drive.
+ROLL_BUF_BANKS = 2
 # Byte threshold for data validation
 BYTE_THRESHOLD = 1000
 # Location of image directory to save images
 IMG_DIR = "/media/grant/Extreme Pro/foamcam_images"
-# Type of image to save to disk
+# Type of image to save to disk.  ".frames" writes each event as a single
+# archive file (see common/event_archive.py) instead of one image per frame.
 IMG_TYPE = ".png"
-# Amount of time in seconds to wait after event occurs
-EVENT_DELAY = 4
+# Compression for ".frames" archives: None for raw frames or "zlib"
+ARCHIVE_COMPRESSION = None
+# Sync each event to disk once it is written, rather than leaving it to the
+# page cache, and write ".frames" archives with O_DIRECT where supported
+WRITE_SYNC = True
+WRITE_DIRECT = False
+# Disk limits for IMG_DIR: STORAGE_QUOTA bytes for this camera (None = no
+# quota) and STORAGE_MIN_FREE bytes kept free on the disk
+STORAGE_QUOTA = None
+STORAGE_MIN_FREE = 20 * 1024**3
+# Once a write would cross either limit: "evict_oldest" deletes this camera's
+# oldest images, "compress" writes STORAGE_COMPRESSED_TYPE images instead and
+# "refuse_low_priority" stops low priority writes such as whitecap samples
+STORAGE_POLICY = "compress"
+STORAGE_COMPRESSED_TYPE = ".jpg"
+# Frames kept from before the trigger and captured after it (3 s / 2 s at
+# 8 fps).  Each must fit in ROLL_BUF_SIZE.
+PRE_TRIGGER_FRAMES = 24
+POST_TRIGGER_FRAMES = 16
 # Amount of time in seconds to wait after writing
 LOCKOUT_DELAY = 1
+# Encode and write events in a separate process reading a shared memory ring
+WRITER_PROCESS = True
+# Number of workers encoding the frames of an event in parallel
+ENCODER_WORKERS = 4
+# Encoder pool type for in-process writes, "thread" or "process".  The writer
+# process always uses threads.
+ENCODER_POOL = "thread"
 # Camera Settings
 EXPOSURE = 1000
 GAIN = 0
@@ -27,12 +59,62 @@ BRIGHTNESS = 10
 GAMMA = 0.25
 FPS = 8
 BACKLIGHT = 1
+# Stream buffer handling: "NewestOnly" drops frames that are not read in time,
+# "OldestFirst" queues up to STREAM_BUFFER_COUNT frames (None = SDK default)
+STREAM_BUFFER_MODE = "NewestOnly"
+STREAM_BUFFER_COUNT = None
+# Failed reads are retried RECOVERY_RETRIES times before the stream is
+# restarted, then the camera is reinitialized and finally reopened with an
+# exponential backoff from RECOVERY_BACKOFF up to RECOVERY_BACKOFF_MAX seconds
+RECOVERY_RETRIES = 3
+RECOVERY_BACKOFF = 0.5
+RECOVERY_BACKOFF_MAX = 30
+# Hardware sync between cameras run together: one "master" drives SYNC_LINE
+# while exposing and "slave" cameras expose on each rising edge of their
+# SYNC_LINE.  None free-runs at FPS.
+SYNC_ROLE = None
+SYNC_LINE = "Line2"
+# "spinnaker" for the FLIR camera, or "synthetic" / "replay" to run without
+# one (see common/camera_backends.py), configured by CAMERA_BACKEND_OPTIONS,
+# e.g. {"resolution": (1440, 1080), "pixel_format": "Mono8", "jitter": 0.002}
+# or {"path": "/data/2024-01-01-00-00-00.frames", "speed": 4.0}
+CAMERA_BACKEND = "spinnaker"
+CAMERA_BACKEND_OPTIONS = {}
+# Sensor readout: BINNING merges and DECIMATION skips pixels in both
+# directions, then ROI = (offset_x, offset_y, width, height) crops the result
+# (None = whole image).  Smaller frames cut bus bandwidth, buffer memory and
+# write time, and allow higher frame rates.
+ROI = None
+BINNING = 1
+DECIMATION = 1
+# Pixel format to capture, None for the camera's default.  Raw Bayer formats
+# ("BayerRG8", or "BayerRG12p" packed) are a third of the size of "BGR8", so
+# the same memory buffers three times the frames; they are written raw, so use
+# ".png" or ".frames" and debayer with common/bayer.py.
+PIXEL_FORMAT = None
+# Onboard wavebreak detection on every captured frame, downsampled by taking
+# every WAVEBREAK_DOWNSAMPLE-th pixel.  The score is the fraction of pixels
+# above WAVEBREAK_BRIGHTNESS of full scale ("whitewater") or the mean change
+# from the previous frame ("difference").  A wavebreak starts once the score
+# stays at or above WAVEBREAK_ON for WAVEBREAK_FRAMES frames, and ends once it
+# stays below WAVEBREAK_OFF as long; each start publishes a trigger on
+# WAVEBREAK_PORT (see common/wavebreak.py).
+WAVEBREAK_DETECTION = True
+WAVEBREAK_METRIC = "whitewater"
+WAVEBREAK_ON = 0.05
+WAVEBREAK_OFF = 0.02
+WAVEBREAK_FRAMES = 2
+WAVEBREAK_DOWNSAMPLE = 8
+WAVEBREAK_BRIGHTNESS = 0.8
+WAVEBREAK_PORT = 5556
 CAMERA_ID = "19061163"
 
 ########### Server Constants ###########
 # IP address and port of the trigger publisher
 SERVER_IP = "192.168.100.2"
 SERVER_PORT = 5555
+# Further trigger publishers, such as FoamCam's wavebreak detector
+TRIGGER_ENDPOINTS = ["tcp://127.0.0.1:5556"]
 
 ########### Logging Constants ###########
 # Name of file to log to
@@ -41,5 +123,10 @@ FILEMODE = "w"
 LOGGER_NAME = "Foamcam Logger"
 DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
 MESSAGE_FORMAT = "%(asctime)s.%(msecs)03d # %(name)s # %(levelname)s # %(message)s"
+# Log files are rotated at LOG_MAX_BYTES, keeping LOG_BACKUPS old files
+LOG_MAX_BYTES = 50 * 1024 * 1024
+LOG_BACKUPS = 5
+# Messages per second let through for hot-path levels; others are unlimited
+LOG_RATE_LIMITS = {"DEBUG": 20, "INFO": 20}
 
 
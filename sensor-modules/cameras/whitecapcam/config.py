@@ -10,6 +10,15 @@ Contains
 IMG_DIR = "/media/grant/Extreme Pro/whitecapcam_images"
 # Type of image to save to disk
 IMG_TYPE = ".png"
+# Disk limits for IMG_DIR: STORAGE_QUOTA bytes for this camera (None = no
+# quota) and STORAGE_MIN_FREE bytes kept free on the disk
+STORAGE_QUOTA = None
+STORAGE_MIN_FREE = 20 * 1024**3
+# Once a write would cross either limit: "evict_oldest" deletes this camera's
+# oldest images, "compress" writes STORAGE_COMPRESSED_TYPE images instead and
+# "refuse_low_priority" stops low priority writes such as whitecap samples
+STORAGE_POLICY = "refuse_low_priority"
+STORAGE_COMPRESSED_TYPE = ".jpg"
 # Camera settings
 EXPOSURE = 1000
 GAIN = 0
@@ -17,6 +26,24 @@ BRIGHTNESS = 10
 GAMMA = 0.25
 FPS = 8
 BACKLIGHT = 1
+# "spinnaker" for the FLIR camera, or "synthetic" / "replay" to run without
+# one (see common/camera_backends.py), configured by CAMERA_BACKEND_OPTIONS,
+# e.g. {"resolution": (1440, 1080), "pixel_format": "Mono8", "jitter": 0.002}
+# or {"path": "/data/2024-01-01-00-00-00.frames", "speed": 4.0}
+CAMERA_BACKEND = "spinnaker"
+CAMERA_BACKEND_OPTIONS = {}
+# Sensor readout: BINNING merges and DECIMATION skips pixels in both
+# directions, then ROI = (offset_x, offset_y, width, height) crops the result
+# (None = whole image).  Smaller frames cut bus bandwidth, buffer memory and
+# write time, and allow higher frame rates.
+ROI = None
+BINNING = 1
+DECIMATION = 1
+# Pixel format to capture, None for the camera's default.  Raw Bayer formats
+# ("BayerRG8", or "BayerRG12p" packed) are a third of the size of "BGR8", so
+# the same memory buffers three times the frames; they are written raw, so use
+# ".png" or ".frames" and debayer with common/bayer.py.
+PIXEL_FORMAT = None
 # Camera identifier
 CAMERA_ID = "20407408"
 # Capture interval in seconds (15 minutes)
@@ -29,3 +56,8 @@ FILEMODE = "w"
 LOGGER_NAME = "WhiteCapCam Logger"
 DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
 MESSAGE_FORMAT = "%(asctime)s.%(msecs)03d # %(name)s # %(levelname)s # %(message)s"
+# Log files are rotated at LOG_MAX_BYTES, keeping LOG_BACKUPS old files
+LOG_MAX_BYTES = 50 * 1024 * 1024
+LOG_BACKUPS = 5
+# Messages per second let through for hot-path levels; others are unlimited
+LOG_RATE_LIMITS = {"DEBUG": 20, "INFO": 20}
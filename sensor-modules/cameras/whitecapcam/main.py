@@ -8,18 +8,10 @@ sys.path.append(str(CURRENT_DIR))
 sys.path.append(str(COMMON_DIR))
 
 from whitecapcam import WhiteCapCam
-from state import State
+from state import State, StateMonitor
 import config
 
 
-class StateMonitor:
-    """Placeholder state monitor returning the current glider state."""
-
-    def get_state(self) -> State:
-        # In real deployment, this would query an external system
-        return State.STORM
-
-
 if __name__ == "__main__":
     cam = WhiteCapCam()
     monitor = StateMonitor()
@@ -2,6 +2,9 @@ from unittest.mock import MagicMock
 import sys
 from pathlib import Path
 
+import numpy as np
+import pytest
+
 sys.path.append(str(Path(__file__).resolve().parents[2]))
 import whitecapcam.whitecapcam as whitecapcam
 
@@ -12,7 +15,8 @@ def test_capture_resets_and_retries(monkeypatch, tmp_path):
     class DummyCam:
         def __init__(self, *args, **kwargs):
             # First call fails, second succeeds
-            self.capture_image = MagicMock(side_effect=[(False, None), (True, "frame")])
+            frame = np.zeros((2, 2), np.uint8)
+            self.capture_image = MagicMock(side_effect=[(False, None), (True, frame)])
             self.reset = MagicMock()
             self.power_off = MagicMock()
 
@@ -22,8 +26,9 @@ def test_capture_resets_and_retries(monkeypatch, tmp_path):
     # Stub out cv2.imwrite so no files are actually written
     monkeypatch.setattr(whitecapcam.cv2, "imwrite", MagicMock())
 
+    monkeypatch.setattr(whitecapcam.config, "IMG_DIR", str(tmp_path))
+    monkeypatch.setattr(whitecapcam.config, "STORAGE_MIN_FREE", 0)
     cam = whitecapcam.WhiteCapCam()
-    cam.config.IMG_DIR = tmp_path
 
     cam.capture()
 
@@ -31,3 +36,24 @@ def test_capture_resets_and_retries(monkeypatch, tmp_path):
     assert cam.cam.reset.call_count == 1
     whitecapcam.cv2.imwrite.assert_called_once()
 
+
+
+@pytest.mark.parametrize("pixel_format, expected", [(None, ".jpg"), ("BayerRG8", ".png")])
+def test_low_storage_keeps_raw_frames(monkeypatch, tmp_path, pixel_format, expected):
+    """Raw Bayer samples are not compressed to JPEG when storage runs low."""
+    frame = np.zeros((2, 2), np.uint8)
+    cam_class = MagicMock()
+    cam_class.return_value.capture_image.return_value = (True, frame)
+    monkeypatch.setattr(whitecapcam, "Cam", cam_class)
+    monkeypatch.setattr(whitecapcam.cv2, "imwrite", MagicMock())
+    monkeypatch.setattr(whitecapcam.config, "IMG_DIR", str(tmp_path))
+    monkeypatch.setattr(whitecapcam.config, "IMG_TYPE", ".png")
+    monkeypatch.setattr(whitecapcam.config, "STORAGE_COMPRESSED_TYPE", ".jpg")
+    monkeypatch.setattr(whitecapcam.config, "PIXEL_FORMAT", pixel_format)
+    cam = whitecapcam.WhiteCapCam()
+    monkeypatch.setattr(cam.storage, "admit", lambda *_, **__: whitecapcam.COMPRESS)
+
+    cam.capture()
+
+    path = whitecapcam.cv2.imwrite.call_args.args[0]
+    assert path.endswith(expected)
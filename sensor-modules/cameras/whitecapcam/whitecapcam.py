@@ -9,8 +9,10 @@ COMMON_DIR = CURRENT_DIR.parent / "common"
 sys.path.append(str(CURRENT_DIR))
 sys.path.append(str(COMMON_DIR))
 
+from bayer import parse_bayer
 from cam import Cam
 from logger import Logger
+from storage import COMPRESS, REFUSE, StorageManager
 import config
 
 
@@ -31,9 +33,21 @@ class WhiteCapCam:
             config.GAMMA,
             config.FPS,
             config.BACKLIGHT,
-            0,
             config.IMG_TYPE,
             0,
+            backend=config.CAMERA_BACKEND,
+            backend_options=config.CAMERA_BACKEND_OPTIONS,
+            roi=config.ROI,
+            binning=config.BINNING,
+            decimation=config.DECIMATION,
+            pixel_format=config.PIXEL_FORMAT,
+        )
+        self.storage = StorageManager(
+            config.IMG_DIR,
+            config.STORAGE_QUOTA,
+            config.STORAGE_MIN_FREE,
+            config.STORAGE_POLICY,
+            self.logger,
         )
 
     def capture(self) -> None:
@@ -42,6 +56,8 @@ class WhiteCapCam:
         The camera connection can occasionally drop out briefly.  Similar to
         the BubbleCam and FoamCam workflows, this method retries the capture a
         few times, resetting the underlying camera if necessary.
+
+        Samples are low priority writes for :attr:`storage`.
         """
 
         for attempt in range(3):
@@ -54,11 +70,21 @@ class WhiteCapCam:
                 success, frame = False, None
 
             if success and frame is not None:
+                img_type = self.config.IMG_TYPE
+                decision = self.storage.admit(frame.nbytes, low_priority=True)
+                if decision == REFUSE:
+                    self.logger.warning("Not enough storage; skipping capture")
+                    return
+                # Lossy images would destroy raw Bayer mosaics
+                if decision == COMPRESS and not parse_bayer(self.config.PIXEL_FORMAT):
+                    img_type = self.config.STORAGE_COMPRESSED_TYPE
+
                 timestamp = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
                 img_dir = Path(self.config.IMG_DIR)
                 img_dir.mkdir(parents=True, exist_ok=True)
-                img_path = img_dir / f"{timestamp}{self.config.IMG_TYPE}"
+                img_path = img_dir / f"{timestamp}{img_type}"
                 cv2.imwrite(str(img_path), frame)
+                self.storage.record(str(img_path))
                 self.logger.info("Captured image %s", img_path)
                 return
 